@@ -0,0 +1,360 @@
+import argparse
+import asyncio
+import json
+import logging
+import math
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Optional
+
+import tornado.ioloop
+import tornado.web
+
+# Configure paths
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+ENGINE_DIR = PROJECT_ROOT / "src"
+sys.path.append(str(ENGINE_DIR))  # Ensure 'src' is in path
+
+from admission import AdmissionController, OverloadedError, deadline_after  # noqa: E402
+from events import CLICK, IMPRESSION, SEARCH, EventLogger  # noqa: E402
+from experiments import ModelRouter  # noqa: E402
+from registry import ModelRegistry  # noqa: E402
+from result_cache import RESULT_CACHE_ENV  # noqa: E402
+from search_state import ANY_OF, RecipeQuery  # noqa: E402
+from train import EMBEDDING, STRATEGIES, RecipeRecommender  # noqa: E402
+from warmup import WARMUP_LOG_ENV  # noqa: E402
+
+STATIC_PREFIX = "/static/"
+# Recommendations a request may wait for unless it passes timeout_ms
+DEFAULT_TIMEOUT_MS = 1000
+# Most full-text results a /search request may ask for with k
+MAX_SEARCH_RESULTS = 100
+ONE_YEAR = 365 * 24 * 3600
+
+
+class ImmutableStaticFileHandler(tornado.web.StaticFileHandler):
+    """Serves content-hashed images built by src/image_pipeline.py
+
+    Tornado already answers If-None-Match with 304 using the file's ETag; the
+    file names change whenever the content does, so clients may also cache
+    them forever.
+    """
+
+    def set_extra_headers(self, path: str) -> None:
+        self.set_header("Cache-Control", f"public, max-age={ONE_YEAR}, immutable")
+
+
+class RecipeHandler(tornado.web.RequestHandler):
+    """Base handler with access to the shared recommender
+
+    With require_ready, requests get 503 until the recommender's warm-up
+    has finished, except on handlers that report on startup themselves.
+    """
+
+    serves_while_warming = False
+
+    def initialize(self, recommender: RecipeRecommender, events: Optional[EventLogger] = None,
+                   router: Optional[ModelRouter] = None, admission: Optional[AdmissionController] = None,
+                   require_ready: bool = False) -> None:
+        self.recommender = recommender
+        self.events = events
+        self.router = router
+        self.admission = admission
+        self.require_ready = require_ready
+
+    def prepare(self) -> None:
+        if self.require_ready and not self.serves_while_warming and not self.recommender.readiness.ready:
+            raise tornado.web.HTTPError(503, reason="Warming up")
+
+    def log_event(self, event: str, recipe_ids: Any = (), user: str = "", query: str = "") -> None:
+        """Queue interaction events (no-op when the app runs without an event log)"""
+        if self.events is not None:
+            if event == SEARCH:
+                self.events.log(event, user=user, query=query)
+            else:
+                self.events.log_many(event, list(recipe_ids), user, query)
+
+    def _number(self, name: str, cast: type = int) -> Any:
+        value = self.get_argument(name, None)
+        if value is None:
+            return None
+        try:
+            return cast(value)
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason=f"'{name}' must be a number")
+
+    def _max_scale(self) -> float:
+        """Most a recipe may be scaled up to reach min_serves, 1 (no scaling) by default"""
+        max_scale = self._number("max_scale", float)
+        if max_scale is None:
+            return 1.0
+        if not math.isfinite(max_scale) or max_scale < 1:
+            raise tornado.web.HTTPError(400, reason="'max_scale' must be a finite number of at least 1")
+        return max_scale
+
+    def write_error(self, status_code: int, **kwargs: Any) -> None:
+        # send_error() clears the headers set before the error was raised
+        if status_code == 503:
+            self.set_header("Retry-After", "1")
+        super().write_error(status_code, **kwargs)
+
+    def write_json(self, payload: Any) -> None:
+        self.set_header("Content-Type", "application/json")
+        self.write(json.dumps(payload, default=str))
+
+
+class RecommendHandler(RecipeHandler):
+    """GET /recommend?ingredients=rice,tomatoes[&user=...][&diversity=0.3][&max_per_cuisine=2][&strategy=graph]
+    [&timeout_ms=500]
+
+    With a model router, the user's A/B bucket picks the model version,
+    reported in the X-Model-Version header. With an admission controller,
+    recommendations run on its worker pool; when it is full, or the request's
+    deadline passes while queued, the answer is 503 with Retry-After.
+    """
+
+    async def get(self) -> None:
+        ingredients, user = self.get_argument("ingredients", ""), self.get_argument("user", None)
+        diversity = self._number("diversity", float) or 0.0
+        if not 0.0 <= diversity <= 1.0:
+            raise tornado.web.HTTPError(400, reason="'diversity' must be between 0 and 1")
+        strategy = self.get_argument("strategy", EMBEDDING)
+        if strategy not in STRATEGIES:
+            raise tornado.web.HTTPError(400, reason=f"'strategy' must be one of {', '.join(STRATEGIES)}")
+        max_per_cuisine = self._number("max_per_cuisine")
+        if max_per_cuisine is not None and max_per_cuisine < 1:
+            raise tornado.web.HTTPError(400, reason="'max_per_cuisine' must be at least 1")
+        timeout_ms = self._number("timeout_ms", float)
+        if timeout_ms is not None and timeout_ms <= 0:
+            raise tornado.web.HTTPError(400, reason="'timeout_ms' must be positive")
+        deadline = deadline_after((timeout_ms or DEFAULT_TIMEOUT_MS) / 1000)
+        options = {"diversity": diversity, "max_per_cuisine": max_per_cuisine, "strategy": strategy,
+                   "deadline": deadline}
+
+        def recommend() -> Any:
+            if self.router is not None:
+                return self.router.recommend(ingredients, user, **options)
+            return self.recommender.recommend(ingredients, user, **options), None
+
+        try:
+            if self.admission is not None:
+                results, version = await asyncio.wrap_future(self.admission.submit(recommend, deadline))
+            else:
+                results, version = recommend()
+        except OverloadedError as e:
+            raise tornado.web.HTTPError(503, reason=str(e))
+        if version is not None:
+            self.set_header("X-Model-Version", version)
+        self.log_event(SEARCH, user=user or "", query=ingredients)
+        self.log_event(IMPRESSION, results.index, user or "", ingredients)
+        self.write_json(json.loads(results.to_json(orient="records")))
+
+
+class TextSearchHandler(RecipeHandler):
+    """GET /search?q=slow+cook+no+oven&k=10"""
+
+    def get(self) -> None:
+        k = self._number("k")
+        k = 10 if k is None else k
+        if not 1 <= k <= MAX_SEARCH_RESULTS:
+            raise tornado.web.HTTPError(400, reason=f"'k' must be between 1 and {MAX_SEARCH_RESULTS}")
+        results = self.recommender.search_text(self.get_argument("q", ""), k)
+        self.write_json(json.loads(results.to_json(orient="records")))
+
+
+class QueryHandler(RecipeHandler):
+    """GET /query?ingredients=rice,eggs&mode=all&cuisine=Asian&max_time=30&text=fry
+
+    The GUI's ingredient search (src/search_state.py) over HTTP; also takes
+    max_missing, min_serves, max_serves and max_scale.
+    """
+
+    def get(self) -> None:
+        query = RecipeQuery(
+            self.get_argument("ingredients", "").split(','),
+            mode=self.get_argument("mode", ANY_OF),
+            cuisines=self.get_arguments("cuisine") or None,
+            max_time=self._number("max_time"),
+            max_missing=self._number("max_missing") or 0,
+            text=self.get_argument("text", ""),
+            min_serves=self._number("min_serves"),
+            max_serves=self._number("max_serves"),
+            max_scale=self._max_scale(),
+        )
+        results = self.recommender.search_recipes(query)
+        self.write_json(json.loads(results.to_json(orient="records")))
+
+
+class ReadyHandler(RecipeHandler):
+    """GET /ready: 200 once warm-up has finished, 503 before; the body has the startup stage timings"""
+
+    serves_while_warming = True
+
+    def get(self) -> None:
+        readiness = self.recommender.readiness
+        if not readiness.ready:
+            self.set_status(503)
+        self.write_json(readiness.report())
+
+
+class StatsHandler(RecipeHandler):
+    """GET /stats: result cache counters (used by src/querylog.py replays), model routing, load shedding and startup"""
+
+    serves_while_warming = True
+
+    def get(self) -> None:
+        self.write_json({"cache": self.recommender.result_cache.stats(),
+                         "coalesced": self.recommender.in_flight.coalesced,
+                         "catalog_version": self.recommender.snapshot.version,
+                         "models": None if self.router is None else self.router.stats(),
+                         "admission": None if self.admission is None else self.admission.stats(),
+                         "startup": self.recommender.readiness.report()})
+
+
+class RecipeByNameHandler(RecipeHandler):
+    """GET /recipe?name=Falafel"""
+
+    def get(self) -> None:
+        recipe = self.recommender.get_recipe_by_name(self.get_argument("name", ""))
+        if recipe is None:
+            raise tornado.web.HTTPError(404, reason="Recipe not found")
+        self.write_json(recipe)
+
+
+class RecipesHandler(RecipeHandler):
+    """Catalog filtering and live updates
+
+    GET /recipes?max_time=45&min_serves=6&max_serves=10&cuisine=Italian&max_scale=2,
+    POST /recipes, PUT /recipes?name=..., DELETE /recipes?name=...
+    """
+
+    def get(self) -> None:
+        results = self.recommender.filter_recipes(
+            max_time=self._number("max_time"),
+            min_serves=self._number("min_serves"),
+            max_serves=self._number("max_serves"),
+            cuisines=self.get_arguments("cuisine") or None,
+            max_scale=self._max_scale(),
+        )
+        self.write_json(json.loads(results.to_json(orient="records")))
+
+    def _body(self) -> dict:
+        try:
+            return json.loads(self.request.body)
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason="Body must be a JSON recipe")
+
+    def post(self) -> None:
+        try:
+            recipe_id = self.recommender.add_recipe(self._body())
+        except ValueError as e:
+            raise tornado.web.HTTPError(400, reason=str(e))
+        self.set_status(201)
+        self.write_json({"id": recipe_id})
+
+    def put(self) -> None:
+        try:
+            recipe_id = self.recommender.update_recipe(self.get_argument("name"), self._body())
+        except ValueError as e:
+            raise tornado.web.HTTPError(400, reason=str(e))
+        if recipe_id is None:
+            raise tornado.web.HTTPError(404, reason="Recipe not found")
+        self.write_json({"id": recipe_id})
+
+    def delete(self) -> None:
+        if not self.recommender.delete_recipe(self.get_argument("name")):
+            raise tornado.web.HTTPError(404, reason="Recipe not found")
+        self.set_status(204)
+
+
+class ClickHandler(RecipeHandler):
+    """POST /click {"user": "...", "recipe": name or id[, "weight": 1.0]}"""
+
+    def post(self) -> None:
+        try:
+            body = json.loads(self.request.body)
+            user, recipe, weight = str(body["user"]), body["recipe"], float(body.get("weight", 1.0))
+        except (ValueError, KeyError, TypeError):
+            raise tornado.web.HTTPError(400, reason="Body must be JSON with 'user' and 'recipe'")
+        if not math.isfinite(weight) or weight < 0:
+            raise tornado.web.HTTPError(400, reason="'weight' must be a non-negative number")
+        recipe_id = self.recommender.record_click(user, recipe, weight)
+        if recipe_id is None:
+            raise tornado.web.HTTPError(404, reason="Recipe not found")
+        self.log_event(CLICK, [recipe_id], user)
+        self.set_status(204)
+
+
+class ShoppingListHandler(RecipeHandler):
+    """POST /shopping-list {"recipes": [names or ids], "pantry": [ingredients]}"""
+
+    def post(self) -> None:
+        try:
+            body = json.loads(self.request.body)
+            recipes, pantry = body["recipes"], body.get("pantry", [])
+        except (ValueError, KeyError, TypeError):
+            raise tornado.web.HTTPError(400, reason="Body must be JSON with a 'recipes' list")
+        self.write_json(self.recommender.shopping_list(recipes, pantry))
+
+
+def make_app(recommender: Optional[RecipeRecommender] = None, events: Optional[EventLogger] = None,
+             router: Optional[ModelRouter] = None, admission: Optional[AdmissionController] = None,
+             require_ready: bool = False) -> tornado.web.Application:
+    """Build the HTTP application (JSON API plus static recipe images)
+
+    With require_ready, API requests other than /ready and /stats get 503
+    until recommender.warm_up() has finished.
+    """
+    recommender = recommender or RecipeRecommender()
+    handler_args = {"recommender": recommender, "events": events, "router": router, "admission": admission,
+                    "require_ready": require_ready}
+    return tornado.web.Application([
+        (r"/recommend", RecommendHandler, handler_args),
+        (r"/search", TextSearchHandler, handler_args),
+        (r"/query", QueryHandler, handler_args),
+        (r"/stats", StatsHandler, handler_args),
+        (r"/ready", ReadyHandler, handler_args),
+        (r"/recipe", RecipeByNameHandler, handler_args),
+        (r"/recipes", RecipesHandler, handler_args),
+        (r"/shopping-list", ShoppingListHandler, handler_args),
+        (r"/click", ClickHandler, handler_args),
+        (STATIC_PREFIX + r"(.*)", ImmutableStaticFileHandler, {"path": str(recommender.STATIC_IMAGES_DIR)}),
+    ])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="VAVI recipes API and static image server")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--workers", type=int, default=4, help="Recommendations computed at once")
+    parser.add_argument("--max-queue", type=int, default=32,
+                        help="Recommendations waiting for a worker before new ones get 503")
+    parser.add_argument("--warmup-log", type=Path, default=None,
+                        help=f"Captured queries to replay before taking traffic (default ${WARMUP_LOG_ENV})")
+    parser.add_argument("--warmup-queries", type=int, default=200, help="Most queries replayed by the warm-up")
+    parser.add_argument("--result-cache", type=int, default=None,
+                        help=f"Recommendation results to cache (default ${RESULT_CACHE_ENV}, else none)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    # Model versions to serve are set with `python src/registry.py route`
+    routing = ModelRegistry(PROJECT_ROOT / "models" / "registry").routing()
+    recommender = RecipeRecommender(model_version=routing['primary'], result_cache_size=args.result_cache)
+    router = ModelRouter.from_registry(recommender, shadow_log=PROJECT_ROOT / "logs" / "shadow.jsonl")
+    recommender.start_background_compaction()
+    admission = AdmissionController(args.workers, args.max_queue)
+    make_app(recommender, EventLogger(recommender.EVENTS_DIR), router, admission, require_ready=True).listen(args.port)
+
+    def warm_up() -> None:
+        logging.info(f"Warm-up finished: {recommender.warm_up(args.warmup_log, args.warmup_queries)}")
+
+    # Listening already lets /ready report progress; other requests get 503 until warm-up finishes
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+    # Priors are re-aggregated offline by src/events.py
+    tornado.ioloop.PeriodicCallback(router.reload_priors, 5 * 60 * 1000).start()
+    logging.info(f"Serving on http://localhost:{args.port}")
+    tornado.ioloop.IOLoop.current().start()
+
+
+if __name__ == "__main__":
+    main()
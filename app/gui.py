@@ -1,8 +1,10 @@
 import logging
+import os
 import random
 import sys
+import uuid
 from pathlib import Path
-from typing import Dict, Any
+from typing import Any
 
 import streamlit as st
 from PIL import Image
@@ -10,20 +12,67 @@ from PIL import Image
 # Configure paths
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 IMAGES_DIR = PROJECT_ROOT / "images"
+# Where app/api.py serves the images built by src/image_pipeline.py
+STATIC_URL = os.environ.get("VAVI_STATIC_URL", "http://localhost:8502/static/")
 ENGINE_DIR = PROJECT_ROOT / "src"
 sys.path.append(str(ENGINE_DIR))  # Ensure 'src' is in path
 
 # Import RecipeRecommender safely
 try:
     from train import RecipeRecommender
+    from events import CLICK, COOK, IMPRESSION, SEARCH, EventLogger
+    from querylog import SEARCH as SEARCH_QUERY
+    from image_check import MANIFEST_FILE as IMAGE_CHECK_FILE, load_image_status
+    from image_pipeline import MANIFEST_FILE, ImageManifest
+    from search_state import ALL_OF, ANY_OF, COOKABLE, QueryState, RecipeQuery
 except ImportError as e:
     st.error("⚠️ Failed to load RecipeRecommender. Ensure 'src/train.py' exists.")
     st.error(f"Error details: {e}")
     st.stop()
 
-# Initialize recommender and get recipes
-recommender = RecipeRecommender()
-RECIPES = recommender.get_all_recipes()
+
+@st.cache_resource(show_spinner="Warming up the recommender...")
+def get_recommender() -> RecipeRecommender:
+    """Build and warm up the recommender once per process; sessions wait until it is ready"""
+    recommender = RecipeRecommender()
+    recommender.warm_up()
+    return recommender
+
+
+@st.cache_resource
+def get_image_manifest() -> ImageManifest:
+    """URLs of the pre-encoded catalog images"""
+    return ImageManifest(get_recommender().STATIC_IMAGES_DIR / MANIFEST_FILE, STATIC_URL)
+
+
+@st.cache_resource
+def get_image_status() -> dict:
+    """Image validation results written by src/image_check.py"""
+    return load_image_status(IMAGES_DIR / IMAGE_CHECK_FILE)
+
+
+@st.cache_resource
+def get_event_logger() -> EventLogger:
+    """Background event writer shared by all sessions"""
+    return EventLogger(get_recommender().EVENTS_DIR)
+
+
+def get_user_id() -> str:
+    """Anonymous id of this browser session, used for events and personalization"""
+    if 'user_id' not in st.session_state:
+        st.session_state.user_id = uuid.uuid4().hex
+    return st.session_state.user_id
+
+
+# Initialize recommender; recipes are looked up by id in its current catalog snapshot
+recommender = get_recommender()
+
+
+def get_query_state() -> QueryState:
+    """Session-scoped state holding the last ingredient query and its result ids (catalog recipe ids)"""
+    if 'query_state' not in st.session_state:
+        st.session_state.query_state = recommender.query_state()
+    return st.session_state.query_state
 
 
 def configure_page() -> None:
@@ -62,7 +111,11 @@ def load_image(image_name: str) -> Image.Image:
     """Safely loads an image from the images directory"""
     image_path = IMAGES_DIR / image_name
     try:
-        if image_path.exists():
+        # Scanned images are known to decode; only unscanned ones hit the disk here
+        image_ok = get_image_status().get(image_name)
+        if image_ok is None:
+            image_ok = image_path.exists()
+        if image_ok:
             return Image.open(image_path)
         return Image.new('RGB', (400, 300), color=(240, 240, 240))  # Default placeholder
     except Exception as p:
@@ -70,13 +123,16 @@ def load_image(image_name: str) -> Image.Image:
         return Image.new('RGB', (400, 300), color=(240, 240, 240))
 
 
-def display_recipe(recipe: Dict[str, Any], expanded: bool = True) -> None:
+def display_recipe(recipe_id: int, expanded: bool = True, key_prefix: str = "results") -> None:
     """Displays a recipe in an expandable card with enhanced layout"""
+    recipe = recommender.snapshot.recipes[recipe_id]
     with st.expander(f"🍴 {recipe['name']}", expanded=expanded):
         col1, col2 = st.columns([1, 2])
 
         with col1:
-            img = load_image(recipe.get('image', 'default.jpg'))
+            image_name = recipe.get('image', 'default.jpg')
+            # Browser fetches pre-encoded images by URL; fall back to pushing pixels if not built
+            img = get_image_manifest().url(image_name) or load_image(image_name)
             st.image(img, use_container_width=True,
                      caption=f"{recipe['cuisine']} Cuisine • ⏱️ {recipe['cooking_time']} min • 👥 Serves {recipe['serves']}")
 
@@ -103,6 +159,17 @@ def display_recipe(recipe: Dict[str, Any], expanded: bool = True) -> None:
                     </div>
                 """, unsafe_allow_html=True)
 
+            similar = recommender.similar_to(recipe['name'], 3)
+            if not similar.empty:
+                st.markdown("#### 🍽️ Similar dishes")
+                st.markdown(" • ".join(similar['name']))
+
+            # Expanding a card can't be observed, so engagement is logged from this button
+            if st.button("🍳 I cooked this", key=f"{key_prefix}_cooked_{recipe_id}"):
+                get_event_logger().log(COOK, recipe_id, get_user_id())
+                recommender.record_click(get_user_id(), recipe_id, weight=3.0)
+                st.toast(f"Enjoy your {recipe['name']}!")
+
 
 def show_sidebar() -> None:
     """Enhanced sidebar with improved layout and functionality"""
@@ -143,10 +210,15 @@ def show_sidebar() -> None:
         if st.button("🔍 Search", key="search_button"):
             if recipe_name:
                 try:
-                    matching_recipes = [r for r in RECIPES if recipe_name.lower() in r['name'].lower()]
-                    if matching_recipes:
+                    snapshot = recommender.snapshot
+                    matching_ids = [i for i, (name, alive) in enumerate(zip(snapshot.df['name'], snapshot.alive))
+                                    if alive and recipe_name.lower() in name.lower()]
+                    # Matches are only shown; opening one is logged as a click
+                    get_event_logger().log_many(IMPRESSION, matching_ids, get_user_id(), recipe_name)
+                    if matching_ids:
                         # Move display to main area
-                        st.session_state.sidebar_search_results = matching_recipes
+                        st.session_state.sidebar_search_results = matching_ids
+                        st.session_state.pop('sidebar_opened_recipe', None)
                         st.session_state.recipe_search_input = recipe_name  # Update session state
                     else:
                         st.warning("Recipe not found. Try another name.")
@@ -160,6 +232,7 @@ def show_sidebar() -> None:
             st.session_state.recipe_search_input = ""
             if 'sidebar_search_results' in st.session_state:
                 del st.session_state.sidebar_search_results
+            st.session_state.pop('sidebar_opened_recipe', None)
             st.rerun()
 
         st.markdown('</div>', unsafe_allow_html=True)
@@ -168,9 +241,11 @@ def show_sidebar() -> None:
 
         # Enhanced ingredient suggestions
         st.markdown("## 🛒 Common Ingredients")
-        all_ingredients = list(set(ing for recipe in RECIPES for ing in recipe['ingredients'].split(',')))
         if st.button("💡 Suggest Ingredients", key="suggest_button"):
-            st.session_state.suggested_ingredients = ", ".join(random.sample(all_ingredients, 5))
+            # Ranked by how often they appear with what's already in the kitchen
+            pantry = st.session_state.get('ingredients', "").split(',')
+            suggestions = recommender.suggest_ingredients(pantry, 5)
+            st.session_state.suggested_ingredients = ", ".join(s.replace('_', ' ') for s in suggestions)
 
         if 'suggested_ingredients' in st.session_state:
             st.text_area("Suggested ingredients:",
@@ -178,17 +253,51 @@ def show_sidebar() -> None:
                          height=68,
                          key="suggested_ingredients_display")
 
+        st.markdown("---")
+
+        # Merged list for several recipes, minus what's already in the kitchen
+        st.markdown("## 🧾 Shopping List")
+        shopping_recipes = st.multiselect(
+            "Recipes to cook:",
+            recommender.snapshot.df['name'][recommender.snapshot.alive].tolist(),
+            key="shopping_recipes"
+        )
+        if st.button("📝 Make Shopping List", key="shopping_list_button"):
+            pantry = st.session_state.get('ingredients', "").split(',')
+            st.session_state.shopping_list = recommender.shopping_list(shopping_recipes, pantry)['items']
+
+        if st.session_state.get('shopping_list'):
+            for category, items in st.session_state.shopping_list.items():
+                st.markdown(f"**{category}**")
+                st.markdown("\n".join(
+                    f"- {item['ingredient'].replace('_', ' ')}"
+                    + (f" (×{item['recipes']})" if item['recipes'] > 1 else "")
+                    for item in items))
+        elif 'shopping_list' in st.session_state:
+            st.info("You already have everything!")
+
 
 def main_interface() -> None:
     """Main user input and recipe recommendation interface"""
     # Display sidebar search results in main area if they exist
     if 'sidebar_search_results' in st.session_state:
         st.markdown("## 🔍 Search Results")
-        for recipe in st.session_state.sidebar_search_results:
-            display_recipe(recipe)
+        snapshot = recommender.snapshot
+        for recipe_id in st.session_state.sidebar_search_results:
+            if not snapshot.alive[recipe_id]:
+                continue
+            # Matches are listed by name; opening one is the click
+            if st.button(f"📖 {snapshot.recipes[recipe_id]['name']}", key=f"sidebar_open_{recipe_id}"):
+                st.session_state.sidebar_opened_recipe = recipe_id
+                get_event_logger().log(CLICK, recipe_id, get_user_id(), st.session_state.recipe_search_input)
+                recommender.record_click(get_user_id(), recipe_id)
+            if st.session_state.get('sidebar_opened_recipe') == recipe_id:
+                display_recipe(recipe_id, key_prefix="sidebar")
         st.markdown("---")
 
     st.markdown("## 🔍 What's in your kitchen?")
+    snapshot = recommender.snapshot
+    live = snapshot.df[snapshot.alive]
 
     # Initialize session state for ingredients if not exists
     if 'ingredients' not in st.session_state:
@@ -203,9 +312,33 @@ def main_interface() -> None:
             key="ingredient_input"
         )
 
+        technique = st.text_input(
+            "Technique or keywords (optional):",
+            placeholder="e.g., grill, slow cook, no oven...",
+            help="Searches recipe names and steps; prefix a word with '-' or 'no' to exclude it"
+        )
+
+        match_cols = st.columns([2, 1])
+        with match_cols[0]:
+            match_mode = st.radio(
+                "Match:",
+                ["Any ingredient", "All ingredients", "Cookable now"],
+                horizontal=True,
+                key="match_mode",
+                help="'Cookable now' only shows recipes you can make with what you have"
+            )
+        with match_cols[1]:
+            max_missing = st.number_input(
+                "Allow missing ingredients:",
+                min_value=0,
+                max_value=10,
+                value=0,
+                help="Used by 'Cookable now'"
+            )
+
         cols = st.columns(2)
         with cols[0]:
-            cuisine_options = ["Any"] + sorted(list(set(recipe['cuisine'] for recipe in RECIPES)))
+            cuisine_options = ["Any"] + sorted(set(live['cuisine']))
             cuisine_pref = st.multiselect(
                 "Preferred Cuisines:",
                 cuisine_options,
@@ -221,43 +354,77 @@ def main_interface() -> None:
                 help="Filter recipes by maximum preparation time"
             )
 
+        serve_cols = st.columns([2, 1])
+        with serve_cols[0]:
+            max_servings = int(live['serves'].max())
+            serves_range = st.slider(
+                "Serves:",
+                min_value=1,
+                max_value=max_servings,
+                value=(1, max_servings),
+                help="Number of people the recipe should feed"
+            )
+        with serve_cols[1]:
+            allow_scaling = st.checkbox(
+                "Allow doubling recipes",
+                help="Also show recipes that reach the servings range when made twice"
+            )
+
         submitted = st.form_submit_button("✨ Find Matching Recipes")
 
+    query_state = get_query_state()
+
     if submitted:
         st.session_state.ingredients = user_input  # Save to session state
 
-        if not user_input.strip():
+        if not user_input.strip() and not technique.strip():
+            query_state.clear()
             st.warning("Please enter ingredients to get started!")
             st.image(load_image("empty_kitchen.jpg"), width=300)
         else:
             with st.spinner("🧑‍🍳 Finding matching recipes..."):
                 try:
-                    input_ingredients = [ing.strip().lower() for ing in user_input.split(',') if ing.strip()]
-
-                    # Find recipes that contain at least one of the input ingredients
-                    matching_recipes = []
-                    for recipe in RECIPES:
-                        recipe_ingredients = [ing.strip().lower() for ing in recipe['ingredients'].split(',')]
-                        if any(ing in recipe_ingredients for ing in input_ingredients):
-                            if ("Any" in cuisine_pref or recipe['cuisine'] in cuisine_pref) and recipe[
-                                'cooking_time'] <= max_time:
-                                matching_recipes.append(recipe)
-
-                    if matching_recipes:
-                        st.success(f"🍽️ Found {len(matching_recipes)} matching recipes!")
-                        for recipe in matching_recipes:
-                            display_recipe(recipe)
-                    else:
-                        st.info(
-                            "No recipes match your ingredients and filters. Try different ingredients or broaden your filters.")
-                        # Show sample recipes
-                        st.markdown("### Here are some sample recipes:")
-                        for recipe in random.sample(RECIPES, min(3, len(RECIPES))):
-                            display_recipe(recipe)
+                    modes = {"Any ingredient": ANY_OF, "All ingredients": ALL_OF, "Cookable now": COOKABLE}
+                    query = RecipeQuery(
+                        user_input.split(','),
+                        mode=modes[match_mode],
+                        cuisines=cuisine_pref,
+                        max_time=max_time,
+                        max_missing=int(max_missing),
+                        text=technique,
+                        min_serves=serves_range[0] if serves_range[0] > 1 else None,
+                        max_serves=serves_range[1] if serves_range[1] < max_servings else None,
+                        max_scale=2.0 if allow_scaling else 1.0
+                    )
+                    recommender.record_query(SEARCH_QUERY, **query.as_params())
+                    # Narrowed queries only re-check the previous candidates
+                    query_state.update(query)
+                    # Impressions are logged once per search, not on every rerun
+                    events = get_event_logger()
+                    events.log(SEARCH, user=get_user_id(), query=f"{user_input} | {technique}")
+                    events.log_many(IMPRESSION, [i for i in query_state.candidate_ids if snapshot.alive[i]],
+                                    get_user_id(), user_input)
                 except Exception as p:
+                    query_state.clear()
                     st.error(f"⚠️ Error finding recipes: {str(p)}")
                     logging.error(f"Recipe search error: {str(p)}")
 
+    # Results are kept as ids in the session, so reruns don't redo matching
+    if query_state.query is not None:
+        # Candidates are snapshot ids and may include recipes deleted since
+        result_ids = [i for i in query_state.candidate_ids if snapshot.alive[i]]
+        if result_ids:
+            st.success(f"🍽️ Found {len(result_ids)} matching recipes!")
+            for recipe_id in result_ids:
+                display_recipe(recipe_id)
+        elif submitted:
+            st.info(
+                "No recipes match your ingredients and filters. Try different ingredients or broaden your filters.")
+            # Show sample recipes
+            st.markdown("### Here are some sample recipes:")
+            for recipe_id in random.sample(live.index.tolist(), min(3, len(live))):
+                display_recipe(recipe_id, key_prefix="sample")
+
 
 def main() -> None:
     """Main application function"""
@@ -0,0 +1,122 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class OverloadedError(RuntimeError):
+    """A request was shed: the admission queue was full or its deadline passed while it waited"""
+
+
+def deadline_after(timeout: Optional[float]) -> Optional[float]:
+    """time.monotonic() deadline `timeout` seconds from now (None for no deadline)"""
+    return None if timeout is None else time.monotonic() + timeout
+
+
+def expired(deadline: Optional[float]) -> bool:
+    return deadline is not None and time.monotonic() >= deadline
+
+
+class SingleFlight:
+    """Coalesce identical calls that are in flight at the same time
+
+    The first caller for a key runs the function; callers arriving with the
+    same key before it finishes wait for and share its result (or
+    exception) instead of repeating the work. A waiting caller gives up
+    with OverloadedError once its own deadline passes.
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any], deadline: Optional[float] = None) -> Any:
+        """Result of `fn`, or of the identical call already in flight
+
+        Args:
+            deadline: time.monotonic() after which to stop waiting for another caller's result
+
+        Raises:
+            OverloadedError: If the deadline passed while waiting
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            try:
+                return call.result(None if deadline is None else max(0.0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                raise OverloadedError("Request deadline passed waiting for an identical request") from None
+        try:
+            result = fn()
+            call.set_result(result)
+            return result
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+
+class AdmissionController:
+    """Bounded worker pool that sheds load instead of queueing without limit
+
+    At most `max_workers` requests run at once and at most `max_queue` wait
+    for a worker. A request beyond that is rejected immediately with
+    OverloadedError, and a queued request whose deadline has passed by the
+    time a worker picks it up is dropped the same way, so the queue never
+    holds work nobody is waiting for and tail latency stays bounded by the
+    queue length.
+    """
+
+    def __init__(self, max_workers: int = 4, max_queue: int = 32):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.admitted = 0
+        self.rejected = 0
+        self.expired = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers, thread_name_prefix="admission")
+
+    def submit(self, fn: Callable[[], Any], deadline: Optional[float] = None) -> Future:
+        """Queue `fn` for a worker
+
+        Raises:
+            OverloadedError: If max_workers + max_queue requests are already pending
+        """
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise OverloadedError(f"Server overloaded: {self._pending} requests pending")
+            self._pending += 1
+            self.admitted += 1
+        return self._pool.submit(self._run, fn, deadline)
+
+    def _run(self, fn: Callable[[], Any], deadline: Optional[float]) -> Any:
+        try:
+            if expired(deadline):
+                with self._lock:
+                    self.expired += 1
+                raise OverloadedError("Request deadline passed while queued")
+            return fn()
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {'pending': self._pending, 'admitted': self.admitted, 'rejected': self.rejected,
+                'expired': self.expired, 'max_workers': self.max_workers, 'max_queue': self.max_queue}
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
@@ -0,0 +1,259 @@
+import argparse
+import random
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from experiments import overlap_at_k
+from train import STRATEGIES, RecipeRecommender
+
+
+def sample_queries(recommender: RecipeRecommender, n: int = 200, seed: int = 0) -> List[str]:
+    """Ingredient strings built from random subsets of catalog recipes
+
+    Only ingredients known to the model are used, so no query falls back to
+    a random sample.
+    """
+    rng = random.Random(seed)
+    known = recommender.model.wv
+    lists = [[i for i in ings if i in known] for ings in recommender.df['ingredients']]
+    lists = [ings for ings in lists if ings]
+    queries = []
+    for _ in range(n):
+        ingredients = rng.choice(lists)
+        queries.append(",".join(rng.sample(ingredients, rng.randint(1, min(4, len(ingredients))))))
+    return queries
+
+
+def sample_recipe_queries(recommender: RecipeRecommender, n: int = 200, seed: int = 0,
+                          size: int = 3) -> List[Tuple[str, int]]:
+    """Partial ingredient lists of random live recipes, with the recipe they came from
+
+    A strategy that ranks the source recipe near the top for a few of its
+    own ingredients is recovering the recipe the pantry was taken from.
+    """
+    rng = random.Random(seed)
+    known = recommender.model.wv
+    snapshot = recommender.snapshot
+    candidates = [int(i) for i in np.flatnonzero(snapshot.alive)
+                  if sum(ing in known for ing in snapshot.df['ingredients'].iat[i]) > size]
+    queries = []
+    for recipe_id in rng.sample(candidates, min(n, len(candidates))):
+        ingredients = [i for i in snapshot.df['ingredients'].iat[recipe_id] if i in known]
+        queries.append((",".join(rng.sample(ingredients, size)), recipe_id))
+    return queries
+
+
+def compare_strategies(recommender: RecipeRecommender, queries: Sequence[Tuple[str, int]],
+                       strategies: Sequence[str] = STRATEGIES) -> List[Dict[str, Any]]:
+    """Recall and latency of each recommendation strategy on the same queries
+
+    Args:
+        recommender: Recommender under test; its result cache is cleared
+            before each strategy so every query is computed
+        queries: (ingredient string, source recipe id) pairs from sample_recipe_queries
+        strategies: Strategies to compare; overlap is measured against the first
+    Returns:
+        One row per strategy with hit rate of the source recipe in the top
+        n_neighbors, p50/p95 latency in milliseconds and mean overlap@k
+        with the first strategy's results
+    """
+    k = recommender.n_neighbors
+    baseline: List[np.ndarray] = []
+    rows = []
+    for strategy in strategies:
+        recommender.result_cache.clear()
+        recommender.recommend(queries[0][0], strategy=strategy)  # Build per-snapshot structures untimed
+        recommender.result_cache.clear()
+        latency, hits, results = [], 0, []
+        for query, recipe_id in queries:
+            start = time.perf_counter()
+            ids = np.asarray(recommender.recommend(query, strategy=strategy).index)
+            latency.append(time.perf_counter() - start)
+            hits += recipe_id in ids[:k]
+            results.append(ids)
+        baseline = baseline or results
+        p50, p95 = np.percentile(1000 * np.asarray(latency), [50, 95])
+        rows.append({
+            'strategy': strategy,
+            'hit_rate': hits / len(queries),
+            'p50_ms': float(p50),
+            'p95_ms': float(p95),
+            'overlap': float(np.mean([overlap_at_k(a, b, k) for a, b in zip(baseline, results)])),
+        })
+    return rows
+
+
+def _same_result(result: pd.DataFrame, expected: pd.DataFrame) -> bool:
+    """Same recipes, or the same scores where ties may be broken differently after a refit"""
+    if len(result) != len(expected):
+        return False
+    if list(result.index) == list(expected.index):
+        return True
+    return np.allclose(result['similarity'], expected['similarity'], atol=1e-5)
+
+
+def _churn(recommender: RecipeRecommender, stop: threading.Event, errors: List[str]) -> int:
+    """Add, update and delete throwaway recipes and compact until stopped
+
+    The throwaway recipes use ingredients the model has never seen, so they
+    embed to zero vectors and never outrank a real recipe: readers must keep
+    getting exactly the serial results while the catalog changes under them.
+    """
+    n_writes = 0
+    while not stop.is_set():
+        recipe = {'name': f"Stress Recipe {n_writes}", 'ingredients': f"stress_ingredient_{n_writes}",
+                  'steps': "Stir", 'cuisine': "Stress", 'cooking_time': 1, 'serves': 1}
+        try:
+            recipe_id = recommender.add_recipe(recipe)
+            recipe_id = recommender.update_recipe(recipe_id, {**recipe, 'serves': 2})
+            recommender.delete_recipe(recipe_id)
+            if n_writes % 10 == 9:
+                recommender.compact()
+        except Exception as e:
+            errors.append(f"writer: {e!r}")
+        n_writes += 1
+    return n_writes
+
+
+def stress(recommender: RecipeRecommender, queries: Sequence[str], n_threads: int = 8,
+           rounds: int = 5, churn: bool = True) -> Dict[str, Any]:
+    """Run the same queries from many threads and compare with serial answers
+
+    Args:
+        recommender: Recommender under test
+        queries: Ingredient strings; each must match at least one known ingredient
+        n_threads: Concurrent reader threads
+        rounds: Times every thread runs through the queries
+        churn: Also add/update/delete recipes and compact on a writer thread
+    Returns:
+        Counts of queries, mismatches, errors and writes, plus error messages
+    """
+    if churn:
+        # Start from a freshly fitted index so refits during the run reproduce it
+        recommender.compact()
+    expected = [recommender.recommend(q) for q in queries]
+    errors: List[str] = []
+    mismatches = [0] * n_threads
+
+    def reader(worker: int) -> None:
+        order = list(range(len(queries)))
+        rng = random.Random(worker)
+        for _ in range(rounds):
+            rng.shuffle(order)
+            for i in order:
+                try:
+                    if not _same_result(recommender.recommend(queries[i]), expected[i]):
+                        mismatches[worker] += 1
+                except Exception as e:
+                    errors.append(f"reader {worker}: {e!r}")
+
+    stop = threading.Event()
+    with ThreadPoolExecutor(max_workers=n_threads + 1) as pool:
+        writer = pool.submit(_churn, recommender, stop, errors) if churn else None
+        readers = [pool.submit(reader, worker) for worker in range(n_threads)]
+        for future in readers:
+            future.result()
+        stop.set()
+        n_writes = writer.result() if writer else 0
+
+    return {
+        'queries': len(queries) * rounds * n_threads,
+        'mismatches': sum(mismatches),
+        'errors': len(errors),
+        'writes': n_writes,
+        'messages': errors[:10],
+    }
+
+
+def throughput(recommender: RecipeRecommender, queries: Sequence[str],
+               thread_counts: Sequence[int] = (1, 2, 4, 8), duration: float = 2.0) -> List[Dict[str, Any]]:
+    """Queries per second with a growing number of reader threads
+
+    The result cache (off unless the recommender was built with one) is
+    cleared before each thread count, so a row's cache hits are only
+    repeats within that run.
+
+    Returns:
+        One row per thread count with QPS, speedup over the first count,
+        mean latency in milliseconds and result cache hits and misses
+    """
+    cache = recommender.result_cache
+    rows = []
+    for n_threads in thread_counts:
+        cache.clear()
+        hits, misses = cache.hits, cache.misses
+        counts = [0] * n_threads
+        latency = [0.0] * n_threads
+        deadline = time.perf_counter() + duration
+
+        def reader(worker: int) -> None:
+            i = worker
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                recommender.recommend(queries[i % len(queries)])
+                latency[worker] += time.perf_counter() - start
+                counts[worker] += 1
+                i += n_threads
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=n_threads) as pool:
+            list(pool.map(reader, range(n_threads)))
+        elapsed = time.perf_counter() - start
+
+        total = sum(counts)
+        rows.append({
+            'threads': n_threads,
+            'qps': total / elapsed,
+            'latency_ms': 1000 * sum(latency) / max(1, total),
+            'cache_hits': cache.hits - hits,
+            'cache_misses': cache.misses - misses,
+        })
+    for row in rows:
+        row['speedup'] = row['qps'] / rows[0]['qps']
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Concurrency stress test and throughput benchmark")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--duration", type=float, default=2.0, help="Seconds per thread count")
+    parser.add_argument("--rounds", type=int, default=5, help="Stress test passes per thread")
+    parser.add_argument("--no-churn", action="store_true", help="Stress test without concurrent writes")
+    parser.add_argument("--strategies", action="store_true",
+                        help="Only compare recommendation strategies on partial recipes")
+    parser.add_argument("--result-cache", type=int, default=0,
+                        help="Cache this many results while measuring throughput (default: no cache)")
+    args = parser.parse_args(argv)
+
+    warnings.simplefilter("ignore")
+    recommender = RecipeRecommender(result_cache_size=args.result_cache)
+    if args.strategies:
+        k = recommender.n_neighbors
+        print(f"{'strategy':>10} {'hit@' + str(k):>7} {'p50':>9} {'p95':>9} {'overlap@' + str(k):>10}")
+        for row in compare_strategies(recommender, sample_recipe_queries(recommender, args.queries)):
+            print(f"{row['strategy']:>10} {row['hit_rate']:>7.1%} {row['p50_ms']:>7.2f}ms {row['p95_ms']:>7.2f}ms "
+                  f"{row['overlap']:>10.1%}")
+        return
+    queries = sample_queries(recommender, args.queries)
+
+    report = stress(recommender, queries, max(args.threads), args.rounds, churn=not args.no_churn)
+    print(f"Stress: {report['queries']} queries, {report['writes']} writes, "
+          f"{report['mismatches']} mismatches, {report['errors']} errors")
+    for message in report['messages']:
+        print(f"  {message}")
+
+    print(f"{'threads':>7} {'qps':>10} {'speedup':>8} {'latency':>10} {'hits':>9} {'misses':>9}")
+    for row in throughput(recommender, queries, args.threads, args.duration):
+        print(f"{row['threads']:>7} {row['qps']:>10.0f} {row['speedup']:>7.2f}x {row['latency_ms']:>8.2f}ms "
+              f"{row['cache_hits']:>9} {row['cache_misses']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import NearestNeighbors
+
+from growable import GrowableArray
+from quantize import normalize_rows
+
+# Updates a cached value for the next snapshot: (old value, new snapshot) -> new value
+CacheUpdate = Callable[[Any, 'CatalogSnapshot'], Any]
+
+
+def _frozen(array: Optional[np.ndarray]) -> Optional[np.ndarray]:
+    """Mark an array read-only so shared snapshot state can't be mutated in place"""
+    if array is not None:
+        array.setflags(write=False)
+    return array
+
+
+def _column(buffer: GrowableArray) -> pd.Series:
+    """DataFrame column viewing an append buffer (object columns stay object, which avoids a copy)"""
+    view = buffer.view()
+    return pd.Series(view, dtype=view.dtype, copy=False)
+
+
+class CatalogSnapshot:
+    """Immutable view of the catalog that queries run against
+
+    Writers never modify a published snapshot; they build a new one with
+    `replace` and swap it in with a single attribute assignment, so a reader
+    that grabbed a snapshot keeps a consistent df/index pair without locking.
+
+    Recipe ids are df row positions and never change: deleted recipes stay as
+    tombstones (``alive[id] == False``) and compaction only drops them from
+    the search index and clears their payload.
+
+    Snapshot arrays are read-only, and `search` does its heavy lifting in
+    NumPy matrix products, which release the GIL, so any number of threads
+    can query one snapshot concurrently.
+    """
+
+    def __init__(self, recipes: List[Dict[str, Any]], df: pd.DataFrame, knn: Any = None,
+                 index_ids: Optional[np.ndarray] = None, delta_ids: Optional[np.ndarray] = None,
+                 delta: Optional[np.ndarray] = None, alive: Optional[np.ndarray] = None,
+                 version: int = 0):
+        """
+        Args:
+            recipes: Raw recipe dicts, aligned with df rows
+            df: Recipe DataFrame with normalized ingredient lists
+            knn: Fitted index (NearestNeighbors or QuantizedIndex)
+            index_ids: Recipe id of every row fitted into knn
+            delta_ids: Recipes added since knn was fitted
+            delta: Normalized embeddings of delta_ids, searched by brute force
+            alive: False for deleted recipes
+            version: Incremented on every published change
+        """
+        self.recipes = recipes
+        self.df = df
+        self.knn = knn
+        self.index_ids = _frozen(index_ids if index_ids is not None else np.arange(0, dtype=np.int64))
+        self.delta_ids = _frozen(delta_ids if delta_ids is not None else np.arange(0, dtype=np.int64))
+        self.delta = _frozen(delta)
+        self.alive = _frozen(alive if alive is not None else np.ones(len(df), dtype=bool))
+        self.version = version
+        self._cache: Dict[str, Any] = {}
+        # Append buffers behind df columns ('df:<column>'), alive, delta_ids and delta
+        self._buffers: Dict[str, GrowableArray] = {}
+
+    def replace(self, carry: Optional[Dict[str, CacheUpdate]] = None, **changes: Any) -> "CatalogSnapshot":
+        """New snapshot with some fields changed and a bumped version
+
+        Derived caches are dropped unless `carry` maps their key to an update
+        of the old value; keys that were never built stay unbuilt.
+        """
+        fields = {name: getattr(self, name) for name in
+                  ('recipes', 'df', 'knn', 'index_ids', 'delta_ids', 'delta', 'alive')}
+        fields.update(changes)
+        snapshot = CatalogSnapshot(version=self.version + 1, **fields)
+        snapshot._buffers = {key: buffer for key, buffer in self._buffers.items()
+                             if key.split(':')[0] not in changes}
+        for key, update in (carry or {}).items():
+            value = self._cache.get(key)
+            if value is not None:
+                snapshot._cache[key] = update(value, snapshot)
+        return snapshot
+
+    def _grown(self, key: str, length: int, rows: Any, build: Callable[[], GrowableArray]) -> GrowableArray:
+        """Append buffer of a field with `rows` added after its first `length` values"""
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = build()
+        return buffer.append(rows, length)
+
+    def with_recipe(self, recipe: Dict[str, Any], row: Dict[str, Any], embedding: np.ndarray,
+                    carry: Optional[Dict[str, CacheUpdate]] = None) -> "CatalogSnapshot":
+        """New snapshot with a recipe appended to the catalog and the brute-force delta
+
+        Columns, alive, delta_ids and delta grow in append buffers shared with
+        this snapshot rather than being copied. The catalog's own caches are
+        updated for the new row; other caches only if `carry` says how.
+
+        Args:
+            recipe: Raw recipe dict
+            row: Its DataFrame row (column -> value)
+            embedding: (1, dim) normalized embedding
+        """
+        recipe_id = len(self.alive)
+        buffers = {
+            f"df:{column}": self._grown(f"df:{column}", len(self.df), [row.get(column)],
+                                        lambda column=column: GrowableArray.of_column(self.df[column]))
+            for column in self.df.columns
+        }
+        delta = self.delta if self.delta is not None else np.zeros((0, embedding.shape[1]), dtype=np.float32)
+        buffers['alive'] = self._grown('alive', recipe_id, [True], lambda: GrowableArray(self.alive))
+        buffers['delta_ids'] = self._grown('delta_ids', len(self.delta_ids), [recipe_id],
+                                           lambda: GrowableArray(self.delta_ids))
+        buffers['delta'] = self._grown('delta', len(delta), embedding, lambda: GrowableArray(delta))
+
+        name = str(row['name']).lower()
+        n_delta = len(self.delta_ids)
+
+        def add_name(index: Dict[str, int], _: "CatalogSnapshot") -> Dict[str, int]:
+            index = dict(index)
+            index.setdefault(name, recipe_id)
+            return index
+
+        snapshot = self.replace(
+            carry={
+                'index_matrix': lambda matrix, _: matrix,
+                'dead_indexed': lambda n, _: n,
+                'index_rows': lambda rows, _: _frozen(np.append(rows, -1)),
+                'delta_rows': lambda rows, _: _frozen(np.append(rows, n_delta)),
+                'name_index': add_name,
+                **(carry or {}),
+            },
+            recipes=self.recipes + [recipe],
+            df=pd.DataFrame({column: _column(buffers[f"df:{column}"]) for column in self.df.columns}, copy=False),
+            alive=buffers['alive'].view(),
+            delta_ids=buffers['delta_ids'].view(),
+            delta=buffers['delta'].view(),
+        )
+        snapshot._buffers.update(buffers)
+        return snapshot
+
+    def without_recipe(self, recipe_id: int, carry: Optional[Dict[str, CacheUpdate]] = None) -> "CatalogSnapshot":
+        """New snapshot with a recipe tombstoned, updating the catalog's caches and those in `carry`"""
+        alive = self.alive.copy()
+        alive[recipe_id] = False
+        name = str(self.df['name'].iat[recipe_id]).lower()
+
+        def indexed() -> bool:
+            return bool(self._rows('index_rows', self.index_ids)[recipe_id] >= 0)
+
+        def drop_name(index: Dict[str, int], snapshot: "CatalogSnapshot") -> Dict[str, int]:
+            if index.get(name) != recipe_id:
+                return index
+            index = dict(index)
+            del index[name]
+            # Any other recipe with the name has a higher id, since the deleted one was the first
+            later = snapshot.df['name'].iloc[recipe_id + 1:]
+            for i in recipe_id + 1 + np.flatnonzero(later.str.lower().to_numpy() == name):
+                if snapshot.alive[i]:
+                    index[name] = int(i)
+                    break
+            return index
+
+        return self.replace(
+            carry={
+                'index_matrix': lambda matrix, _: matrix,
+                'dead_indexed': lambda n, _: n + indexed(),
+                'index_rows': lambda rows, _: rows,
+                'delta_rows': lambda rows, _: rows,
+                'name_index': drop_name,
+                **(carry or {}),
+            },
+            alive=alive,
+        )
+
+    def cached(self, key: str, build: Callable[[], Any]) -> Any:
+        """Derived structure built once per snapshot
+
+        Concurrent first calls may both build; setdefault keeps the first
+        result so every reader sees the same object.
+        """
+        value = self._cache.get(key)
+        if value is None:
+            value = self._cache.setdefault(key, build())
+        return value
+
+    @property
+    def name_index(self) -> Dict[str, int]:
+        """Lower-cased name -> id of the first live recipe with that name"""
+        def build() -> Dict[str, int]:
+            index: Dict[str, int] = {}
+            for i in np.flatnonzero(self.alive):
+                index.setdefault(self.df['name'].iat[i].lower(), int(i))
+            return index
+        return self.cached('name_index', build)
+
+    @property
+    def n_deleted(self) -> int:
+        return int((~self.alive).sum())
+
+    def garbage_ratio(self) -> float:
+        """Share of searched rows that are tombstones or still in the brute-force delta"""
+        dead_indexed = int((~self.alive[self.index_ids]).sum()) if len(self.index_ids) else 0
+        return (dead_indexed + len(self.delta_ids)) / max(1, len(self.index_ids) + len(self.delta_ids))
+
+    def _index_matrix(self) -> np.ndarray:
+        """Normalized float32 copy of the vectors an exact sklearn index was fitted on"""
+        return self.cached('index_matrix', lambda: _frozen(normalize_rows(self.knn._fit_X)))
+
+    def _dead_indexed(self) -> int:
+        return self.cached('dead_indexed', lambda: int((~self.alive[self.index_ids]).sum()))
+
+    def _rows(self, key: str, ids: np.ndarray) -> np.ndarray:
+        """Recipe id -> position in `ids` (-1 if absent)"""
+        def build() -> np.ndarray:
+            rows = np.full(len(self.alive), -1, dtype=np.int64)
+            rows[ids] = np.arange(len(ids))
+            return _frozen(rows)
+        return self.cached(key, build)
+
+    def vectors(self, ids: np.ndarray) -> Optional[np.ndarray]:
+        """Normalized embeddings of recipes as searched, None if the index doesn't keep its vectors"""
+        matrix = None
+        if self.knn is not None and len(self.index_ids):
+            matrix = self._index_matrix() if isinstance(self.knn, NearestNeighbors) else getattr(self.knn, 'exact', None)
+            if matrix is None:
+                return None
+        if matrix is None and self.delta is None:
+            return None
+
+        vectors = np.zeros((len(ids), (matrix if matrix is not None else self.delta).shape[1]), dtype=np.float32)
+        if matrix is not None:
+            rows = self._rows('index_rows', self.index_ids)[ids]
+            vectors[rows >= 0] = matrix[rows[rows >= 0]]
+        if self.delta is not None:
+            rows = self._rows('delta_rows', self.delta_ids)[ids]
+            vectors[rows >= 0] = self.delta[rows[rows >= 0]]
+        return vectors
+
+    def search(self, query_vec: np.ndarray, k: int, deadline: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k live recipes by cosine distance over the fitted index and the delta
+
+        A compressed index skips its exact re-ranking once `deadline`
+        (time.monotonic()) has passed; exact search is one matrix product
+        and always completes.
+
+        Returns:
+            Cosine distances and recipe ids, nearest first
+        """
+        query = normalize_rows(np.asarray(query_vec)[None, :])[0]
+        distances, ids = [], []
+        n_fit = len(self.index_ids)
+        if self.knn is not None and n_fit:
+            # Ask for extra neighbors so tombstones can be skipped
+            n_wanted = min(k + self._dead_indexed(), n_fit)
+            if isinstance(self.knn, NearestNeighbors):
+                # Exact cosine search as one matrix-vector product instead of going through sklearn
+                knn_dist = 1 - self._index_matrix() @ query
+                knn_rows = np.argpartition(knn_dist, n_wanted - 1)[:n_wanted]
+                knn_dist = knn_dist[knn_rows]
+            else:
+                knn_dist, knn_rows = self.knn.kneighbors([query], n_neighbors=n_wanted, deadline=deadline)
+                knn_dist, knn_rows = knn_dist[0], knn_rows[0]
+            distances.append(np.asarray(knn_dist, dtype=np.float64))
+            ids.append(self.index_ids[knn_rows])
+        if len(self.delta_ids):
+            distances.append(1 - (self.delta @ query).astype(np.float64))
+            ids.append(self.delta_ids)
+        if not ids:
+            return np.zeros(0), np.zeros(0, dtype=np.int64)
+
+        distances, ids = np.concatenate(distances), np.concatenate(ids)
+        keep = self.alive[ids]
+        distances, ids = distances[keep], ids[keep]
+        order = np.argsort(distances, kind='stable')[:k]
+        return distances[order], ids[order]
+
+
+class BackgroundCompactor:
+    """Daemon thread that compacts the catalog when tombstones pile up"""
+
+    def __init__(self, recommender: Any, interval: float = 60.0, min_garbage: float = 0.1):
+        self.recommender = recommender
+        self.interval = interval
+        self.min_garbage = min_garbage
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="catalog-compactor", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            if self.recommender.snapshot.garbage_ratio() >= self.min_garbage:
+                self.recommender.compact()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
@@ -0,0 +1,87 @@
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from vocab import IngredientVocabulary
+
+
+class IngredientCooccurrence:
+    """Sparse ingredient co-occurrence counts built from the recipe catalog
+
+    `matrix[a, b]` is the number of recipes using both a and b, and
+    `counts[a]` the number of recipes using a. Both grow in place as recipes
+    are added, so the catalog never has to be rescanned.
+    """
+
+    def __init__(self, ingredient_lists: Sequence[Iterable[str]] = (),
+                 vocab: Optional[IngredientVocabulary] = None):
+        self.vocab = vocab if vocab is not None else IngredientVocabulary()
+        self.n_recipes = 0
+        self.counts = np.zeros(0, dtype=np.float32)
+        self.matrix = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self.add_recipes(ingredient_lists)
+
+    def add_recipes(self, ingredient_lists: Sequence[Iterable[str]]) -> None:
+        """Add the co-occurrences of new recipes"""
+        ingredient_lists = list(ingredient_lists)
+        if not ingredient_lists:
+            return
+        incidence = self.vocab.incidence(ingredient_lists)
+        size = len(self.vocab)
+        if self.matrix.shape[0] != size:
+            self.matrix.resize((size, size))
+            self.counts = np.pad(self.counts, (0, size - len(self.counts)))
+        self.matrix = (self.matrix + incidence.T @ incidence).tocsr()
+        self.counts += np.asarray(incidence.sum(axis=0)).ravel()
+        self.n_recipes += len(ingredient_lists)
+
+    def scores(self, pantry: Iterable[str], method: str = "conditional") -> np.ndarray:
+        """Score every ingredient against the pantry
+
+        Args:
+            pantry: Normalized ingredient names
+            method: 'conditional' sums P(candidate | pantry item) over the
+                pantry, 'pmi' sums positive pointwise mutual information
+        Returns:
+            Score per vocabulary id (pantry items and unrelated ingredients are 0)
+        """
+        pantry_ids = self.vocab.lookup(pantry)
+        # The vocabulary may be shared with indexes that interned newer ingredients
+        pantry_ids = pantry_ids[pantry_ids < len(self.counts)]
+        if not len(pantry_ids):
+            return np.zeros(len(self.counts), dtype=np.float32)
+
+        rows = self.matrix[pantry_ids]
+        if method == "conditional":
+            # Weighted sparse row-sum: sum_p C[p, j] / count[p]
+            scores = rows.T @ (1 / self.counts[pantry_ids])
+        elif method == "pmi":
+            rows = rows.tocoo()
+            pmi = np.log(rows.data * self.n_recipes
+                         / (self.counts[pantry_ids][rows.row] * self.counts[rows.col]))
+            scores = np.bincount(rows.col, weights=np.maximum(pmi, 0), minlength=rows.shape[1])
+        else:
+            raise ValueError(f"Unknown method '{method}'")
+
+        scores[pantry_ids] = 0
+        return scores
+
+    def suggest(self, pantry: Iterable[str], n: int = 5, method: str = "conditional") -> List[Tuple[str, float]]:
+        """Ingredients most likely to go with the pantry, best first
+
+        Falls back to the most common ingredients when nothing in the pantry is known.
+        """
+        pantry = list(pantry)
+        scores = self.scores(pantry, method)
+        if not scores.any():
+            scores = self.counts.copy()
+            known = self.vocab.lookup(pantry)
+            scores[known[known < len(scores)]] = 0
+
+        n = min(n, int((scores > 0).sum()))
+        if n <= 0:
+            return []
+        top = np.argpartition(-scores, n - 1)[:n]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(self.vocab.names[i], float(scores[i])) for i in top]
@@ -0,0 +1,102 @@
+from typing import Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from growable import GrowableArray
+from vocab import IngredientVocabulary
+
+# Set bits in every possible byte value
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def popcount_rows(words: np.ndarray) -> np.ndarray:
+    """Number of set bits in each row of a (n_rows, n_words) uint64 array"""
+    as_bytes = np.ascontiguousarray(words).view(np.uint8)
+    return _POPCOUNT[as_bytes].sum(axis=1, dtype=np.int32)
+
+
+class CookableIndex:
+    """Recipe ingredient sets encoded as bitsets over the ingredient vocabulary
+
+    Each recipe is a row of packed uint64 words, so "which ingredients of
+    this recipe are not in the pantry" is ``recipe & ~pantry`` and the number
+    missing is its popcount, computed for the whole catalog (or a candidate
+    subset) in a few vectorized operations.
+    """
+
+    def __init__(self, ingredient_lists: Sequence[Iterable[str]] = (),
+                 vocab: Optional[IngredientVocabulary] = None):
+        self.vocab = vocab if vocab is not None else IngredientVocabulary()
+        self.bits = np.zeros((0, 1), dtype=np.uint64)
+        self._buffer: Optional[GrowableArray] = None  # set while bits is a view of an append buffer
+        self.add_recipes(ingredient_lists)
+
+    @property
+    def n_words(self) -> int:
+        return self.bits.shape[1]
+
+    def encode(self, ingredient_ids: Iterable[int]) -> np.ndarray:
+        """Pack ingredient ids into one bitset row"""
+        row = np.zeros(self.n_words, dtype=np.uint64)
+        for i in ingredient_ids:
+            row[i >> 6] |= np.uint64(1) << np.uint64(i & 63)
+        return row
+
+    def add_recipes(self, ingredient_lists: Sequence[Iterable[str]]) -> None:
+        """Append recipes, widening every row if the vocabulary outgrew the bitsets"""
+        id_lists = [[self.vocab.add(i) for i in ingredients] for ingredients in ingredient_lists]
+        n_words = max(self.n_words, -(-len(self.vocab) // 64))
+        if n_words > self.n_words:
+            self.bits = np.pad(self.bits, ((0, 0), (0, n_words - self.n_words)))
+        if id_lists:
+            self.bits = np.vstack([self.bits] + [self.encode(ids)[None, :] for ids in id_lists])
+        self._buffer = None
+
+    def appended(self, ingredients: Iterable[str], vocab: Optional[IngredientVocabulary] = None) -> "CookableIndex":
+        """New index with one more recipe, leaving this one untouched
+
+        Rows live in an append buffer shared with this index, so adding a
+        recipe doesn't copy the bitsets unless the vocabulary outgrew them.
+
+        Args:
+            vocab: This index's vocabulary or an extension of it (default: this one, grown in place)
+        """
+        index = CookableIndex(vocab=self.vocab if vocab is None else vocab)
+        ids = [index.vocab.add(i) for i in ingredients]
+        n_words = max(self.n_words, -(-len(index.vocab) // 64))
+        buffer = self._buffer
+        if buffer is None or n_words > self.n_words:
+            buffer = GrowableArray(np.pad(self.bits, ((0, 0), (0, n_words - self.n_words))))
+        index.bits = np.zeros((0, n_words), dtype=np.uint64)
+        index._buffer = buffer.append(index.encode(ids)[None, :], len(self.bits))
+        index.bits = index._buffer.view()
+        return index
+
+    def set_recipe(self, recipe_id: int, ingredients: Iterable[str]) -> None:
+        """Replace the ingredient set of an existing recipe"""
+        ids = [self.vocab.add(i) for i in ingredients]
+        self.add_recipes([])  # widen for any new ingredient
+        self.bits[recipe_id] = self.encode(ids)
+
+    def missing_counts(self, pantry: Iterable[str], candidates: Optional[np.ndarray] = None) -> np.ndarray:
+        """Number of ingredients each recipe needs beyond the pantry
+
+        Pantry items outside the vocabulary are ignored.
+        """
+        pantry_bits = self.encode(self.vocab.lookup(pantry))
+        rows = self.bits if candidates is None else self.bits[candidates]
+        return popcount_rows(rows & ~pantry_bits)
+
+    def cookable(self, pantry: Iterable[str], max_missing: int = 0,
+                 candidates: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Recipes fully covered by the pantry, or missing at most `max_missing` ingredients
+
+        Returns:
+            Recipe ids and their missing counts, fewest missing first
+        """
+        ids = np.arange(len(self.bits)) if candidates is None else np.asarray(candidates, dtype=np.int64)
+        missing = self.missing_counts(pantry, ids)
+        keep = missing <= max_missing
+        ids, missing = ids[keep], missing[keep]
+        order = np.argsort(missing, kind='stable')
+        return ids[order], missing[order]
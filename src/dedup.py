@@ -0,0 +1,159 @@
+import argparse
+import hashlib
+import itertools
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+import numpy as np
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def _normalize(text: str) -> str:
+    return text.strip().lower().replace(' ', '_')
+
+
+def recipe_shingles(recipe: Dict[str, Any], name_k: int = 3) -> Set[str]:
+    """Tokens compared between recipes: normalized ingredients plus name character k-grams"""
+    ingredients = recipe['ingredients']
+    if isinstance(ingredients, str):
+        ingredients = ingredients.split(',')
+    tokens = {'i:' + _normalize(i) for i in ingredients if i.strip()}
+    name = f" {recipe['name'].strip().lower()} "
+    tokens.update('n:' + name[i:i + name_k] for i in range(max(1, len(name) - name_k + 1)))
+    return tokens
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+class MinHasher:
+    """MinHash signatures from universal hash functions h(x) = ((a*x + b) mod p) mod 2^32"""
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        # a*x + b must wrap around p many times to mix the tokens; with small
+        # multipliers it stays nearly linear in x and every function picks the
+        # same minimum. uint64 overflow in the product is harmless here.
+        self.a = rng.integers(1, _MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, _MERSENNE_PRIME, num_perm, dtype=np.uint64)
+
+    @staticmethod
+    def _token_hashes(tokens: Iterable[str]) -> np.ndarray:
+        return np.asarray([int.from_bytes(hashlib.blake2b(t.encode(), digest_size=4).digest(), 'little')
+                           for t in tokens], dtype=np.uint64)
+
+    def signature(self, tokens: Iterable[str]) -> np.ndarray:
+        hashes = self._token_hashes(tokens)
+        if not len(hashes):
+            return np.full(len(self.a), _MAX_HASH + 1, dtype=np.uint64)
+        return ((self.a[:, None] * hashes[None, :] + self.b[:, None]) % _MERSENNE_PRIME & _MAX_HASH).min(axis=1)
+
+
+def choose_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """Pick (bands, rows) whose LSH S-curve threshold (1/b)^(1/r) is closest to `threshold`"""
+    options = [(b, num_perm // b) for b in range(1, num_perm + 1) if num_perm % b == 0]
+    return min(options, key=lambda br: abs((1 / br[0]) ** (1 / br[1]) - threshold))
+
+
+def candidate_pairs(signatures: np.ndarray, bands: int, rows: int) -> Set[Tuple[int, int]]:
+    """Pairs of recipes sharing at least one LSH band bucket"""
+    pairs: Set[Tuple[int, int]] = set()
+    for band in range(bands):
+        buckets: Dict[bytes, List[int]] = {}
+        chunk = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        for i, row in enumerate(chunk):
+            buckets.setdefault(row.tobytes(), []).append(i)
+        for members in buckets.values():
+            if len(members) > 1:
+                pairs.update(itertools.combinations(members, 2))
+    return pairs
+
+
+def _merge_into(keeper: Dict[str, Any], duplicate: Dict[str, Any]) -> None:
+    """Fill fields the kept recipe lacks from a duplicate"""
+    for key, value in duplicate.items():
+        if keeper.get(key) in (None, "", []):
+            keeper[key] = value
+
+
+def deduplicate(recipes: List[Dict[str, Any]], threshold: float = 0.8, num_perm: int = 128,
+                action: str = "drop") -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Collapse near-duplicate recipes
+
+    Candidate pairs come from MinHash/LSH banding, so only recipes that share a
+    band bucket are compared; each candidate is confirmed with the exact
+    Jaccard similarity of its shingles.
+
+    Args:
+        recipes: Recipe dicts with 'name' and 'ingredients'
+        threshold: Jaccard similarity at or above which recipes are duplicates
+        num_perm: MinHash signature length
+        action: 'drop' keeps the first recipe of each group as-is, 'merge'
+            also fills its empty fields from the dropped duplicates
+    Returns:
+        The kept recipes (input order) and one report entry per collapsed group
+    """
+    if action not in ("drop", "merge"):
+        raise ValueError(f"Unknown action '{action}'")
+
+    shingles = [recipe_shingles(r) for r in recipes]
+    hasher = MinHasher(num_perm)
+    signatures = np.asarray([hasher.signature(s) for s in shingles]).reshape(len(recipes), num_perm)
+    bands, rows = choose_bands(num_perm, threshold)
+
+    # Union-find over confirmed pairs, the lowest index is the group root
+    parent = list(range(len(recipes)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    similarity: Dict[int, float] = {}
+    for i, j in candidate_pairs(signatures, bands, rows):
+        score = jaccard(shingles[i], shingles[j])
+        if score >= threshold:
+            root_i, root_j = find(i), find(j)
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+            similarity[j] = max(similarity.get(j, 0.0), score)
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(recipes)):
+        groups.setdefault(find(i), []).append(i)
+
+    kept, report = [], []
+    for root in sorted(groups):
+        members = groups[root]
+        keeper = dict(recipes[root])
+        if len(members) > 1:
+            if action == "merge":
+                for i in members[1:]:
+                    _merge_into(keeper, recipes[i])
+            report.append({
+                'kept': recipes[root]['name'],
+                'collapsed': [recipes[i]['name'] for i in members[1:]],
+                'similarity': min(similarity.get(i, threshold) for i in members[1:]),
+            })
+        kept.append(keeper)
+    return kept, report
+
+
+def main() -> None:
+    from train import _load_recipe_data
+
+    parser = argparse.ArgumentParser(description="Report near-duplicate recipes in the built-in catalog")
+    parser.add_argument("--threshold", type=float, default=0.8)
+    args = parser.parse_args()
+
+    recipes = _load_recipe_data()
+    kept, report = deduplicate(recipes, args.threshold)
+    for entry in report:
+        print(f"{entry['kept']} <- {', '.join(entry['collapsed'])} (jaccard >= {entry['similarity']:.2f})")
+    print(f"{len(recipes)} recipes, {len(kept)} after deduplication")
+
+
+if __name__ == "__main__":
+    main()
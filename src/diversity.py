@@ -0,0 +1,51 @@
+from typing import Optional
+
+import numpy as np
+
+
+def mmr(relevance: np.ndarray, vectors: np.ndarray, k: int, trade_off: float = 0.7,
+        groups: Optional[np.ndarray] = None, max_per_group: Optional[int] = None) -> np.ndarray:
+    """Maximal marginal relevance selection from a candidate pool
+
+    Greedily picks the candidate maximizing
+
+        trade_off * relevance - (1 - trade_off) * (max similarity to the picks so far)
+
+    Candidate-to-candidate cosine similarities are one matrix product up
+    front; after each pick the running max similarity is updated with one
+    row of it, so a pick costs O(pool) instead of O(pool * picks).
+
+    Args:
+        relevance: Score of every candidate for the query
+        vectors: Normalized candidate embeddings, one row per candidate
+        k: Number of candidates to pick
+        trade_off: 1 ranks by relevance only, 0 by novelty only
+        groups: Optional group code per candidate (e.g. cuisine)
+        max_per_group: Most picks allowed from one group, at least 1;
+            None for no quota
+    Returns:
+        Positions of the picked candidates in pick order (fewer than k if
+        the quotas run out of candidates)
+    """
+    if max_per_group is not None and max_per_group < 1:
+        raise ValueError(f"max_per_group must be at least 1, got {max_per_group}")
+    n = len(relevance)
+    k = min(k, n)
+    similarity = vectors @ vectors.T
+    max_similarity = np.zeros(n)
+    available = np.ones(n, dtype=bool)
+    group_counts = np.zeros(int(groups.max()) + 1 if n else 0, dtype=np.int64) if max_per_group is not None else None
+    picks = []
+    for _ in range(k):
+        scores = np.where(available, trade_off * relevance - (1 - trade_off) * max_similarity, -np.inf)
+        pick = int(np.argmax(scores))
+        if not available[pick]:
+            break
+        picks.append(pick)
+        available[pick] = False
+        np.maximum(max_similarity, similarity[pick], out=max_similarity)
+        if group_counts is not None:
+            group_counts[groups[pick]] += 1
+            if group_counts[groups[pick]] >= max_per_group:
+                available &= groups != groups[pick]
+    return np.asarray(picks, dtype=np.int64)
@@ -0,0 +1,188 @@
+import argparse
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+IMPRESSION = "impression"  # recipe shown in a result list
+CLICK = "click"            # recipe opened
+COOK = "cook"              # user marked the recipe as cooked
+SEARCH = "search"          # query submitted (recipe_id -1)
+EVENT_TYPES = (IMPRESSION, CLICK, COOK, SEARCH)
+
+SEGMENT_GLOB = "events-*.parquet"
+POPULARITY_FILE = "popularity.npy"
+CTR_FILE = "ctr.npy"
+
+_SCHEMA = pa.schema([
+    ('ts', pa.float64()),
+    ('event', pa.dictionary(pa.int8(), pa.string())),
+    ('recipe_id', pa.int32()),
+    ('user', pa.string()),
+    ('query', pa.string()),
+])
+
+
+class EventLogger:
+    """Non-blocking interaction log
+
+    `log` only appends a tuple to a bounded in-memory queue; a background
+    thread drains it and writes zstd-compressed Parquet segments, starting a
+    new segment every `segment_rows` events or `segment_seconds`. Segments
+    are written to a temporary name and renamed, so readers never see a
+    partial file. When the queue is full, events are dropped and counted
+    rather than slowing the caller down.
+    """
+
+    def __init__(self, log_dir: Path, segment_rows: int = 100_000, segment_seconds: float = 60.0,
+                 queue_size: int = 100_000):
+        self.log_dir = Path(log_dir)
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.segment_rows = segment_rows
+        self.segment_seconds = segment_seconds
+        self.dropped = 0
+        self.written = 0
+        self._queue: "queue.Queue[Optional[Tuple]]" = queue.Queue(queue_size)
+        self._sequence = 0
+        self._thread = threading.Thread(target=self._run, name="event-writer", daemon=True)
+        self._thread.start()
+
+    def log(self, event: str, recipe_id: int = -1, user: str = "", query: str = "") -> None:
+        """Record one event without blocking"""
+        try:
+            self._queue.put_nowait((time.time(), event, recipe_id, user, query))
+        except queue.Full:
+            self.dropped += 1
+
+    def log_many(self, event: str, recipe_ids: List[int], user: str = "", query: str = "") -> None:
+        """Record the same event for several recipes, e.g. the impressions of a result list"""
+        for recipe_id in recipe_ids:
+            self.log(event, int(recipe_id), user, query)
+
+    def _run(self) -> None:
+        rows: List[Tuple] = []
+        segment_started = time.monotonic()
+        while True:
+            timeout = max(0.0, segment_started + self.segment_seconds - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                self._write_segment(rows)
+                return
+            if item:
+                rows.append(item)
+            if len(rows) >= self.segment_rows or time.monotonic() - segment_started >= self.segment_seconds:
+                self._write_segment(rows)
+                rows = []
+                segment_started = time.monotonic()
+
+    def _write_segment(self, rows: List[Tuple]) -> None:
+        if not rows:
+            return
+        ts, event, recipe_id, user, query_text = zip(*rows)
+        table = pa.table({
+            'ts': pa.array(ts, pa.float64()),
+            'event': pa.array(event, pa.string()).dictionary_encode().cast(_SCHEMA.field('event').type),
+            'recipe_id': pa.array(recipe_id, pa.int32()),
+            'user': pa.array(user, pa.string()),
+            'query': pa.array(query_text, pa.string()),
+        }, schema=_SCHEMA)
+        self._sequence += 1
+        name = f"events-{int(ts[0] * 1000):015d}-{os.getpid()}-{self._sequence:06d}.parquet"
+        tmp_path = self.log_dir / (name + ".tmp")
+        pq.write_table(table, tmp_path, compression='zstd')
+        os.replace(tmp_path, self.log_dir / name)
+        self.written += len(rows)
+
+    def close(self) -> None:
+        """Flush queued events and stop the writer"""
+        self._queue.put(None)
+        self._thread.join()
+
+
+def aggregate(log_dir: Path, n_recipes: int, out_dir: Path, smoothing: float = 20.0) -> Dict[str, float]:
+    """Turn the event log into per-recipe popularity and CTR priors
+
+    Writes float32 arrays indexed by recipe id:
+        popularity.npy: log-scaled clicks plus cooks (cooks count 3x), scaled to [0, 1]
+        ctr.npy: clicks / impressions, smoothed towards the global CTR with
+            `smoothing` pseudo-impressions so rarely shown recipes aren't extreme
+
+    Returns:
+        Summary counts
+    """
+    counts = {event: np.zeros(n_recipes, dtype=np.int64) for event in EVENT_TYPES}
+    segments = sorted(Path(log_dir).glob(SEGMENT_GLOB))
+    n_searches = 0
+    for segment in segments:
+        table = pq.read_table(segment, columns=['event', 'recipe_id'])
+        # Compare dictionary codes instead of materializing event strings
+        events = table.column('event').combine_chunks()
+        names, codes = events.dictionary.to_pylist(), events.indices.to_numpy()
+        recipe_ids = table.column('recipe_id').to_numpy()
+        valid = (recipe_ids >= 0) & (recipe_ids < n_recipes)
+        for event in EVENT_TYPES:
+            if event not in names:
+                continue
+            is_event = codes == names.index(event)
+            if event == SEARCH:
+                n_searches += int(is_event.sum())
+            else:
+                counts[event] += np.bincount(recipe_ids[valid & is_event], minlength=n_recipes)
+
+    impressions, clicks, cooks = counts[IMPRESSION], counts[CLICK], counts[COOK]
+    global_ctr = clicks.sum() / max(1, impressions.sum())
+    # Clicks on recipes reached without a logged impression (e.g. by name) can outnumber impressions
+    ctr = np.minimum((clicks + smoothing * global_ctr) / (impressions + smoothing), 1.0)
+    popularity = np.log1p(clicks + 3 * cooks)
+    popularity /= max(popularity.max(), 1e-9)
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for name, array in ((POPULARITY_FILE, popularity), (CTR_FILE, ctr)):
+        tmp_path = out_dir / (name + ".tmp.npy")
+        np.save(tmp_path, array.astype(np.float32))
+        os.replace(tmp_path, out_dir / name)
+    return {
+        'segments': len(segments),
+        'impressions': int(impressions.sum()),
+        'clicks': int(clicks.sum()),
+        'cooks': int(cooks.sum()),
+        'searches': n_searches,
+        'global_ctr': float(global_ctr),
+    }
+
+
+def load_priors(priors_dir: Path) -> Optional[Dict[str, np.ndarray]]:
+    """Memory-map the aggregated priors, None if they haven't been computed"""
+    paths = {'popularity': Path(priors_dir) / POPULARITY_FILE, 'ctr': Path(priors_dir) / CTR_FILE}
+    if not all(path.exists() for path in paths.values()):
+        return None
+    return {name: np.load(path, mmap_mode='r') for name, path in paths.items()}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import warnings
+    from train import RecipeRecommender
+
+    parser = argparse.ArgumentParser(description="Aggregate the event log into popularity and CTR priors")
+    parser.add_argument("--smoothing", type=float, default=20.0, help="Pseudo-impressions for the CTR prior")
+    args = parser.parse_args(argv)
+
+    warnings.simplefilter("ignore")
+    recommender = RecipeRecommender()
+    summary = aggregate(recommender.EVENTS_DIR, len(recommender.df), recommender.PRIORS_DIR, args.smoothing)
+    print(", ".join(f"{key}: {value:.4g}" if isinstance(value, float) else f"{key}: {value}"
+                    for key, value in summary.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from gensim.models import Word2Vec
+
+from admission import SingleFlight
+from catalog import CatalogSnapshot
+from profiles import user_key
+from querylog import QueryRecorder
+from registry import MODEL_FILE, ModelRegistry
+from result_cache import ResultCache
+from train import RecipeRecommender
+
+# Version label of a recommender serving the unversioned models/ files
+DEFAULT_VERSION = "default"
+SHADOW = "shadow"  # kind of the lines in the shadow log
+
+
+class ModelVariant(RecipeRecommender):
+    """Another model/index version answering queries over the primary's catalog
+
+    The variant has its own Word2Vec model and index but no catalog of its
+    own: every query derives a snapshot from the primary's current one
+    (cached per snapshot), with recipes added since the variant's index was
+    built embedded by its model and searched by brute force. Catalog writes
+    must go through the primary.
+
+    User profiles and the similar-recipes table live in an embedding space,
+    so a variant keeps separate ones in its version directory.
+    """
+
+    def __init__(self, primary: RecipeRecommender, version: str, model: Word2Vec):
+        self.primary = primary
+        self.index_config = primary.index_config
+        self.n_neighbors = primary.n_neighbors
+        for name in ('BASE_DIR', 'MODEL_DIR', 'IMAGES_DIR', 'EVENTS_DIR', 'PRIORS_DIR', 'STATIC_IMAGES_DIR',
+                     'REGISTRY_DIR'):
+            setattr(self, name, getattr(primary, name))
+        self.model_version = version
+        self.ARTIFACT_DIR = ModelRegistry(self.REGISTRY_DIR).path(version)
+        self.SIMILAR_DIR = self.ARTIFACT_DIR / "similar"
+        self.USERS_DIR = self.ARTIFACT_DIR / "users"
+
+        self._write_lock = threading.RLock()
+        self.model = model
+        self._similar_table = None
+        self._compactor = None
+        self._profiles = None
+        self.result_cache = ResultCache(primary.result_cache.max_entries)
+        self.in_flight = SingleFlight()
+        self.query_recorder = None
+        self.store = None  # Catalog writes go through the primary
+        # Loaded from the version directory, or fitted on the primary's catalog and saved there
+        self._knn = self._load_or_build_knn()
+
+    @classmethod
+    def load(cls, primary: RecipeRecommender, version: str) -> "ModelVariant":
+        """Serve a registered version next to `primary`"""
+        registry = ModelRegistry(primary.REGISTRY_DIR)
+        registry.meta(version)
+        return cls(primary, version, Word2Vec.load(str(registry.path(version) / MODEL_FILE)))
+
+    @property
+    def _snapshot(self) -> CatalogSnapshot:
+        base = self.primary.snapshot
+        return base.cached(f"variant:{self.model_version}", lambda: self._derive(base))
+
+    @_snapshot.setter
+    def _snapshot(self, snapshot: CatalogSnapshot) -> None:
+        raise TypeError("Catalog changes go through the primary recommender")
+
+    @property
+    def df(self) -> pd.DataFrame:
+        return self.primary.df
+
+    @property
+    def _priors(self) -> Optional[Dict[str, np.ndarray]]:
+        return self.primary._priors
+
+    def reload_priors(self) -> None:
+        self.result_cache.clear()
+
+    def _derive(self, base: CatalogSnapshot) -> CatalogSnapshot:
+        """The primary's snapshot searched with this variant's index"""
+        # The index was fitted on a prefix of the catalog (checked when it was loaded)
+        n_fit = getattr(self._knn, 'n_samples_fit_', len(base.df))
+        delta_ids = np.arange(n_fit, len(base.df))
+        return CatalogSnapshot(base.recipes, base.df, self._knn, np.arange(n_fit), delta_ids,
+                               self._embed_rows(base.df, delta_ids), base.alive, base.version)
+
+
+def register_model(primary: RecipeRecommender, registry: ModelRegistry, version: str, model: Word2Vec,
+                   meta: Optional[Dict[str, Any]] = None) -> Path:
+    """Fit an index for `model` over the primary's catalog and register both as a version"""
+    registry.reserve(version)
+    variant = ModelVariant(primary, version, model)
+    return registry.register(version, model, variant.knn, {
+        'n_recipes': len(primary.df),
+        'index_config': primary.index_config,
+        'w2v_params': {'vector_size': model.vector_size, 'window': model.window,
+                       'min_count': model.min_count, 'epochs': model.epochs},
+        **(meta or {}),
+    })
+
+
+def overlap_at_k(a: np.ndarray, b: np.ndarray, k: int) -> float:
+    """Share of the top-k results two rankings have in common"""
+    return len(set(a[:k].tolist()) & set(b[:k].tolist())) / k if k else 0.0
+
+
+class ModelRouter:
+    """Serve a primary and an optional candidate model version side by side
+
+    Users are assigned to the candidate deterministically by hashing the
+    user id with a salt, so a user keeps seeing the same version; anonymous
+    requests always get the primary. With shadow scoring on, each request is
+    also answered by the other version on a background thread, and the
+    overlap@k of the two result lists is logged. Shadow work is dropped
+    rather than queued once `max_pending` requests are waiting, so it never
+    delays or backs up the served response.
+    """
+
+    def __init__(self, primary: RecipeRecommender, candidate: Optional[ModelVariant] = None,
+                 candidate_share: float = 0.0, shadow: bool = False, salt: str = "ab-1",
+                 shadow_log: Optional[Path] = None, max_pending: int = 100):
+        self.primary = primary
+        self.candidate = candidate
+        self.candidate_share = candidate_share
+        self.shadow = shadow and candidate is not None
+        self.salt = salt
+        self.max_pending = max_pending
+        self._shadow_log = QueryRecorder(shadow_log) if shadow_log and self.shadow else None
+        self._shadow_pool = ThreadPoolExecutor(1, thread_name_prefix="shadow") if self.shadow else None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._stats = {'shadowed': 0, 'dropped': 0, 'overlap_sum': 0.0}
+
+    @classmethod
+    def from_registry(cls, primary: RecipeRecommender, shadow_log: Optional[Path] = None) -> "ModelRouter":
+        """Router configured by models/registry/routing.json"""
+        routing = ModelRegistry(primary.REGISTRY_DIR).routing()
+        candidate = None
+        if routing['candidate'] is not None and routing['candidate'] != primary.model_version:
+            candidate = ModelVariant.load(primary, routing['candidate'])
+        return cls(primary, candidate, routing['candidate_share'], routing['shadow'], routing['salt'], shadow_log)
+
+    @staticmethod
+    def version_of(recommender: RecipeRecommender) -> str:
+        return recommender.model_version or DEFAULT_VERSION
+
+    def choose(self, user_id: Optional[str]) -> RecipeRecommender:
+        """Version serving a user"""
+        if self.candidate is None or user_id is None or self.candidate_share <= 0:
+            return self.primary
+        bucket = int(user_key(f"{self.salt}:{user_id}")) / 2.0 ** 64
+        return self.candidate if bucket < self.candidate_share else self.primary
+
+    def recommend(self, user_input: str, user_id: Optional[str] = None,
+                  **options: Any) -> Tuple[pd.DataFrame, str]:
+        """
+        Recommendations from the version assigned to the user
+        Args:
+            options: Passed on to RecipeRecommender.recommend (diversity, max_per_cuisine, strategy, deadline)
+        Returns:
+            Results as from RecipeRecommender.recommend and the serving version's name
+        """
+        served = self.choose(user_id)
+        results = served.recommend(user_input, user_id, **options)
+        if self.shadow and ('similarity' in results or 'score' in results):
+            other = self.primary if served is self.candidate else self.candidate
+            # Shadow scoring runs off the request path, without the request's deadline
+            shadow_options = {key: value for key, value in options.items() if key != 'deadline'}
+            self._submit_shadow(served, other, user_input, user_id, shadow_options, results.index.to_numpy())
+        return results, self.version_of(served)
+
+    def _submit_shadow(self, served: RecipeRecommender, other: RecipeRecommender, user_input: str,
+                       user_id: Optional[str], options: Dict[str, Any], served_ids: np.ndarray) -> None:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._stats['dropped'] += 1
+                return
+            self._pending += 1
+        self._shadow_pool.submit(self._score_shadow, served, other, user_input, user_id, options, served_ids)
+
+    def _score_shadow(self, served: RecipeRecommender, other: RecipeRecommender, user_input: str,
+                      user_id: Optional[str], options: Dict[str, Any], served_ids: np.ndarray) -> None:
+        try:
+            shadow_results = other.recommend(user_input, user_id, **options)
+            if 'similarity' not in shadow_results and 'score' not in shadow_results:
+                return
+            k = self.primary.n_neighbors
+            overlap = overlap_at_k(served_ids, shadow_results.index.to_numpy(), k)
+            with self._lock:
+                self._stats['shadowed'] += 1
+                self._stats['overlap_sum'] += overlap
+            if self._shadow_log is not None:
+                self._shadow_log.log(SHADOW, ingredients=user_input, user=user_id, served=self.version_of(served),
+                                     shadow=self.version_of(other), k=k, overlap=overlap)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def reload_priors(self) -> None:
+        self.primary.reload_priors()
+        if self.candidate is not None:
+            self.candidate.reload_priors()
+
+    def stats(self) -> Dict[str, Any]:
+        """Serving configuration and shadow overlap so far"""
+        with self._lock:
+            shadowed = self._stats['shadowed']
+            return {
+                'primary': self.version_of(self.primary),
+                'candidate': None if self.candidate is None else self.version_of(self.candidate),
+                'candidate_share': self.candidate_share,
+                'shadowed': shadowed,
+                'shadow_dropped': self._stats['dropped'],
+                'mean_overlap': self._stats['overlap_sum'] / shadowed if shadowed else None,
+            }
+
+    def close(self) -> None:
+        """Finish queued shadow work and flush the shadow log"""
+        if self._shadow_pool is not None:
+            self._shadow_pool.shutdown(wait=True)
+        if self._shadow_log is not None:
+            self._shadow_log.close()
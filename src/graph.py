@@ -0,0 +1,91 @@
+import time
+from typing import Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from vocab import IngredientVocabulary
+
+
+class RecipeGraph:
+    """Recipe-ingredient bipartite graph ranked by personalized PageRank
+
+    A random walker starts at a pantry ingredient, moves to a random recipe
+    using it, then to a random ingredient of that recipe, and so on,
+    jumping back to the pantry with probability 1 - damping at every
+    ingredient. Recipes are ranked by how often the walk visits them.
+    Spreading an ingredient's mass over all its recipes means an ingredient
+    in thousands of recipes (salt, oil) adds little to each, whereas a
+    distinctive one concentrates on the few recipes that use it.
+
+    Both walk steps are CSR matrices with normalized columns, so an iteration
+    is two sparse matrix-vector products.
+    """
+
+    def __init__(self, ingredient_lists: Sequence[Iterable[str]], vocab: IngredientVocabulary,
+                 alive: Optional[np.ndarray] = None):
+        """
+        Args:
+            ingredient_lists: Normalized ingredients per recipe id
+            vocab: Vocabulary all those ingredients are interned in
+            alive: False for deleted recipes, which the walk never enters
+        """
+        incidence = vocab.incidence(ingredient_lists, intern=False)
+        if alive is not None:
+            incidence = sparse.diags(alive.astype(np.float32)) @ incidence
+            incidence.eliminate_zeros()
+        self.n_recipes, self.n_ingredients = incidence.shape
+        recipe_degree = np.asarray(incidence.sum(axis=1)).ravel()
+        ingredient_degree = np.asarray(incidence.sum(axis=0)).ravel()
+        # to_recipes[r, i] = 1/deg(i) for every recipe r using i; to_ingredients[i, r] = 1/deg(r)
+        self.to_recipes = (incidence @ sparse.diags(self._inverse(ingredient_degree))).tocsr()
+        self.to_ingredients = (incidence.T @ sparse.diags(self._inverse(recipe_degree))).tocsr()
+
+    @staticmethod
+    def _inverse(degree: np.ndarray) -> np.ndarray:
+        inverse = np.zeros(len(degree), dtype=np.float32)
+        np.divide(1.0, degree, out=inverse, where=degree > 0)
+        return inverse
+
+    def scores(self, pantry_ids: np.ndarray, damping: float = 0.7, max_iter: int = 30,
+               tol: float = 1e-6, deadline: Optional[float] = None) -> Tuple[np.ndarray, int]:
+        """Visit frequency of every recipe for a walk restarting at the pantry
+
+        Args:
+            pantry_ids: Vocabulary ids of the pantry ingredients
+            damping: Probability of continuing the walk instead of restarting
+            max_iter: Iteration cap
+            tol: Stop once the ingredient distribution moves less than this (L1)
+            deadline: time.monotonic() after which the walk stops with the
+                scores so far
+        Returns:
+            Score per recipe id and the number of iterations run
+        """
+        pantry_ids = pantry_ids[pantry_ids < self.n_ingredients]
+        restart = np.zeros(self.n_ingredients, dtype=np.float32)
+        if not len(pantry_ids):
+            return np.zeros(self.n_recipes, dtype=np.float32), 0
+        restart[pantry_ids] = 1.0 / len(pantry_ids)
+
+        ingredients = restart
+        for iteration in range(1, max_iter + 1):
+            recipes = self.to_recipes @ ingredients
+            updated = (1 - damping) * restart + damping * (self.to_ingredients @ recipes)
+            converged = np.abs(updated - ingredients).sum() < tol
+            ingredients = updated
+            if converged or (deadline is not None and time.monotonic() >= deadline):
+                break
+        return self.to_recipes @ ingredients, iteration
+
+    def top(self, pantry_ids: np.ndarray, k: int, **kwargs) -> Tuple[np.ndarray, np.ndarray]:
+        """Recipe ids with the k highest scores (only recipes the walk reached) and their scores, best first"""
+        scores, _ = self.scores(pantry_ids, **kwargs)
+        reached = np.flatnonzero(scores > 0)
+        if len(reached) > k:
+            reached = reached[np.argpartition(-scores[reached], k - 1)[:k]]
+        order = np.argsort(-scores[reached], kind='stable')
+        return reached[order], scores[reached[order]]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(m.data.nbytes + m.indices.nbytes + m.indptr.nbytes for m in (self.to_recipes, self.to_ingredients))
@@ -0,0 +1,58 @@
+from typing import Any, Optional, Sequence
+
+import numpy as np
+
+MIN_CAPACITY = 16
+
+
+class GrowableArray:
+    """Array with spare rows at the end, shared by snapshots that each view a prefix of it
+
+    Appending writes past the end of the newest view, where no reader looks,
+    and reallocates (doubling the capacity) only when the buffer is full, so
+    adding a row costs amortized O(1) instead of copying the whole array.
+    Rows handed out in a view are never written again.
+    """
+
+    def __init__(self, array: np.ndarray, capacity: int = 0):
+        array = np.asarray(array)
+        self._data = np.empty((max(capacity, len(array), MIN_CAPACITY),) + array.shape[1:], dtype=array.dtype)
+        self._data[:len(array)] = array
+        self._length = len(array)
+
+    @classmethod
+    def of_column(cls, column: Any) -> "GrowableArray":
+        """Buffer holding a DataFrame column, as object array unless it is numeric or boolean"""
+        values = column.to_numpy()
+        if values.dtype.kind not in 'biuf':
+            values = column.to_numpy(dtype=object)
+        return cls(values)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def view(self) -> np.ndarray:
+        """Read-only view of the rows appended so far"""
+        view = self._data[:self._length]
+        view.setflags(write=False)
+        return view
+
+    def append(self, rows: Sequence[Any], length: Optional[int] = None) -> "GrowableArray":
+        """Buffer holding the first `length` rows (default: all) followed by `rows`
+
+        Writes in place and returns self when the rows fit after the current
+        end; otherwise (no room, or `length` is an older prefix whose spare
+        rows were already handed out) returns a new buffer.
+        """
+        length = self._length if length is None else length
+        buffer = self
+        if length != self._length or length + len(rows) > len(self._data):
+            buffer = GrowableArray(self._data[:length], capacity=2 * (length + len(rows)))
+        if buffer._data.dtype == object and buffer._data.ndim == 1:
+            # Element by element, so list values (ingredients) aren't broadcast into extra dimensions
+            for i, value in enumerate(rows, start=length):
+                buffer._data[i] = value
+        else:
+            buffer._data[length:length + len(rows)] = rows
+        buffer._length = length + len(rows)
+        return buffer
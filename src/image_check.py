@@ -0,0 +1,112 @@
+import argparse
+import json
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from PIL import Image
+
+MANIFEST_FILE = "image_manifest.json"
+MIN_SIZE = (64, 64)
+MAX_SIZE = (10000, 10000)
+
+
+def average_hash(img: Image.Image, hash_size: int = 8) -> str:
+    """64-bit perceptual hash: grayscale thumbnail thresholded at its mean"""
+    pixels = np.asarray(img.convert('L').resize((hash_size, hash_size), Image.BILINEAR), dtype=np.float32)
+    return np.packbits(pixels > pixels.mean()).tobytes().hex()
+
+
+def inspect_image(path: Path) -> Dict[str, Any]:
+    """Decode one image and record what the GUI needs to know about it"""
+    entry: Dict[str, Any] = {'ok': False}
+    try:
+        entry['bytes'] = path.stat().st_size
+    except OSError:
+        entry['error'] = "missing"
+        return entry
+
+    try:
+        with Image.open(path) as img:
+            # draft() lets the JPEG decoder skip to a reduced scale, enough for the hash
+            width, height = img.size
+            img.draft('RGB', (64, 64))
+            img.load()
+            entry.update(width=width, height=height, format=img.format, phash=average_hash(img))
+    except Exception as e:
+        entry['error'] = f"decode failed: {e}"
+        return entry
+
+    if width < MIN_SIZE[0] or height < MIN_SIZE[1] or width > MAX_SIZE[0] or height > MAX_SIZE[1]:
+        entry['error'] = f"unexpected dimensions {width}x{height}"
+    else:
+        entry['ok'] = True
+    return entry
+
+
+def scan_images(image_names: Iterable[str], images_dir: Path, workers: int = 32) -> Dict[str, Dict[str, Any]]:
+    """Inspect every referenced image on a thread pool
+
+    Decoding happens in Pillow's C code with the GIL released, so threads
+    scale with cores as well as hiding file system latency.
+    """
+    names = sorted(set(image_names))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        entries = pool.map(lambda name: inspect_image(images_dir / name), names)
+        return dict(zip(names, entries))
+
+
+def find_duplicates(entries: Dict[str, Dict[str, Any]]) -> List[List[str]]:
+    """Groups of images with identical perceptual hashes"""
+    groups: Dict[str, List[str]] = {}
+    for name, entry in entries.items():
+        if entry.get('phash'):
+            groups.setdefault(entry['phash'], []).append(name)
+    return [names for names in groups.values() if len(names) > 1]
+
+
+def write_manifest(entries: Dict[str, Dict[str, Any]], path: Path) -> Dict[str, Any]:
+    """Save the scan so the GUI can skip render-time existence checks"""
+    manifest = {
+        'images': entries,
+        'invalid': sorted(name for name, entry in entries.items() if not entry['ok']),
+        'duplicates': find_duplicates(entries),
+    }
+    path.write_text(json.dumps(manifest, indent=1, sort_keys=True))
+    return manifest
+
+
+def load_image_status(path: Path) -> Dict[str, bool]:
+    """Validation result per scanned image name (empty without a manifest)"""
+    if not path.exists():
+        return {}
+    manifest = json.loads(path.read_text())
+    return {name: entry['ok'] for name, entry in manifest['images'].items()}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from train import RecipeRecommender
+
+    parser = argparse.ArgumentParser(description="Validate recipe images and write the image manifest")
+    parser.add_argument("--workers", type=int, default=32)
+    args = parser.parse_args(argv)
+
+    warnings.simplefilter("ignore")
+    recommender = RecipeRecommender()
+    start = time.perf_counter()
+    entries = scan_images(recommender.RECIPE_IMAGES, recommender.IMAGES_DIR, args.workers)
+    manifest = write_manifest(entries, recommender.IMAGES_DIR / MANIFEST_FILE)
+    elapsed = time.perf_counter() - start
+
+    print(f"Scanned {len(entries)} images in {elapsed:.2f}s")
+    for name in manifest['invalid']:
+        print(f"Invalid: {name}: {entries[name]['error']}")
+    for group in manifest['duplicates']:
+        print(f"Duplicates: {', '.join(group)}")
+
+
+if __name__ == "__main__":
+    main()
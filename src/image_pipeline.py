@@ -0,0 +1,116 @@
+import argparse
+import hashlib
+import io
+import json
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+# Display sizes the GUI asks for (bounding boxes, aspect ratio is kept)
+DISPLAY_SIZES: Dict[str, Tuple[int, int]] = {
+    'card': (400, 300),
+    'full': (800, 600),
+}
+MANIFEST_FILE = "manifest.json"
+
+
+def encode_image(source: Path, box: Tuple[int, int], quality: int = 85) -> bytes:
+    """Resize an image to fit inside `box` and encode it as a progressive JPEG"""
+    with Image.open(source) as img:
+        img = img.convert('RGB')
+        img.thumbnail(box, Image.LANCZOS)
+        buffer = io.BytesIO()
+        img.save(buffer, format='JPEG', quality=quality, optimize=True, progressive=True)
+        return buffer.getvalue()
+
+
+def _build_one(image_name: str, images_dir: Path, out_dir: Path,
+               sizes: Dict[str, Tuple[int, int]]) -> Dict[str, str]:
+    """Encode one catalog image at every display size
+
+    File names carry a hash of their content, so a URL never changes meaning
+    and can be cached forever.
+    """
+    entry = {}
+    for size_name, box in sizes.items():
+        data = encode_image(images_dir / image_name, box)
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        filename = f"{Path(image_name).stem}.{size_name}.{digest}.jpg"
+        target = out_dir / filename
+        if not target.exists():
+            target.write_bytes(data)
+        entry[size_name] = filename
+    return entry
+
+
+def build_static_images(recommender: Any, out_dir: Optional[Path] = None,
+                        sizes: Optional[Dict[str, Tuple[int, int]]] = None,
+                        workers: int = 8) -> Dict[str, Any]:
+    """Pre-encode every catalog image and write the URL manifest
+
+    Args:
+        recommender: RecipeRecommender whose catalog images are built
+        out_dir: Output directory (default: recommender.STATIC_IMAGES_DIR)
+        sizes: Display sizes, defaults to DISPLAY_SIZES
+        workers: Encoder threads (Pillow releases the GIL while coding)
+    Returns:
+        Build report with 'built', 'missing' and 'failed' images
+    """
+    out_dir = out_dir or recommender.STATIC_IMAGES_DIR
+    sizes = sizes or DISPLAY_SIZES
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    missing = recommender.check_missing_images()
+    names = sorted(set(recommender.RECIPE_IMAGES) - set(missing))
+    manifest: Dict[str, Dict[str, str]] = {}
+    failed: Dict[str, str] = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {name: pool.submit(_build_one, name, recommender.IMAGES_DIR, out_dir, sizes)
+                   for name in names}
+        for name, future in futures.items():
+            try:
+                manifest[name] = future.result()
+            except Exception as e:
+                failed[name] = str(e)
+
+    (out_dir / MANIFEST_FILE).write_text(json.dumps(manifest, indent=1, sort_keys=True))
+    return {'built': len(manifest), 'missing': missing, 'failed': failed}
+
+
+class ImageManifest:
+    """Maps catalog image names to pre-encoded static file URLs"""
+
+    def __init__(self, manifest_path: Path, base_url: str):
+        self.base_url = base_url.rstrip('/') + '/'
+        self.entries: Dict[str, Dict[str, str]] = {}
+        if manifest_path.exists():
+            self.entries = json.loads(manifest_path.read_text())
+
+    def url(self, image_name: str, size: str = 'card') -> Optional[str]:
+        """URL of an image at a display size, or None if it was not built"""
+        filename = self.entries.get(image_name, {}).get(size)
+        return self.base_url + filename if filename else None
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from train import RecipeRecommender
+
+    parser = argparse.ArgumentParser(description="Pre-encode recipe images for static serving")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    warnings.simplefilter("ignore")
+    recommender = RecipeRecommender()
+    report = build_static_images(recommender, workers=args.workers)
+    print(f"Built {report['built']} images into {recommender.STATIC_IMAGES_DIR}")
+    for name in report['missing']:
+        print(f"Missing: {name}")
+    for name, error in report['failed'].items():
+        print(f"Failed: {name}: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+import argparse
+import heapq
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from admission import deadline_after, expired
+from cookable import popcount_rows
+from store import normalize_ingredient
+
+
+def _popcount(row: np.ndarray) -> int:
+    return int(popcount_rows(row[None, :])[0])
+
+
+class MealPlanner:
+    """Pick N recipes that use up a pantry with few extra purchases
+
+    A plan is scored as
+
+        pantry_weight * (pantry ingredients used by any recipe)
+        - buy_weight * (distinct ingredients to buy)
+        + variety_weight * (distinct cuisines)
+
+    over the catalog's ingredient bitsets, subject to a total cooking time
+    budget and at most `max_per_cuisine` recipes per cuisine.
+
+    Plans are built greedily with lazy evaluation: a candidate's last
+    computed gain is kept in a max-heap and only recomputed when it reaches
+    the top. Coverage and variety have diminishing returns, so for them a
+    stale gain is a valid upper bound; buying an ingredient once for several
+    recipes makes the purchase term grow less than linearly, which the
+    greedy step can't see ahead, so an optional swap-based local search
+    refines the result.
+    """
+
+    def __init__(self, recommender: Any, pantry_weight: float = 1.0, buy_weight: float = 0.5,
+                 variety_weight: float = 1.0):
+        """
+        Args:
+            recommender: RecipeRecommender whose current catalog is planned over
+            pantry_weight: Reward per pantry ingredient used
+            buy_weight: Penalty per distinct ingredient to buy
+            variety_weight: Reward per distinct cuisine
+        """
+        self.recommender = recommender
+        self.pantry_weight = pantry_weight
+        self.buy_weight = buy_weight
+        self.variety_weight = variety_weight
+
+    def plan(self, pantry: Iterable[str], n_recipes: int = 7, time_budget: Optional[int] = None,
+             max_per_cuisine: int = 2, local_search: bool = True,
+             deadline: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Choose a meal plan
+        Args:
+            pantry: Ingredients already at home
+            n_recipes: Number of recipes in the plan
+            time_budget: Total cooking minutes for the whole plan
+            max_per_cuisine: Most recipes allowed from one cuisine
+            local_search: Try swapping recipes after the greedy pass
+            deadline: time.monotonic() by which to answer (see
+                admission.deadline_after); past it the best plan found so
+                far is returned
+        Returns:
+            Dict with 'recipe_ids', 'score', 'total_time', 'pantry_used',
+            'to_buy', 'cuisines' and 'timed_out'
+        """
+        snapshot = self.recommender.snapshot
+        index = self.recommender.cookable_index_of(snapshot)
+        normalized = [normalize_ingredient(i) for i in pantry if i.strip()]
+        pantry_bits = index.encode(index.vocab.lookup(normalized))
+        times = snapshot.df['cooking_time'].to_numpy()
+        cuisine_codes, cuisine_names = pd.factorize(snapshot.df['cuisine'])
+
+        candidates = np.flatnonzero(snapshot.alive)
+        if time_budget is not None:
+            candidates = candidates[times[candidates] <= time_budget]
+
+        state = _PlanState(self, index.bits, pantry_bits, times, cuisine_codes, len(cuisine_names))
+        timed_out = state.greedy(candidates, n_recipes, time_budget, max_per_cuisine, deadline)
+        if local_search and not timed_out:
+            timed_out = state.local_search(candidates, time_budget, max_per_cuisine, deadline)
+
+        plan = state.plan
+        covered = state.union(plan)
+        return {
+            'recipe_ids': plan,
+            'score': state.score(plan),
+            'total_time': int(times[plan].sum()),
+            'pantry_used': self._names(index, covered & pantry_bits),
+            'to_buy': self._names(index, covered & ~pantry_bits),
+            'cuisines': sorted({cuisine_names[cuisine_codes[i]] for i in plan}),
+            'timed_out': timed_out,
+        }
+
+    def plan_frame(self, pantry: Iterable[str], n_recipes: int = 7, **kwargs: Any) -> pd.DataFrame:
+        """The planned recipes as a DataFrame, in plan order"""
+        plan = self.plan(pantry, n_recipes, **kwargs)
+        return self.recommender.snapshot.df.iloc[plan['recipe_ids']]
+
+    @staticmethod
+    def _names(index: Any, bits: np.ndarray) -> List[str]:
+        ids = np.flatnonzero(np.unpackbits(bits.view(np.uint8), bitorder='little'))
+        return [index.vocab.names[i] for i in ids if i < len(index.vocab)]
+
+
+class _PlanState:
+    """Plan under construction and the bitset arithmetic to score it"""
+
+    def __init__(self, planner: MealPlanner, bits: np.ndarray, pantry_bits: np.ndarray,
+                 times: np.ndarray, cuisine_codes: np.ndarray, n_cuisines: int):
+        self.planner = planner
+        self.bits = bits
+        self.pantry_bits = pantry_bits
+        self.times = times
+        self.cuisine_codes = cuisine_codes
+        self.n_cuisines = n_cuisines
+        self.plan: List[int] = []
+
+    def union(self, recipe_ids: List[int]) -> np.ndarray:
+        if not recipe_ids:
+            return np.zeros(self.bits.shape[1], dtype=np.uint64)
+        return np.bitwise_or.reduce(self.bits[recipe_ids], axis=0)
+
+    def score(self, recipe_ids: List[int]) -> float:
+        covered = self.union(recipe_ids)
+        n_cuisines = len({self.cuisine_codes[i] for i in recipe_ids})
+        return (self.planner.pantry_weight * _popcount(covered & self.pantry_bits)
+                - self.planner.buy_weight * _popcount(covered & ~self.pantry_bits)
+                + self.planner.variety_weight * n_cuisines)
+
+    def scores_with(self, base: List[int], candidates: np.ndarray) -> np.ndarray:
+        """score(base + [c]) for every candidate c at once"""
+        covered = self.union(base) | self.bits[candidates]
+        base_cuisines = np.zeros(self.n_cuisines, dtype=bool)
+        base_cuisines[[self.cuisine_codes[i] for i in base]] = True
+        n_cuisines = base_cuisines.sum() + ~base_cuisines[self.cuisine_codes[candidates]]
+        return (self.planner.pantry_weight * popcount_rows(covered & self.pantry_bits)
+                - self.planner.buy_weight * popcount_rows(covered & ~self.pantry_bits)
+                + self.planner.variety_weight * n_cuisines)
+
+    def _fits(self, plan: List[int], recipe_id: int, time_left: Optional[int],
+              max_per_cuisine: int) -> bool:
+        if time_left is not None and self.times[recipe_id] > time_left:
+            return False
+        cuisine = self.cuisine_codes[recipe_id]
+        return sum(self.cuisine_codes[i] == cuisine for i in plan) < max_per_cuisine
+
+    def greedy(self, candidates: np.ndarray, n_recipes: int, time_budget: Optional[int],
+               max_per_cuisine: int, deadline: Optional[float]) -> bool:
+        """Lazy greedy pass; returns True if the deadline cut it short"""
+        # Keep enough budget for the remaining slots, assuming the quickest recipes fill them
+        quickest = np.sort(self.times[candidates])
+        gains = self.scores_with([], candidates) - self.score([])
+        heap = [(-float(g), int(i), 0) for g, i in zip(gains, candidates)]
+        heapq.heapify(heap)
+        timed_out = False
+        skipped = []
+
+        while heap and len(self.plan) < n_recipes:
+            neg_gain, recipe_id, round_computed = heapq.heappop(heap)
+            slots_after = n_recipes - len(self.plan) - 1
+            time_left = None
+            if time_budget is not None:
+                time_left = time_budget - int(self.times[self.plan].sum()) - int(quickest[:slots_after].sum())
+            if not self._fits(self.plan, recipe_id, time_left, max_per_cuisine):
+                # The reserve for later slots shrinks as the plan fills, so it may fit again
+                skipped.append((neg_gain, recipe_id, round_computed))
+                continue
+
+            if round_computed == len(self.plan) or timed_out:
+                self.plan.append(recipe_id)
+                for entry in skipped:
+                    heapq.heappush(heap, entry)
+                skipped = []
+                continue
+            gain = self.score(self.plan + [recipe_id]) - self.score(self.plan)
+            heapq.heappush(heap, (-gain, recipe_id, len(self.plan)))
+            if expired(deadline):
+                # Out of time: take the remaining best bounds as they are
+                timed_out = True
+        return timed_out
+
+    def local_search(self, candidates: np.ndarray, time_budget: Optional[int],
+                     max_per_cuisine: int, deadline: Optional[float]) -> bool:
+        """Apply improving single swaps until none is left; returns True on deadline"""
+        best = self.score(self.plan)
+        improved = True
+        while improved:
+            improved = False
+            for position in range(len(self.plan)):
+                if expired(deadline):
+                    return True
+                rest = self.plan[:position] + self.plan[position + 1:]
+                outside = candidates[~np.isin(candidates, self.plan)]
+                per_cuisine = np.bincount(self.cuisine_codes[rest], minlength=self.n_cuisines)
+                fits = per_cuisine[self.cuisine_codes[outside]] < max_per_cuisine
+                if time_budget is not None:
+                    fits &= self.times[outside] <= time_budget - int(self.times[rest].sum())
+                outside = outside[fits]
+                if not len(outside):
+                    continue
+                scores = self.scores_with(rest, outside)
+                top = int(np.argmax(scores))
+                if scores[top] > best + 1e-9:
+                    self.plan = rest[:position] + [int(outside[top])] + rest[position:]
+                    best = float(scores[top])
+                    improved = True
+        return False
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import warnings
+    from train import RecipeRecommender
+
+    parser = argparse.ArgumentParser(description="Plan a week of recipes around a pantry")
+    parser.add_argument("pantry", help="Comma-separated ingredients")
+    parser.add_argument("--recipes", type=int, default=7)
+    parser.add_argument("--time-budget", type=int, default=None, help="Total cooking minutes")
+    parser.add_argument("--max-per-cuisine", type=int, default=2)
+    parser.add_argument("--time-limit", type=float, default=None, help="Seconds to spend planning")
+    parser.add_argument("--no-local-search", action="store_true")
+    args = parser.parse_args(argv)
+
+    warnings.simplefilter("ignore")
+    recommender = RecipeRecommender()
+    start = time.perf_counter()
+    deadline = deadline_after(args.time_limit)
+    plan = MealPlanner(recommender).plan(args.pantry.split(','), args.recipes, args.time_budget,
+                                         args.max_per_cuisine, not args.no_local_search, deadline)
+    elapsed = time.perf_counter() - start
+
+    for recipe_id in plan['recipe_ids']:
+        row = recommender.df.iloc[recipe_id]
+        print(f"{row['name']} ({row['cuisine']}, {row['cooking_time']} min)")
+    print(f"Score {plan['score']:.1f}, {plan['total_time']} min total, cuisines: {', '.join(plan['cuisines'])}")
+    print(f"Uses: {', '.join(plan['pantry_used'])}")
+    print(f"To buy: {', '.join(plan['to_buy'])}")
+    print(f"Planned in {1000 * elapsed:.1f}ms{' (deadline hit)' if plan['timed_out'] else ''}")
+
+
+if __name__ == "__main__":
+    main()
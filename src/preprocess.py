@@ -1,14 +1,26 @@
+import logging
+
 import pandas as pd
 from gensim.models import Word2Vec
 
+from dedup import deduplicate
+from train import W2V_PARAMS
+
 
-def clean_data():
+def clean_data(dedup_threshold: float = 0.8, dedup_action: str = "drop"):
     df = pd.read_json("data/raw/recipes.json")
+
+    # Collapse near-duplicate recipes before they reach the index
+    recipes, collapsed = deduplicate(df.to_dict("records"), dedup_threshold, action=dedup_action)
+    for entry in collapsed:
+        logging.info(f"Dedup: kept '{entry['kept']}', collapsed {entry['collapsed']}")
+    df = pd.DataFrame(recipes)
+
     df["ingredients"] = df["ingredients"].apply(lambda x: [i.lower() for i in x])
     df.to_csv("data/processed/training.csv", index=False)
 
     # Train word embeddings
-    model = Word2Vec(df["ingredients"], vector_size=100, window=5, min_count=1)
+    model = Word2Vec(df["ingredients"], **W2V_PARAMS)
     model.save("models/embeddings/food2vec.model")
 
 
@@ -0,0 +1,232 @@
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory file locks, so only one process may write a table
+    fcntl = None
+
+META_FILE = "meta.json"
+LOCK_FILE = "write.lock"
+KEYS_FILE = "keys.npy"
+VECTORS_FILE = "vectors.npy"
+CUISINES_FILE = "cuisines.npy"
+
+
+def user_key(user_id: str) -> np.uint64:
+    """Stable non-zero 64-bit key of a user id (0 marks an empty slot)"""
+    key = int.from_bytes(hashlib.blake2b(str(user_id).encode(), digest_size=8).digest(), 'little')
+    return np.uint64(key or 1)
+
+
+class UserProfiles:
+    """Per-user taste profiles in memory-mapped arrays
+
+    Each user has a preference vector in the Word2Vec space and an affinity
+    per cuisine, both exponentially decayed towards recent clicks and stored
+    as float16. Users are found through an open-addressing hash table of
+    64-bit keys (linear probing, at most half full), so a lookup is one or
+    two array reads and a million users take about 270 MB of page cache
+    rather than Python objects.
+
+    Lookups take no lock; a reader racing a click may see a half-updated
+    row, which only shifts one ranking slightly. Clicks and table growth
+    are serialized across threads and, through an flock on LOCK_FILE,
+    across processes sharing the directory (e.g. the GUI and the API): a
+    writer re-reads the metadata under the lock and remaps the table if
+    another process grew it. Readers remap when the metadata changes.
+    """
+
+    def __init__(self, table_dir: Path, dim: int, capacity: int = 1 << 16,
+                 max_cuisines: int = 32, decay: float = 0.9):
+        """
+        Args:
+            table_dir: Directory holding the table files (created if missing)
+            dim: Preference vector size, the Word2Vec vector_size
+            capacity: Initial number of slots for a new table (power of two)
+            max_cuisines: Cuisine slots per user
+            decay: Weight of the old profile on every click
+        """
+        self.table_dir = Path(table_dir)
+        self.table_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._lock_file = open(self.table_dir / LOCK_FILE, 'a')
+        self._meta_path = self.table_dir / META_FILE
+
+        with self._exclusive():
+            if self._meta_path.exists():
+                self._load_meta()
+                if self.meta['dim'] != dim:
+                    raise ValueError(f"Profile table has dim {self.meta['dim']}, model has {dim}")
+                self._table = self._open('r+')
+                if 'count' not in self.meta:
+                    # Tables written before the count was kept in the metadata
+                    self.meta['count'] = int(np.count_nonzero(self._table[0]))
+                    self._save_meta()
+            else:
+                self.meta = {'dim': dim, 'capacity': capacity, 'max_cuisines': max_cuisines,
+                             'cuisines': [], 'decay': decay, 'count': 0}
+                self._table = self._create(self.table_dir, capacity)
+                self._save_meta()
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def count(self) -> int:
+        """Number of users in the table"""
+        return self.meta['count']
+
+    @property
+    def cuisines(self) -> List[str]:
+        return self.meta['cuisines']
+
+    def _create(self, directory: Path, capacity: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        open_memmap = np.lib.format.open_memmap
+        keys = open_memmap(directory / KEYS_FILE, mode='w+', dtype=np.uint64, shape=(capacity,))
+        vectors = open_memmap(directory / VECTORS_FILE, mode='w+', dtype=np.float16,
+                              shape=(capacity, self.meta['dim']))
+        cuisines = open_memmap(directory / CUISINES_FILE, mode='w+', dtype=np.float16,
+                               shape=(capacity, self.meta['max_cuisines']))
+        return keys, vectors, cuisines
+
+    def _open(self, mode: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return tuple(np.load(self.table_dir / name, mmap_mode=mode)
+                     for name in (KEYS_FILE, VECTORS_FILE, CUISINES_FILE))
+
+    def _save_meta(self) -> None:
+        tmp_path = self.table_dir / f"{META_FILE}.{os.getpid()}.tmp"
+        tmp_path.write_text(json.dumps(self.meta))
+        os.replace(tmp_path, self._meta_path)
+        self._meta_version = self._meta_stamp()
+
+    def _meta_stamp(self) -> Tuple[int, int, int]:
+        """Changes whenever the metadata file is replaced (new inode) or rewritten"""
+        stat = os.stat(self._meta_path)
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _load_meta(self) -> None:
+        self._meta_version = self._meta_stamp()
+        self.meta = json.loads(self._meta_path.read_text())
+
+    def _refresh(self) -> None:
+        """Pick up metadata and table files written by another process (writers hold _exclusive)"""
+        self._load_meta()
+        if self.meta['capacity'] != len(self._table[0]):
+            self._table = self._open('r+')
+
+    @contextmanager
+    def _exclusive(self) -> Iterator[None]:
+        """Hold the table against writers in this and (where flock exists) other processes"""
+        with self._lock:
+            if fcntl is not None:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _probe(keys: np.ndarray, key: np.uint64) -> int:
+        """Slot holding `key`, or the empty slot where it would go"""
+        mask = len(keys) - 1
+        slot = int(key) & mask
+        while keys[slot] != key and keys[slot] != 0:
+            slot = (slot + 1) & mask
+        return slot
+
+    def get(self, user_id: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Preference vector and cuisine affinities (aligned with `cuisines`), None for unknown users"""
+        if self._meta_stamp() != self._meta_version:
+            with self._exclusive():
+                self._refresh()
+        keys, vectors, cuisines = self._table
+        key = user_key(user_id)
+        slot = self._probe(keys, key)
+        if keys[slot] != key:
+            return None
+        return (vectors[slot].astype(np.float32),
+                cuisines[slot, :len(self.meta['cuisines'])].astype(np.float32))
+
+    def record_click(self, user_id: str, embedding: np.ndarray, cuisine: Optional[str] = None,
+                     weight: float = 1.0) -> None:
+        """Move a user's profile towards a clicked recipe
+
+        Each click moves the profile by (1 - decay) * weight of the way,
+        capped at all the way, so a profile stays a convex mix of clicks.
+
+        Raises:
+            ValueError: If weight is negative or not finite
+        """
+        if not np.isfinite(weight) or weight < 0:
+            raise ValueError(f"Click weight must be a non-negative number, got {weight}")
+        norm = np.linalg.norm(embedding)
+        direction = embedding / norm if norm else embedding
+        with self._exclusive():
+            self._refresh()
+            if 2 * (self.count + 1) > self.meta['capacity']:
+                self._grow()
+            keys, vectors, cuisines = self._table
+            key = user_key(user_id)
+            slot = self._probe(keys, key)
+            if keys[slot] != key:
+                keys[slot] = key
+                self.meta['count'] += 1
+                self._save_meta()
+
+            step = min((1 - self.meta['decay']) * weight, 1.0)
+            vectors[slot] = (1 - step) * vectors[slot].astype(np.float32) + step * direction
+            row = (1 - step) * cuisines[slot].astype(np.float32)
+            cuisine_slot = self._cuisine_slot(cuisine)
+            if cuisine_slot is not None:
+                row[cuisine_slot] += step
+            cuisines[slot] = row
+
+    def _cuisine_slot(self, cuisine: Optional[str]) -> Optional[int]:
+        """Column of a cuisine, assigning the next free one (None when full)"""
+        if cuisine is None:
+            return None
+        names = self.meta['cuisines']
+        if cuisine not in names:
+            if len(names) >= self.meta['max_cuisines']:
+                return None
+            names.append(cuisine)
+            self._save_meta()
+        return names.index(cuisine)
+
+    def _grow(self) -> None:
+        """Rehash into a table twice the size, then swap the files in"""
+        old_keys, old_vectors, old_cuisines = self._table
+        capacity = 2 * self.meta['capacity']
+        tmp_dir = self.table_dir / "grow.tmp"
+        tmp_dir.mkdir(exist_ok=True)
+        keys, vectors, cuisines = self._create(tmp_dir, capacity)
+
+        used = np.flatnonzero(old_keys)
+        for slot in used:
+            new_slot = self._probe(keys, old_keys[slot])
+            keys[new_slot] = old_keys[slot]
+            vectors[new_slot] = old_vectors[slot]
+            cuisines[new_slot] = old_cuisines[slot]
+        for array in (keys, vectors, cuisines):
+            array.flush()
+        for name in (KEYS_FILE, VECTORS_FILE, CUISINES_FILE):
+            os.replace(tmp_dir / name, self.table_dir / name)
+        tmp_dir.rmdir()
+
+        self.meta['capacity'] = capacity
+        self._save_meta()
+        self._table = self._open('r+')
+
+    def flush(self) -> None:
+        """Write dirty pages to disk"""
+        for array in self._table:
+            array.flush()
@@ -0,0 +1,237 @@
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from sklearn.cluster import KMeans
+
+QUANTIZATIONS = ("float16", "int8", "pq")
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize rows so cosine distance is 1 - dot product"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1
+    return matrix / norms
+
+
+class Float16Store:
+    """Half-precision copy of the normalized vectors (4x smaller than float64)"""
+
+    def __init__(self, vectors: np.ndarray):
+        self.codes = normalize_rows(vectors).astype(np.float16)
+
+    def similarities(self, query: np.ndarray) -> np.ndarray:
+        return self.codes @ query.astype(np.float16)
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes
+
+
+class Int8Store:
+    """Per-dimension scalar quantization to one byte (8x smaller than float64)
+
+    Each dimension is mapped linearly from [min, max] to 0..255, so
+    dot(q, x) = dot(q, low) + dot(q * scale, code) can be computed on the
+    codes without decoding them.
+    """
+
+    def __init__(self, vectors: np.ndarray):
+        vectors = normalize_rows(vectors)
+        self.low = vectors.min(axis=0)
+        self.scale = (vectors.max(axis=0) - self.low) / 255
+        self.scale[self.scale == 0] = 1
+        self.codes = np.round((vectors - self.low) / self.scale).astype(np.uint8)
+
+    def similarities(self, query: np.ndarray) -> np.ndarray:
+        return self.codes @ (query * self.scale) + query @ self.low
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + self.low.nbytes + self.scale.nbytes
+
+
+class PQStore:
+    """Product quantization with asymmetric distance computation
+
+    Vectors are split into `n_subspaces` chunks and each chunk is replaced by
+    the id of its nearest k-means centroid (one byte per chunk). At query time
+    the dot products between the query chunks and every centroid are put in a
+    small lookup table, and a vector's similarity is the sum of its table
+    entries.
+    """
+
+    def __init__(self, vectors: np.ndarray, n_subspaces: int = 25, n_centroids: int = 256,
+                 random_state: int = 0):
+        vectors = normalize_rows(vectors)
+        n_rows, dim = vectors.shape
+        self.n_subspaces = min(n_subspaces, dim)
+        self.sub_dim = -(-dim // self.n_subspaces)
+        self.dim = dim
+        vectors = self._pad(vectors)
+
+        n_centroids = min(n_centroids, 256, n_rows)
+        self.centroids = np.zeros((self.n_subspaces, n_centroids, self.sub_dim), dtype=np.float32)
+        self.codes = np.zeros((n_rows, self.n_subspaces), dtype=np.uint8)
+        for m in range(self.n_subspaces):
+            chunk = vectors[:, m * self.sub_dim:(m + 1) * self.sub_dim]
+            kmeans = KMeans(n_clusters=n_centroids, n_init=1, random_state=random_state).fit(chunk)
+            self.centroids[m] = kmeans.cluster_centers_
+            self.codes[:, m] = kmeans.labels_
+
+    def _pad(self, vectors: np.ndarray) -> np.ndarray:
+        """Zero-pad the last axis to n_subspaces * sub_dim"""
+        extra = self.n_subspaces * self.sub_dim - self.dim
+        if extra:
+            pad = [(0, 0)] * (vectors.ndim - 1) + [(0, extra)]
+            vectors = np.pad(vectors, pad)
+        return vectors
+
+    def similarities(self, query: np.ndarray) -> np.ndarray:
+        query = self._pad(query).reshape(self.n_subspaces, 1, self.sub_dim)
+        table = (self.centroids * query).sum(axis=2)  # (n_subspaces, n_centroids)
+        return table[np.arange(self.n_subspaces), self.codes].sum(axis=1)
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + self.centroids.nbytes
+
+
+class QuantizedIndex:
+    """Cosine nearest-neighbor index over compressed vectors
+
+    Candidates are scored on the compressed codes; when `rerank` is set, the
+    best `rerank` candidates are re-scored on the exact vectors, which are
+    memory-mapped from `exact_path` so only the touched rows are paged in.
+    Exposes ``kneighbors`` like sklearn's NearestNeighbors.
+    """
+
+    def __init__(self, vectors: np.ndarray, quantization: str = "int8", n_neighbors: int = 5,
+                 rerank: Optional[int] = None, exact_path: Optional[Path] = None,
+                 **store_kwargs: Any):
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization '{quantization}', expected one of {QUANTIZATIONS}")
+        self.quantization = quantization
+        self.n_neighbors = n_neighbors
+        self.rerank = rerank
+        self.n_samples_fit_ = len(vectors)
+        if quantization == "float16":
+            self.store = Float16Store(vectors)
+        elif quantization == "int8":
+            self.store = Int8Store(vectors)
+        else:
+            self.store = PQStore(vectors, **store_kwargs)
+
+        self.exact_path = str(exact_path) if exact_path else None
+        self._exact = None
+        if rerank and self.exact_path:
+            # Written aside, mapped, then moved into place: an index still serving from an
+            # older file at this path keeps its own mapping instead of seeing these rows
+            fd, tmp_path = tempfile.mkstemp(suffix=".tmp.npy", dir=Path(self.exact_path).parent)
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, normalize_rows(vectors))
+            self._exact = np.load(tmp_path, mmap_mode='r')
+            os.replace(tmp_path, self.exact_path)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state['_exact'] = None  # re-mapped when loaded
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        # Map the file as of loading, so a later rebuild replacing it doesn't change this index
+        if self.exact_path and Path(self.exact_path).exists():
+            self._exact = np.load(self.exact_path, mmap_mode='r')
+
+    @property
+    def exact(self) -> Optional[np.ndarray]:
+        """Memory-mapped full-precision vectors used for re-ranking"""
+        if self._exact is None and self.exact_path and Path(self.exact_path).exists():
+            self._exact = np.load(self.exact_path, mmap_mode='r')
+        return self._exact
+
+    def kneighbors(self, X: np.ndarray, n_neighbors: Optional[int] = None,
+                   deadline: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Args:
+            X: (n_queries, dim) query vectors
+            n_neighbors: Neighbors per query (default: self.n_neighbors)
+            deadline: time.monotonic() after which the exact re-ranking is
+                skipped and the compressed scores' best-so-far order returned
+        Returns:
+            Cosine distances and indices, both (n_queries, n_neighbors)
+        """
+        k = min(n_neighbors or self.n_neighbors, self.n_samples_fit_)
+        queries = normalize_rows(np.atleast_2d(X))
+        all_distances, all_indices = [], []
+        for query in queries:
+            similarities = self.store.similarities(query).astype(np.float32)
+            n_candidates = k
+            if self.rerank and self.exact is not None and (deadline is None or time.monotonic() < deadline):
+                n_candidates = min(max(self.rerank, k), self.n_samples_fit_)
+            candidates = np.argpartition(-similarities, n_candidates - 1)[:n_candidates]
+            if n_candidates > k:
+                # Re-score the shortlist on exact vectors (sorted rows keep mmap reads sequential)
+                candidates = np.sort(candidates)
+                similarities[candidates] = self.exact[candidates] @ query
+            best = candidates[np.argsort(-similarities[candidates], kind='stable')[:k]]
+            all_distances.append(1 - similarities[best])
+            all_indices.append(best)
+        return np.asarray(all_distances), np.asarray(all_indices)
+
+    def bytes_per_vector(self) -> float:
+        """In-memory size of the compressed codes per indexed vector"""
+        return self.store.nbytes / self.n_samples_fit_
+
+
+def measure_recall(index: QuantizedIndex, vectors: np.ndarray, queries: np.ndarray,
+                   k: int = 5) -> Dict[str, float]:
+    """Compare an index against exact brute-force cosine search
+
+    Returns:
+        recall@k, mean query latency in ms and bytes per vector vs float64
+    """
+    exact = normalize_rows(vectors) @ normalize_rows(queries).T
+    k = min(k, len(vectors))
+    truth = np.argsort(-exact, axis=0, kind='stable')[:k].T
+
+    start = time.perf_counter()
+    _, found = index.kneighbors(queries, n_neighbors=k)
+    elapsed = time.perf_counter() - start
+
+    hits = sum(len(set(t) & set(f)) for t, f in zip(truth, found))
+    return {
+        'recall': hits / (k * len(queries)),
+        'latency_ms': 1000 * elapsed / len(queries),
+        'bytes_per_vector': index.bytes_per_vector(),
+        # Codes only, i.e. the per-vector cost once codebooks are amortized over a large catalog
+        'code_bytes_per_vector': index.store.codes.nbytes / len(vectors),
+        'compression': vectors.shape[1] * 8 / index.bytes_per_vector(),
+    }
+
+
+if __name__ == "__main__":
+    import warnings
+    from train import RecipeRecommender
+
+    warnings.simplefilter("ignore")
+    recommender = RecipeRecommender()
+    embeddings = recommender.get_embedding_matrix()
+    rng = np.random.default_rng(0)
+    test_queries = embeddings[rng.integers(0, len(embeddings), 200)]
+    test_queries = test_queries + rng.normal(0, 0.05, test_queries.shape).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in QUANTIZATIONS:
+            for rerank in (None, 50):
+                idx = QuantizedIndex(embeddings, name, rerank=rerank, exact_path=Path(tmp) / f"{name}.npy")
+                stats = measure_recall(idx, embeddings, test_queries)
+                print(f"{name:8s} rerank={str(rerank):4s} recall@5={stats['recall']:.3f} "
+                      f"{stats['bytes_per_vector']:7.1f} B/vector ({stats['compression']:.1f}x, "
+                      f"codes {stats['code_bytes_per_vector']:.0f} B) "
+                      f"{stats['latency_ms']:.3f} ms/query")
@@ -0,0 +1,313 @@
+import argparse
+import json
+import queue
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from search_state import RecipeQuery
+
+RECOMMEND = "recommend"  # RecipeRecommender.recommend
+RECIPE = "recipe"        # RecipeRecommender.get_recipe_by_name
+SEARCH = "search"        # GUI ingredient/filter search (RecipeQuery.as_params)
+QUERY_KINDS = (RECOMMEND, RECIPE, SEARCH)
+# Optional recommend() arguments replayed when captured
+RECOMMEND_OPTIONS = ('diversity', 'max_per_cuisine', 'strategy')
+
+# Set to a file path to capture queries from every RecipeRecommender in the process
+QUERY_LOG_ENV = "VAVI_QUERY_LOG"
+
+
+class QueryRecorder:
+    """Non-blocking JSONL capture of the queries reaching the recommender
+
+    Each line is {"ts": unix time, "kind": one of QUERY_KINDS, ...parameters}.
+    `log` only enqueues; a background thread appends batches to the file and
+    flushes after each one. When the queue is full, queries are dropped and
+    counted rather than slowing the caller down.
+    """
+
+    def __init__(self, path: Path, queue_size: int = 100_000):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.dropped = 0
+        self.written = 0
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(queue_size)
+        self._thread = threading.Thread(target=self._run, name="query-recorder", daemon=True)
+        self._thread.start()
+
+    def log(self, kind: str, **params: Any) -> None:
+        """Record one query without blocking"""
+        try:
+            self._queue.put_nowait({'ts': time.time(), 'kind': kind, **params})
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        with open(self.path, 'a', encoding='utf-8') as f:
+            while True:
+                batch = [self._queue.get()]
+                while len(batch) < 1000:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                done = batch[-1] is None
+                lines = [json.dumps(entry, default=str) + "\n" for entry in batch if entry is not None]
+                f.writelines(lines)
+                f.flush()
+                self.written += len(lines)
+                if done:
+                    return
+
+    def close(self) -> None:
+        """Flush queued queries and stop the writer"""
+        self._queue.put(None)
+        self._thread.join()
+
+
+def load_queries(path: Path, kinds: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Captured queries in timestamp order, skipping malformed lines"""
+    queries = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get('kind') in (kinds or QUERY_KINDS):
+                queries.append(entry)
+    return sorted(queries, key=lambda entry: entry['ts'])
+
+
+class InProcessTarget:
+    """Replays queries against a RecipeRecommender in this process"""
+
+    def __init__(self, recommender: Any):
+        self.recommender = recommender
+
+    def run(self, entry: Dict[str, Any]) -> None:
+        kind = entry['kind']
+        if kind == RECOMMEND:
+            self.recommender.recommend(entry.get('ingredients', ""), entry.get('user'),
+                                       **{key: entry[key] for key in RECOMMEND_OPTIONS if key in entry})
+        elif kind == RECIPE:
+            self.recommender.get_recipe_by_name(entry.get('name', ""))
+        else:
+            self.recommender.search_recipes(RecipeQuery.from_params(entry))
+
+    def cache_stats(self) -> Dict[str, Any]:
+        return self.recommender.result_cache.stats()
+
+
+class HttpTarget:
+    """Replays queries against a running app/api.py"""
+
+    def __init__(self, base_url: str = "http://localhost:8502", timeout: float = 10.0):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def _get(self, path: str, params: List[Tuple[str, Any]]) -> Any:
+        query = urllib.parse.urlencode([(key, value) for key, value in params if value is not None])
+        with urllib.request.urlopen(f"{self.base_url}{path}?{query}", timeout=self.timeout) as response:
+            return json.loads(response.read() or b"null")
+
+    def run(self, entry: Dict[str, Any]) -> None:
+        kind = entry['kind']
+        try:
+            if kind == RECOMMEND:
+                self._get("/recommend", [('ingredients', entry.get('ingredients', "")), ('user', entry.get('user'))]
+                          + [(key, entry.get(key)) for key in RECOMMEND_OPTIONS])
+            elif kind == RECIPE:
+                self._get("/recipe", [('name', entry.get('name', ""))])
+            else:
+                params = RecipeQuery.from_params(entry).as_params()
+                self._get("/query", [('ingredients', ",".join(params['ingredients']))]
+                          + [('cuisine', c) for c in params['cuisines'] or []]
+                          + [(key, params[key]) for key in ('mode', 'max_time', 'max_missing', 'text',
+                                                            'min_serves', 'max_serves', 'max_scale')])
+        except urllib.error.HTTPError as e:
+            # A missing recipe is a valid answer, not a failed request
+            if e.code >= 500:
+                raise
+
+    def cache_stats(self) -> Dict[str, Any]:
+        return self._get("/stats", [])['cache']
+
+
+class Replayer:
+    """Drive captured queries against a target and measure it over time
+
+    With `speedup`, queries are sent on the captured schedule compressed by
+    that factor (open loop); latency is measured from the scheduled send
+    time, so a target that falls behind shows the queueing delay. With
+    `concurrency`, that many workers send queries back to back (closed loop).
+    """
+
+    def __init__(self, target: Any, queries: List[Dict[str, Any]], speedup: Optional[float] = None,
+                 concurrency: Optional[int] = None, interval: float = 10.0, max_workers: int = 64):
+        if (speedup is None) == (concurrency is None):
+            raise ValueError("Give exactly one of speedup or concurrency")
+        self.target = target
+        self.queries = queries
+        self.speedup = speedup
+        self.concurrency = concurrency
+        self.interval = interval
+        self.max_workers = max_workers
+        # (seconds since start when sent, latency, ok) per query
+        self._samples: List[Tuple[float, float, bool]] = []
+        self._samples_lock = threading.Lock()
+
+    def _timed(self, entry: Dict[str, Any], scheduled: float, started: float) -> None:
+        try:
+            self.target.run(entry)
+            ok = True
+        except Exception:
+            ok = False
+        latency = time.perf_counter() - scheduled
+        with self._samples_lock:
+            self._samples.append((scheduled - started, latency, ok))
+
+    def _open_loop(self, started: float) -> None:
+        first_ts = self.queries[0]['ts']
+        with ThreadPoolExecutor(self.max_workers) as pool:
+            for entry in self.queries:
+                scheduled = started + (entry['ts'] - first_ts) / self.speedup
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(self._timed, entry, scheduled, started)
+
+    def _closed_loop(self, started: float) -> None:
+        entries: Iterator[Dict[str, Any]] = iter(self.queries)
+        entries_lock = threading.Lock()
+
+        def worker() -> None:
+            while True:
+                with entries_lock:
+                    entry = next(entries, None)
+                if entry is None:
+                    return
+                self._timed(entry, time.perf_counter(), started)
+
+        threads = [threading.Thread(target=worker) for _ in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def run(self) -> List[Dict[str, Any]]:
+        """Replay every query; returns one report per `interval` window"""
+        if not self.queries:
+            return []
+        self._samples = []
+        cache_samples = [(0.0, self._cache_stats())]
+        done = threading.Event()
+        started = time.perf_counter()
+
+        def sample_cache() -> None:
+            while not done.wait(self.interval):
+                cache_samples.append((time.perf_counter() - started, self._cache_stats()))
+
+        sampler = threading.Thread(target=sample_cache, daemon=True)
+        sampler.start()
+        try:
+            if self.speedup is not None:
+                self._open_loop(started)
+            else:
+                self._closed_loop(started)
+        finally:
+            done.set()
+            sampler.join()
+        cache_samples.append((time.perf_counter() - started, self._cache_stats()))
+        return self._report(cache_samples)
+
+    def _cache_stats(self) -> Optional[Dict[str, Any]]:
+        try:
+            return self.target.cache_stats()
+        except Exception:
+            return None
+
+    def _report(self, cache_samples: List[Tuple[float, Optional[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+        sent, latency, ok = (np.asarray(column) for column in zip(*self._samples))
+        window = (sent // self.interval).astype(int)
+        reports = []
+        for w in range(int(window.max()) + 1):
+            in_window = window == w
+            if not in_window.any():
+                continue
+            ms = 1000 * latency[in_window]
+            p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+            reports.append({
+                'start': w * self.interval,
+                'queries': int(in_window.sum()),
+                'p50_ms': float(p50),
+                'p95_ms': float(p95),
+                'p99_ms': float(p99),
+                'error_rate': float(1 - ok[in_window].mean()),
+                'cache_hit_rate': self._hit_rate(cache_samples, w * self.interval, (w + 1) * self.interval),
+            })
+        return reports
+
+    @staticmethod
+    def _hit_rate(cache_samples: List[Tuple[float, Optional[Dict[str, Any]]]], start: float,
+                  end: float) -> Optional[float]:
+        """Hit rate between the cache samples closest to a window's bounds"""
+        samples = [(t, stats) for t, stats in cache_samples if stats is not None]
+        if len(samples) < 2:
+            return None
+        before = min(samples, key=lambda s: abs(s[0] - start))[1]
+        after = min(samples, key=lambda s: abs(s[0] - end))[1]
+        hits = after['hits'] - before['hits']
+        lookups = hits + after['misses'] - before['misses']
+        return hits / lookups if lookups > 0 else None
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=f"Replay queries captured with {QUERY_LOG_ENV}=<path>")
+    parser.add_argument("log", type=Path, help="Captured JSONL query log")
+    pace = parser.add_mutually_exclusive_group(required=True)
+    pace.add_argument("--speedup", type=float, help="Replay the captured schedule this many times faster")
+    pace.add_argument("--concurrency", type=int, help="Send back to back from this many workers")
+    parser.add_argument("--url", default=None, help="Replay against app/api.py at this URL instead of in-process")
+    parser.add_argument("--interval", type=float, default=10.0, help="Report window in seconds")
+    parser.add_argument("--kind", action="append", choices=QUERY_KINDS, help="Only replay these query kinds")
+    parser.add_argument("--repeat", type=int, default=1, help="Replay the log this many times back to back")
+    parser.add_argument("--result-cache", type=int, default=None,
+                        help="Result cache size of the in-process recommender (default $VAVI_RESULT_CACHE, else off)")
+    args = parser.parse_args(argv)
+
+    queries = load_queries(args.log, args.kind)
+    if args.repeat > 1 and queries:
+        span = queries[-1]['ts'] - queries[0]['ts'] + 1.0
+        queries = [{**entry, 'ts': entry['ts'] + r * span} for r in range(args.repeat) for entry in queries]
+
+    if args.url:
+        target: Any = HttpTarget(args.url)
+    else:
+        import warnings
+        from train import RecipeRecommender
+
+        warnings.simplefilter("ignore")
+        recommender = RecipeRecommender(result_cache_size=args.result_cache)
+        recommender.stop_query_capture()  # Don't record the replay itself
+        target = InProcessTarget(recommender)
+
+    print(f"Replaying {len(queries)} queries")
+    print(f"{'window':>8} {'queries':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7} {'cache hits':>10}")
+    for report in Replayer(target, queries, args.speedup, args.concurrency, args.interval).run():
+        hit_rate = report['cache_hit_rate']
+        print(f"{report['start']:>7.0f}s {report['queries']:>8} {report['p50_ms']:>8.2f} {report['p95_ms']:>8.2f} "
+              f"{report['p99_ms']:>8.2f} {report['error_rate']:>7.1%} "
+              f"{'-' if hit_rate is None else format(hit_rate, '.1%'):>10}")
+
+
+if __name__ == "__main__":
+    main()
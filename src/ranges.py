@@ -0,0 +1,93 @@
+import copy
+import math
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class RangeIndex:
+    """Sorted copy of one numeric column for range lookups by binary search"""
+
+    def __init__(self, values: Sequence[float]):
+        values = np.asarray(values, dtype=np.float64)
+        self.order = np.argsort(values, kind='stable')
+        self.sorted_values = values[self.order]
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def appended(self, value: float) -> "RangeIndex":
+        """New index with one more id (len(self)), inserted after equal values like a stable sort"""
+        position = np.searchsorted(self.sorted_values, value, side='right')
+        index = copy.copy(self)
+        index.order = np.insert(self.order, position, len(self.order))
+        index.sorted_values = np.insert(self.sorted_values, position, value)
+        return index
+
+    def ids_between(self, low: Optional[float] = None, high: Optional[float] = None) -> np.ndarray:
+        """Ids with low <= value <= high (None leaves that side open), in value order"""
+        start = 0 if low is None else np.searchsorted(self.sorted_values, low, side='left')
+        stop = len(self.order) if high is None else np.searchsorted(self.sorted_values, high, side='right')
+        return self.order[start:stop]
+
+    def mask_between(self, low: Optional[float] = None, high: Optional[float] = None) -> np.ndarray:
+        """Boolean mask over ids of values inside the range"""
+        mask = np.zeros(len(self.order), dtype=bool)
+        mask[self.ids_between(low, high)] = True
+        return mask
+
+
+def serves_bounds(min_serves: Optional[int], max_serves: Optional[int],
+                  max_scale: float = 1.0) -> Tuple[Optional[int], Optional[int]]:
+    """Servings range a recipe must have to reach [min_serves, max_serves] when scaled up
+
+    A recipe serving 4 that may be doubled (max_scale=2) covers 4 to 8
+    people, so it qualifies for "serves >= 6".
+    """
+    low = None if min_serves is None else math.ceil(min_serves / max_scale)
+    return low, max_serves
+
+
+class AttributeIndex:
+    """Range indexes on cooking time and servings plus cuisine posting lists
+
+    Every filter resolves to a boolean mask over recipe ids with a few binary
+    searches, so the per-recipe Python loop only has to check ingredients.
+    """
+
+    def __init__(self, cooking_times: Sequence[int], serves: Sequence[int], cuisines: Sequence[str]):
+        self.cooking_time = RangeIndex(cooking_times)
+        self.serves = RangeIndex(serves)
+        self.cuisine_ids: Dict[str, np.ndarray] = {}
+        cuisines = np.asarray(cuisines, dtype=object)
+        for cuisine in set(cuisines.tolist()):
+            self.cuisine_ids[cuisine] = np.flatnonzero(cuisines == cuisine)
+
+    def __len__(self) -> int:
+        return len(self.cooking_time)
+
+    def appended(self, cooking_time: int, serves: int, cuisine: str) -> "AttributeIndex":
+        """New index with one more recipe (id len(self)), leaving this one untouched"""
+        recipe_id = len(self)
+        index = copy.copy(self)
+        index.cooking_time = self.cooking_time.appended(cooking_time)
+        index.serves = self.serves.appended(serves)
+        index.cuisine_ids = dict(self.cuisine_ids)
+        index.cuisine_ids[cuisine] = np.append(self.cuisine_ids.get(cuisine, np.zeros(0, dtype=np.int64)), recipe_id)
+        return index
+
+    def mask(self, max_time: Optional[int] = None, min_serves: Optional[int] = None,
+             max_serves: Optional[int] = None, cuisines: Optional[Iterable[str]] = None,
+             max_scale: float = 1.0) -> np.ndarray:
+        """Recipes passing every given filter (None means no filter)"""
+        mask = np.ones(len(self), dtype=bool)
+        if max_time is not None:
+            mask &= self.cooking_time.mask_between(None, max_time)
+        if min_serves is not None or max_serves is not None:
+            mask &= self.serves.mask_between(*serves_bounds(min_serves, max_serves, max_scale))
+        if cuisines is not None:
+            in_cuisines = np.zeros(len(self), dtype=bool)
+            for cuisine in cuisines:
+                in_cuisines[self.cuisine_ids.get(cuisine, [])] = True
+            mask &= in_cuisines
+        return mask
@@ -0,0 +1,170 @@
+import argparse
+import json
+import os
+import pickle
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+MODEL_FILE = "word2vec.model"
+META_FILE = "meta.json"
+ROUTING_FILE = "routing.json"
+
+DEFAULT_ROUTING = {
+    'primary': None,         # None serves the unversioned models/ files
+    'candidate': None,       # Second version served side by side
+    'candidate_share': 0.0,  # Fraction of users routed to the candidate
+    'shadow': False,         # Also score every request with the other version, off the request path
+    'salt': "ab-1",          # Change to reshuffle which users land in the candidate bucket
+}
+
+
+def knn_file(index_config: Optional[Dict[str, Any]] = None) -> str:
+    """File name of the pickled index for an index configuration"""
+    quantization = (index_config or {}).get('quantization')
+    return f"knn_{quantization}.pkl" if quantization else "knn.pkl"
+
+
+class ModelRegistry:
+    """Versioned Word2Vec models and indexes under models/registry/<version>/
+
+    Each version directory holds the model, its pickled index and a
+    meta.json with how it was built. meta.json is written last, so a
+    version only becomes visible once its artifacts are complete. Versions
+    are never modified after registration; routing.json says which of them
+    to serve (see src/experiments.py).
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def path(self, version: str) -> Path:
+        if not version or '/' in version or version.startswith('.'):
+            raise ValueError(f"Invalid model version name '{version}'")
+        return self.root / version
+
+    def versions(self) -> List[str]:
+        """Registered versions, oldest first"""
+        if not self.root.exists():
+            return []
+        found = [p.name for p in self.root.iterdir() if (p / META_FILE).exists()]
+        return sorted(found, key=lambda version: self.meta(version).get('created', 0))
+
+    def meta(self, version: str) -> Dict[str, Any]:
+        meta_path = self.path(version) / META_FILE
+        if not meta_path.exists():
+            raise KeyError(f"Model version '{version}' is not registered")
+        return json.loads(meta_path.read_text())
+
+    def reserve(self, version: str) -> Path:
+        """Create the directory a new version's artifacts are built in"""
+        path = self.path(version)
+        if (path / META_FILE).exists():
+            raise ValueError(f"Model version '{version}' already exists")
+        # Leftovers of an interrupted registration
+        shutil.rmtree(path, ignore_errors=True)
+        path.mkdir(parents=True)
+        return path
+
+    def register(self, version: str, model: Any, knn: Any, meta: Dict[str, Any]) -> Path:
+        """Save a model and its index as a new version (reserve() first if the index writes files)"""
+        path = self.path(version)
+        if not path.exists():
+            self.reserve(version)
+        model.save(str(path / MODEL_FILE))
+        with open(path / knn_file(meta.get('index_config')), 'wb') as f:
+            pickle.dump(knn, f)
+        meta = {'version': version, 'created': time.time(), 'vector_size': model.vector_size, **meta}
+        self._write_json(path / META_FILE, meta)
+        return path
+
+    def delete(self, version: str) -> None:
+        if version in (self.routing()['primary'], self.routing()['candidate']):
+            raise ValueError(f"Model version '{version}' is being served")
+        shutil.rmtree(self.path(version))
+
+    def routing(self) -> Dict[str, Any]:
+        routing_path = self.root / ROUTING_FILE
+        if not routing_path.exists():
+            return dict(DEFAULT_ROUTING)
+        return {**DEFAULT_ROUTING, **json.loads(routing_path.read_text())}
+
+    def set_routing(self, **changes: Any) -> Dict[str, Any]:
+        """Update routing.json; versions must be registered"""
+        unknown = set(changes) - set(DEFAULT_ROUTING)
+        if unknown:
+            raise ValueError(f"Unknown routing settings: {', '.join(sorted(unknown))}")
+        routing = {**self.routing(), **changes}
+        for key in ('primary', 'candidate'):
+            if routing[key] is not None:
+                self.meta(routing[key])
+        if not 0.0 <= routing['candidate_share'] <= 1.0:
+            raise ValueError("candidate_share must be between 0 and 1")
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._write_json(self.root / ROUTING_FILE, routing)
+        return routing
+
+    @staticmethod
+    def _write_json(path: Path, payload: Dict[str, Any]) -> None:
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_text(json.dumps(payload, indent=2, default=str))
+        os.replace(tmp_path, path)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import warnings
+    from experiments import register_model
+    from train import RecipeRecommender
+
+    parser = argparse.ArgumentParser(description="Manage versioned recommender models")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="Show registered versions and the routing")
+    register = commands.add_parser("import", help="Register the model currently in models/ as a version")
+    register.add_argument("version")
+    delete = commands.add_parser("delete", help="Remove a version that isn't being served")
+    delete.add_argument("version")
+    route = commands.add_parser("route", help="Change which versions are served")
+    route.add_argument("--primary", default=None)
+    route.add_argument("--candidate", default=None)
+    route.add_argument("--no-candidate", action="store_true", help="Stop serving the candidate")
+    route.add_argument("--share", type=float, default=None, help="Fraction of users routed to the candidate")
+    route.add_argument("--shadow", choices=("on", "off"), default=None)
+    route.add_argument("--salt", default=None)
+    args = parser.parse_args(argv)
+
+    warnings.simplefilter("ignore")
+    registry = ModelRegistry(Path(__file__).resolve().parent.parent / "models" / "registry")
+    if args.command == "list":
+        routing = registry.routing()
+        for version in registry.versions():
+            meta = registry.meta(version)
+            roles = [role for role in ('primary', 'candidate') if routing[role] == version]
+            print(f"{version:20s} {time.strftime('%Y-%m-%d %H:%M', time.localtime(meta['created']))} "
+                  f"dim={meta['vector_size']} recipes={meta.get('n_recipes', '?')} {' '.join(roles)}")
+        print(f"Routing: {json.dumps(routing)}")
+    elif args.command == "import":
+        recommender = RecipeRecommender()
+        register_model(recommender, ModelRegistry(recommender.REGISTRY_DIR), args.version, recommender.model,
+                       {'source': "models/"})
+        print(f"Registered {args.version}")
+    elif args.command == "delete":
+        registry.delete(args.version)
+        print(f"Deleted {args.version}")
+    else:
+        changes: Dict[str, Any] = {}
+        if args.primary is not None:
+            changes['primary'] = args.primary
+        if args.candidate is not None or args.no_candidate:
+            changes['candidate'] = None if args.no_candidate else args.candidate
+        if args.share is not None:
+            changes['candidate_share'] = args.share
+        if args.shadow is not None:
+            changes['shadow'] = args.shadow == "on"
+        if args.salt is not None:
+            changes['salt'] = args.salt
+        print(f"Routing: {json.dumps(registry.set_routing(**changes))}")
+
+
+if __name__ == "__main__":
+    main()
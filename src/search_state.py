@@ -0,0 +1,211 @@
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional
+
+import numpy as np
+
+from ranges import serves_bounds
+
+ANY_OF = "any"
+ALL_OF = "all"
+COOKABLE = "cookable"  # recipe ingredients covered by the pantry, up to max_missing extra
+
+
+def normalize_ingredient(ingredient: str) -> str:
+    """Standardize ingredient formatting (same rules as RecipeRecommender)"""
+    return ingredient.strip().lower().replace(' ', '_')
+
+
+def build_ingredient_sets(recipes: List[Dict[str, Any]]) -> List[FrozenSet[str]]:
+    """Pre-split every recipe's ingredient string once, indexed by recipe id"""
+    return [
+        frozenset(normalize_ingredient(i) for i in recipe['ingredients'].split(',') if i.strip())
+        for recipe in recipes
+    ]
+
+
+class RecipeQuery:
+    """Ingredient search with cuisine, cooking time, servings and full-text filters
+
+    An empty ingredient list puts no constraint on ingredients in the 'any'
+    and 'all' modes, so a text-only search is possible.
+    """
+
+    def __init__(self, ingredients: Iterable[str], mode: str = ANY_OF,
+                 cuisines: Optional[Iterable[str]] = None, max_time: Optional[int] = None,
+                 max_missing: int = 0, text: str = "", min_serves: Optional[int] = None,
+                 max_serves: Optional[int] = None, max_scale: float = 1.0):
+        self.ingredients = frozenset(normalize_ingredient(i) for i in ingredients if i.strip())
+        self.mode = mode
+        self.max_missing = max_missing if mode == COOKABLE else 0
+        # None means "any cuisine"
+        cuisines = set(cuisines or [])
+        self.cuisines = None if not cuisines or "Any" in cuisines else frozenset(cuisines)
+        self.max_time = max_time
+        # Recipes may be scaled up by max_scale to reach min_serves
+        self.min_serves = min_serves
+        self.max_serves = max_serves
+        self.max_scale = max_scale
+        # Matched against names and steps by a TextIndex; results are ranked by BM25
+        self.text = " ".join(text.split())
+
+    def __eq__(self, other: object) -> bool:
+        return (isinstance(other, RecipeQuery)
+                and self._key() == other._key())
+
+    def __hash__(self) -> int:
+        return hash(self._key())
+
+    def _key(self) -> tuple:
+        return (self.ingredients, self.mode, self.cuisines, self.max_time, self.max_missing, self.text,
+                self.serves_bounds())
+
+    def as_params(self) -> Dict[str, Any]:
+        """JSON-serializable form, accepted back by from_params"""
+        return {
+            'ingredients': sorted(self.ingredients),
+            'mode': self.mode,
+            'cuisines': None if self.cuisines is None else sorted(self.cuisines),
+            'max_time': self.max_time,
+            'max_missing': self.max_missing,
+            'text': self.text,
+            'min_serves': self.min_serves,
+            'max_serves': self.max_serves,
+            'max_scale': self.max_scale,
+        }
+
+    @classmethod
+    def from_params(cls, params: Dict[str, Any]) -> "RecipeQuery":
+        return cls(params.get('ingredients', []), params.get('mode', ANY_OF), params.get('cuisines'),
+                   params.get('max_time'), params.get('max_missing', 0), params.get('text', ""),
+                   params.get('min_serves'), params.get('max_serves'), params.get('max_scale', 1.0))
+
+    def serves_bounds(self) -> tuple:
+        """Range of the recipes' own 'serves' value that passes the servings filter"""
+        return serves_bounds(self.min_serves, self.max_serves, self.max_scale)
+
+    def narrows(self, previous: Optional["RecipeQuery"]) -> bool:
+        """True if every recipe matching this query also matched `previous`"""
+        # Adding text terms can widen a BM25 match, so only identical text narrows
+        if previous is None or previous.mode != self.mode or previous.text != self.text:
+            return False
+
+        if self.mode == ALL_OF:
+            ingredients_ok = self.ingredients >= previous.ingredients
+        elif self.mode == COOKABLE:
+            # A smaller pantry or fewer allowed extras can only drop recipes
+            ingredients_ok = (self.ingredients <= previous.ingredients
+                              and self.max_missing <= previous.max_missing)
+        else:
+            ingredients_ok = self.ingredients <= previous.ingredients and (
+                bool(self.ingredients) or not previous.ingredients)
+
+        time_ok = previous.max_time is None or (
+            self.max_time is not None and self.max_time <= previous.max_time)
+        cuisines_ok = previous.cuisines is None or (
+            self.cuisines is not None and self.cuisines <= previous.cuisines)
+        (low, high), (previous_low, previous_high) = self.serves_bounds(), previous.serves_bounds()
+        serves_ok = (previous_low is None or (low is not None and low >= previous_low)) and (
+            previous_high is None or (high is not None and high <= previous_high))
+        return ingredients_ok and time_ok and cuisines_ok and serves_ok
+
+    def matches(self, recipe: Dict[str, Any], recipe_ingredients: FrozenSet[str]) -> bool:
+        """Check a single recipe against the query"""
+        return self.matches_ingredients(recipe_ingredients) and self.passes_filters(recipe)
+
+    def matches_ingredients(self, recipe_ingredients: FrozenSet[str]) -> bool:
+        """Check only the ingredient condition"""
+        if self.mode == ALL_OF:
+            return self.ingredients <= recipe_ingredients
+        if self.mode == COOKABLE:
+            return len(recipe_ingredients - self.ingredients) <= self.max_missing
+        return not self.ingredients or not self.ingredients.isdisjoint(recipe_ingredients)
+
+    def passes_filters(self, recipe: Dict[str, Any]) -> bool:
+        """Check only the cuisine, cooking time and servings filters"""
+        if self.cuisines is not None and recipe['cuisine'] not in self.cuisines:
+            return False
+        if self.max_time is not None and recipe['cooking_time'] > self.max_time:
+            return False
+        low, high = self.serves_bounds()
+        return (low is None or recipe['serves'] >= low) and (high is None or recipe['serves'] <= high)
+
+    def filter_mask(self, attribute_index: Any) -> np.ndarray:
+        """passes_filters for every recipe at once, from an AttributeIndex"""
+        return attribute_index.mask(self.max_time, self.min_serves, self.max_serves,
+                                    self.cuisines, self.max_scale)
+
+
+class QueryState:
+    """Last query of a session and the ids of the recipes it matched
+
+    Kept in ``st.session_state`` so a rerun reuses the previous result, and a
+    narrower query only re-checks the previous candidates instead of the
+    whole catalog.
+    """
+
+    def __init__(self, recipes: List[Dict[str, Any]],
+                 ingredient_sets: Optional[List[FrozenSet[str]]] = None,
+                 cookable_index: Optional[Any] = None, text_index: Optional[Any] = None,
+                 attribute_index: Optional[Any] = None):
+        """
+        Args:
+            recipes: Catalog, indexed by recipe id
+            ingredient_sets: Precomputed build_ingredient_sets(recipes)
+            cookable_index: Optional CookableIndex used to answer cookable
+                queries with bitset popcounts instead of per-recipe set checks
+            text_index: TextIndex over the same recipe ids, needed for
+                queries with text
+            attribute_index: Optional AttributeIndex resolving the cuisine,
+                time and servings filters by binary search up front
+        """
+        self.recipes = recipes
+        self.ingredient_sets = ingredient_sets or build_ingredient_sets(recipes)
+        self.cookable_index = cookable_index
+        self.text_index = text_index
+        self.attribute_index = attribute_index
+        self.query: Optional[RecipeQuery] = None
+        self.candidate_ids: List[int] = []
+        self.last_update_incremental = False
+
+    def update(self, query: RecipeQuery) -> List[int]:
+        """Apply a new query and return the matching recipe ids"""
+        if query == self.query:
+            return self.candidate_ids
+
+        self.last_update_incremental = query.narrows(self.query)
+        pool = self.candidate_ids if self.last_update_incremental else range(len(self.recipes))
+        check_filters = self.attribute_index is None
+        if not check_filters:
+            # Cuisine, time and servings resolved as one mask; only ingredients are left to check
+            pool = np.asarray(pool, dtype=np.int64)
+            pool = pool[query.filter_mask(self.attribute_index)[pool]].tolist()
+
+        if query.mode == COOKABLE and self.cookable_index is not None:
+            # Ingredient coverage checked for the whole pool with bitset popcounts
+            pool, _ = self.cookable_index.cookable(query.ingredients, query.max_missing,
+                                                   candidates=list(pool))
+            self.candidate_ids = [i for i in pool.tolist()
+                                  if not check_filters or query.passes_filters(self.recipes[i])]
+        else:
+            self.candidate_ids = [
+                i for i in pool
+                if query.matches_ingredients(self.ingredient_sets[i])
+                and (not check_filters or query.passes_filters(self.recipes[i]))
+            ]
+        if query.text:
+            if self.text_index is None:
+                raise ValueError("Text search needs a text index")
+            # Keep the ingredient matches that match the text, best BM25 score first
+            ids, _ = self.text_index.search(query.text, k=None, candidates=self.candidate_ids)
+            self.candidate_ids = ids.tolist()
+        self.query = query
+        return self.candidate_ids
+
+    def clear(self) -> None:
+        """Forget the last query"""
+        self.query = None
+        self.candidate_ids = []
+        self.last_update_incremental = False
+
+    def results(self) -> List[Dict[str, Any]]:
+        """Resolve the current candidate ids to recipe dicts"""
+        return [self.recipes[i] for i in self.candidate_ids]
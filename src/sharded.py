@@ -0,0 +1,236 @@
+import multiprocessing as mp
+import os
+import time
+import warnings
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from catalog import CatalogSnapshot
+from quantize import normalize_rows
+from train import RecipeRecommender
+
+# Normalized embedding matrix shared by the workers, in models/
+EMBEDDINGS_FILE = "recipe_embeddings.npy"
+
+# Set per worker process by _init_worker, remapped when the parent re-shards
+_EMBEDDINGS: Optional[np.ndarray] = None
+_GENERATION = 0
+
+
+def _init_worker(embeddings_path: str) -> None:
+    """Memory-map the shared embedding matrix in a worker process"""
+    global _EMBEDDINGS, _GENERATION
+    _EMBEDDINGS = np.load(embeddings_path, mmap_mode='r')
+    _GENERATION = 0
+
+
+def _search_shard(start: int, stop: int, queries: np.ndarray, k: int, embeddings_path: str = "",
+                  generation: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-k cosine search over rows [start, stop) of the shared matrix
+
+    The matrix is mapped again when the task comes from a newer generation
+    than the worker has mapped. Rows keep their contents across
+    generations, so tasks of an older one can read a newer matrix.
+
+    Returns:
+        (n_queries, k') distances and global row indices, k' = min(k, shard size)
+    """
+    global _EMBEDDINGS, _GENERATION
+    if generation > _GENERATION:
+        _EMBEDDINGS, _GENERATION = np.load(embeddings_path, mmap_mode='r'), generation
+    block = _EMBEDDINGS[start:stop]
+    distances = 1 - queries @ block.T
+    k = min(k, stop - start)
+    top = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(distances, top, axis=1), top + start
+
+
+class ShardedRecipeRecommender(RecipeRecommender):
+    """RecipeRecommender whose nearest-neighbor search is split across processes
+
+    The recipe embedding matrix is saved once as a .npy file and memory-mapped
+    by every worker, so shards share the OS page cache instead of each holding
+    a copy. A query (or batch) is scattered to all shards and the per-shard
+    top-k lists are merged with a brute-force search of the recipes added
+    since the matrix was written (the snapshot's delta). Compaction writes
+    the matrix again, so the shards take over the recipes leaving the delta.
+
+    Usage:
+        with ShardedRecipeRecommender(n_shards=4, shard_timeout=0.5) as rec:
+            rec.recommend("rice,tomatoes")
+    """
+
+    def __init__(self, n_shards: Optional[int] = None, n_neighbors: int = 5,
+                 shard_timeout: Optional[float] = None, allow_partial: bool = True):
+        """
+        Args:
+            n_shards: Number of shards/worker processes (default: CPU count)
+            n_neighbors: Number of recipes returned per query
+            shard_timeout: Seconds to wait for all shards, None waits forever
+            allow_partial: Return results from the shards that answered in
+                time instead of raising TimeoutError
+        """
+        super().__init__()
+        self.n_neighbors = n_neighbors
+        self.shard_timeout = shard_timeout
+        self.allow_partial = allow_partial
+
+        self.embeddings_path = self.MODEL_DIR / EMBEDDINGS_FILE
+        self.n_shards = max(1, min(n_shards or os.cpu_count() or 1, len(self.df)))
+        self._layout = self._write_shards(self._snapshot, 0)
+
+        self._pool = mp.get_context("spawn").Pool(
+            self.n_shards, initializer=_init_worker, initargs=(str(self.embeddings_path),)
+        )
+
+    @property
+    def shards(self) -> List[Tuple[int, int]]:
+        """Row range [start, stop) of every shard"""
+        return self._layout[2]
+
+    def _write_shards(self, snapshot: CatalogSnapshot, generation: int) -> Tuple[int, int, List[Tuple[int, int]]]:
+        """Save the snapshot's embeddings for the workers and split them into shards
+
+        Returns:
+            (generation, rows written, shard row ranges), swapped in as one value
+        """
+        embeddings = np.asarray([self._get_recipe_embedding(ings) for ings in snapshot.df['ingredients']],
+                                dtype=np.float32).reshape(len(snapshot.df), self.model.vector_size)
+        self._save_embeddings(self.embeddings_path, embeddings)
+        n_rows = len(embeddings)
+        bounds = np.linspace(0, n_rows, min(self.n_shards, n_rows) + 1).astype(int)
+        return generation, n_rows, list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+    @staticmethod
+    def _save_embeddings(path: Path, embeddings: np.ndarray) -> None:
+        """Write normalized embeddings atomically so running workers never see a partial file"""
+        tmp_path = path.with_suffix(".tmp.npy")
+        np.save(tmp_path, normalize_rows(embeddings))
+        os.replace(tmp_path, path)
+
+    def compact(self) -> None:
+        """Refit the index and re-shard, so the recipes leaving the delta are in the shards
+
+        Holds the write lock throughout (queries don't wait), so no recipe
+        is added between writing the shards and publishing the refit.
+        """
+        with self._write_lock:
+            self._layout = self._write_shards(self._snapshot, self._layout[0] + 1)
+            super().compact()
+
+    def _search(self, query_vec: np.ndarray, snapshot: CatalogSnapshot, k: Optional[int] = None,
+                deadline: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray, bool]:
+        """Find the nearest recipes to a query vector across all shards and the delta
+
+        Deleted recipes are filtered out. Results are incomplete if a shard
+        timed out.
+        """
+        k = k or self.n_neighbors
+        layout = self._layout
+        # Ask for extra neighbors so tombstones can be skipped
+        distances, indices, complete = self._search_batch(np.asarray([query_vec]), k + snapshot.n_deleted,
+                                                          deadline, layout)
+        distances, indices = self._merged(snapshot, layout, np.asarray(query_vec), distances[0], indices[0], k)
+        return distances, indices, complete
+
+    @staticmethod
+    def _merged(snapshot: CatalogSnapshot, layout: Tuple[int, int, List[Tuple[int, int]]], query_vec: np.ndarray,
+                distances: np.ndarray, indices: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Shard results merged with the delta recipes the shards don't hold, live recipes only, nearest first"""
+        n_rows = layout[1]
+        tail = snapshot.delta_ids >= n_rows
+        if tail.any():
+            query = normalize_rows(query_vec[None, :].astype(np.float32))[0]
+            distances = np.concatenate([distances, 1 - (snapshot.delta[tail] @ query).astype(distances.dtype)])
+            indices = np.concatenate([indices, snapshot.delta_ids[tail]])
+        # Shards written after this snapshot was taken may hold recipes it doesn't know
+        keep = indices < len(snapshot.alive)
+        keep[keep] = snapshot.alive[indices[keep]]
+        distances, indices = distances[keep], indices[keep]
+        order = np.argsort(distances, kind='stable')[:k]
+        return distances[order], indices[order]
+
+    def _search_batch(self, queries: np.ndarray, k: Optional[int] = None, deadline: Optional[float] = None,
+                      layout: Optional[Tuple[int, int, List[Tuple[int, int]]]] = None
+                      ) -> Tuple[np.ndarray, np.ndarray, bool]:
+        """Scatter a batch of query vectors to every shard and merge the top-k (default n_neighbors)
+
+        Shards are waited for until shard_timeout or the request `deadline`
+        (time.monotonic()), whichever comes first.
+
+        Returns:
+            Distances and row indices, plus whether every shard answered
+        """
+        k = k or self.n_neighbors
+        generation, _, shards = layout or self._layout
+        queries = normalize_rows(np.asarray(queries, dtype=np.float32))
+        pending = [
+            self._pool.apply_async(_search_shard, (start, stop, queries, k, str(self.embeddings_path), generation))
+            for start, stop in shards
+        ]
+
+        if self.shard_timeout is not None:
+            shard_deadline = time.monotonic() + self.shard_timeout
+            deadline = shard_deadline if deadline is None else min(deadline, shard_deadline)
+        parts = []
+        for shard, result in zip(shards, pending):
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                parts.append(result.get(timeout))
+            except mp.TimeoutError:
+                if not self.allow_partial:
+                    raise TimeoutError(f"Shard {shard} did not answer in time")
+                warnings.warn(f"Shard {shard} timed out, returning partial results")
+
+        if not parts:
+            raise TimeoutError("No shard answered in time")
+
+        distances = np.concatenate([d for d, _ in parts], axis=1)
+        indices = np.concatenate([i for _, i in parts], axis=1)
+        order = np.argsort(distances, axis=1, kind='stable')[:, :k]
+        return (np.take_along_axis(distances, order, axis=1), np.take_along_axis(indices, order, axis=1),
+                len(parts) == len(shards))
+
+    def recommend_batch(self, user_inputs: List[str]) -> List[pd.DataFrame]:
+        """
+        Get recommendations for many ingredient strings with one scatter/gather
+        Args:
+            user_inputs: Comma-separated ingredient strings
+        Returns:
+            One DataFrame per input, ranked like recommend(): deleted
+            recipes are skipped, recipes added since startup included and
+            popularity/CTR priors applied
+        """
+        snapshot = self._snapshot
+        layout = self._layout
+        vectors = [self._get_ingredients_vector(self._process_input(text)) for text in user_inputs]
+        valid = [i for i, vec in enumerate(vectors) if vec is not None]
+
+        results = [pd.DataFrame() for _ in user_inputs]
+        if valid:
+            distances, indices, _ = self._search_batch(np.asarray([vectors[i] for i in valid]),
+                                                       self.n_neighbors + snapshot.n_deleted, layout=layout)
+            for row, i in enumerate(valid):
+                row_distances, ids = self._merged(snapshot, layout, np.asarray(vectors[i]), distances[row],
+                                                  indices[row], self.n_neighbors)
+                similarity = 1 - row_distances
+                scores = None if self._priors is None else similarity + self._prior_boost(ids)
+                results[i] = self._ranked(snapshot, ids, similarity, scores)
+        for i, vec in enumerate(vectors):
+            if vec is None and self._process_input(user_inputs[i]):
+                results[i] = self._sample(snapshot)
+        return results
+
+    def close(self) -> None:
+        """Stop the worker processes"""
+        self._pool.terminate()
+        self._pool.join()
+
+    def __enter__(self) -> "ShardedRecipeRecommender":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
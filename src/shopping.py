@@ -0,0 +1,117 @@
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+OTHER = "Other"
+
+# Checked in order against the underscore-separated words of an ingredient,
+# so "peanut_butter" is a spread before "butter" makes it dairy
+CATEGORY_KEYWORDS: List[Tuple[str, Tuple[str, ...]]] = [
+    ("Sauces & Condiments", ("sauce", "sauces", "paste", "ketchup", "mayonnaise", "mustard", "vinegar",
+                             "glaze", "dressing", "salsa", "gochujang", "tahini", "honey", "syrup",
+                             "peanut_butter", "kimchi", "pickles", "pickle", "pickled", "sauerkraut",
+                             "wasabi", "mirin", "jaggery")),
+    ("Oils & Stocks", ("oil", "ghee", "lard", "stock", "broth")),
+    ("Meat & Seafood", ("chicken", "beef", "pork", "lamb", "duck", "bacon", "pancetta", "sausage",
+                        "spam", "veal", "meat", "fish", "shrimp", "clams", "crab", "chashu_pork")),
+    ("Dairy & Eggs", ("milk", "buttermilk", "butter", "cream", "cheese", "mozzarella", "yogurt",
+                      "egg", "eggs", "egg_yolk")),
+    ("Grains, Pasta & Bakery", ("rice", "flour", "bread", "breadcrumbs", "buns", "baguette", "noodles",
+                                "pasta", "spaghetti", "fettuccine", "macaroni", "vermicelli", "bulgur",
+                                "semolina", "cornmeal", "masa", "tortillas", "dough", "crust", "shells",
+                                "wrappers", "ladyfingers", "graham_crackers", "pancakes", "dal", "oats")),
+    ("Spices & Herbs", ("salt", "black_pepper", "pepper", "cumin", "coriander", "cinnamon", "cardamom",
+                        "paprika", "oregano", "basil", "thyme", "rosemary", "sage", "dill", "mint",
+                        "parsley", "cilantro", "bay_leaves", "nutmeg", "saffron", "star_anise",
+                        "five_spice", "fenugreek", "asafoetida", "turmeric", "curry_leaves", "powder",
+                        "seeds", "vanilla", "achiote")),
+    ("Baking & Sweets", ("sugar", "chocolate", "chocolate_chips", "yeast", "baking_powder", "baking_soda",
+                         "gelatin", "cornstarch", "cocoa_powder", "condensed_milk", "raisins")),
+    ("Produce", ("onion", "onions", "garlic", "ginger", "tomato", "tomatoes", "potatoes", "peppers",
+                 "bell_pepper", "bell_peppers", "chilies", "chillies", "chili", "jalapeño", "lettuce",
+                 "cucumber", "carrots", "celery", "cabbage", "spinach", "broccoli", "zucchini", "eggplant",
+                 "corn", "avocado", "avocados", "lemon_juice", "lime_juice", "orange_juice", "apples",
+                 "pear", "pineapple", "berries", "coconut", "mushrooms", "scallions", "green_onions",
+                 "shallots", "radishes", "vegetables", "lemongrass", "galangal", "bean_sprouts",
+                 "kaffir_lime_leaves", "grape_leaves", "tofu", "beans", "chickpeas", "nuts", "almonds",
+                 "cashews", "walnuts", "peanuts", "pistachios", "pine_nuts", "olives", "kalamata_olives")),
+]
+
+# Whole-name exceptions to the keyword rules
+CATEGORY_OVERRIDES = {
+    "baking_powder": "Baking & Sweets",
+    "cocoa_powder": "Baking & Sweets",
+    "condensed_milk": "Baking & Sweets",
+    "coconut_oil": "Oils & Stocks",
+    "rice_paper": "Grains, Pasta & Bakery",
+    "corn_husks": "Grains, Pasta & Bakery",
+    "nori": "Grains, Pasta & Bakery",
+    "wakame": "Produce",
+    "water": OTHER,
+}
+
+
+@lru_cache(maxsize=None)
+def categorize(ingredient: str) -> str:
+    """Store section of a normalized ingredient name"""
+    if ingredient in CATEGORY_OVERRIDES:
+        return CATEGORY_OVERRIDES[ingredient]
+    words = ingredient.split('_')
+    for category, keywords in CATEGORY_KEYWORDS:
+        if ingredient in keywords:
+            return category
+    # Last word first: "chicken_stock" is a stock, "tomato_sauce" a sauce
+    for word in reversed(words):
+        for category, keywords in CATEGORY_KEYWORDS:
+            if word in keywords:
+                return category
+    return OTHER
+
+
+def resolve_recipe_ids(recipes: Sequence[Any], name_index: Dict[str, int],
+                       alive: np.ndarray) -> Tuple[np.ndarray, List[Any]]:
+    """Map a mixed batch of recipe ids and names to live recipe ids in one pass
+
+    Returns:
+        Resolved ids (duplicates kept, input order) and the entries that
+        didn't resolve
+    """
+    batch = pd.Series(list(recipes), dtype=object)
+    is_id = batch.map(lambda r: isinstance(r, (int, np.integer)))
+    ids = pd.Series(-1, index=batch.index, dtype=np.int64)
+    ids[is_id] = batch[is_id].astype(np.int64)
+    ids[~is_id] = batch[~is_id].astype(str).str.lower().map(name_index).fillna(-1).astype(np.int64)
+
+    ids = ids.to_numpy()
+    valid = (ids >= 0) & (ids < len(alive))
+    valid[valid] = alive[ids[valid]]
+    return ids[valid], batch[~valid].tolist()
+
+
+def shopping_list(bits: np.ndarray, vocab_names: Sequence[str], recipe_ids: np.ndarray,
+                  pantry_ids: Iterable[int]) -> "OrderedDict[str, List[Dict[str, Any]]]":
+    """Merged ingredients of many recipes minus the pantry, grouped by category
+
+    Args:
+        bits: CookableIndex bitsets, one row per recipe
+        vocab_names: Ingredient name of every bit
+        recipe_ids: Recipes to shop for
+        pantry_ids: Vocabulary ids already at home
+    Returns:
+        Category -> [{'ingredient', 'recipes'}], where 'recipes' counts the
+        recipes needing it; categories and items in alphabetical order
+    """
+    n_bits = bits.shape[1] * 64
+    unpacked = np.unpackbits(bits[recipe_ids].view(np.uint8), axis=1, bitorder='little')
+    counts = unpacked.sum(axis=0, dtype=np.int64) if len(recipe_ids) else np.zeros(n_bits, dtype=np.int64)
+    counts[np.fromiter(pantry_ids, dtype=np.int64)] = 0
+
+    grouped: Dict[str, List[Dict[str, Any]]] = {}
+    for ingredient_id in np.flatnonzero(counts[:len(vocab_names)]):
+        name = vocab_names[ingredient_id]
+        grouped.setdefault(categorize(name), []).append({'ingredient': name, 'recipes': int(counts[ingredient_id])})
+    return OrderedDict((category, sorted(items, key=lambda item: item['ingredient']))
+                       for category, items in sorted(grouped.items()))
@@ -0,0 +1,240 @@
+import argparse
+import hashlib
+import json
+import os
+import warnings
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from quantize import normalize_rows
+
+NEIGHBORS_FILE = "neighbors.npy"
+SCORES_FILE = "scores.npy"
+META_FILE = "meta.json"
+
+
+def recipe_fingerprint(recipe: Dict[str, Any]) -> str:
+    """Hash of the fields the neighbor table depends on"""
+    ingredients = recipe['ingredients']
+    if isinstance(ingredients, str):
+        ingredients = ingredients.split(',')
+    key = "|".join([recipe['name'], ",".join(ingredients), recipe['cuisine'], str(recipe['cooking_time'])])
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+def model_fingerprint(model: Any) -> str:
+    """Hash of a Word2Vec model's word vectors; a table built with other vectors is stale"""
+    return hashlib.sha1(np.ascontiguousarray(model.wv.vectors).tobytes()).hexdigest()[:16]
+
+
+def table_settings(table_dir: Path) -> Optional[Dict[str, Any]]:
+    """Settings a table was built with, None if there is no table"""
+    meta_path = table_dir / META_FILE
+    return json.loads(meta_path.read_text())['settings'] if meta_path.exists() else None
+
+
+class SimilarTableBuilder:
+    """Offline job computing each recipe's top-k most similar recipes
+
+    The table is stored as an int32 neighbor matrix (-1 padded) and a float16
+    cosine similarity matrix of shape (n_recipes, k), so serving is a single
+    row read from a memory-mapped file. Serving processes keep the files
+    mapped, so new tables are written to temporary files and renamed over
+    the old ones rather than modified in place.
+    """
+
+    def __init__(self, embeddings: np.ndarray, cuisines: Sequence[str], cooking_times: Sequence[int],
+                 k: int = 10, same_cuisine: bool = False, max_time_diff: Optional[int] = None,
+                 block_size: int = 1024, model: Optional[str] = None):
+        """
+        Args:
+            embeddings: (n_recipes, dim) recipe embedding matrix
+            cuisines: Cuisine per recipe
+            cooking_times: Cooking time (minutes) per recipe
+            k: Neighbors stored per recipe
+            same_cuisine: Only keep neighbors of the same cuisine
+            max_time_diff: Only keep neighbors whose cooking time is within
+                this many minutes of the recipe's own
+            block_size: Rows scored per matrix product
+            model: model_fingerprint of the vectors the embeddings came
+                from; a table built from another model is rebuilt in full
+        """
+        self.embeddings = normalize_rows(embeddings)
+        self.cuisines = np.asarray(cuisines)
+        self.cooking_times = np.asarray(cooking_times)
+        self.k = k
+        self.same_cuisine = same_cuisine
+        self.max_time_diff = max_time_diff
+        self.block_size = block_size
+        self.model = model
+
+    def settings(self) -> Dict[str, Any]:
+        return {'k': self.k, 'same_cuisine': self.same_cuisine, 'max_time_diff': self.max_time_diff,
+                'model': self.model}
+
+    def _score_rows(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k neighbors and similarities for the given recipe ids"""
+        sims = self.embeddings[rows] @ self.embeddings.T
+        sims[np.arange(len(rows)), rows] = -np.inf
+        if self.same_cuisine:
+            sims[self.cuisines[rows][:, None] != self.cuisines[None, :]] = -np.inf
+        if self.max_time_diff is not None:
+            diff = np.abs(self.cooking_times[rows][:, None] - self.cooking_times[None, :])
+            sims[diff > self.max_time_diff] = -np.inf
+
+        k = min(self.k, sims.shape[1])
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        top_sims = np.take_along_axis(sims, top, axis=1)
+        order = np.argsort(-top_sims, axis=1, kind='stable')
+        top = np.take_along_axis(top, order, axis=1)
+        top_sims = np.take_along_axis(top_sims, order, axis=1)
+
+        neighbors = np.full((len(rows), self.k), -1, dtype=np.int32)
+        scores = np.zeros((len(rows), self.k), dtype=np.float16)
+        valid = np.isfinite(top_sims)
+        neighbors[:, :k] = np.where(valid, top, -1)
+        scores[:, :k] = np.where(valid, top_sims, 0)
+        return neighbors, scores
+
+    def _fill(self, neighbors: np.ndarray, scores: np.ndarray, rows: np.ndarray) -> None:
+        for start in range(0, len(rows), self.block_size):
+            block = rows[start:start + self.block_size]
+            neighbors[block], scores[block] = self._score_rows(block)
+
+    def _create(self, out_dir: Path, n_rows: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Empty neighbor and score tables in temporary files next to the served ones"""
+        open_memmap = np.lib.format.open_memmap
+        neighbors = open_memmap(out_dir / (NEIGHBORS_FILE + ".tmp"), mode='w+', dtype=np.int32,
+                                shape=(n_rows, self.k))
+        scores = open_memmap(out_dir / (SCORES_FILE + ".tmp"), mode='w+', dtype=np.float16,
+                             shape=(n_rows, self.k))
+        return neighbors, scores
+
+    def _publish(self, out_dir: Path, neighbors: np.ndarray, scores: np.ndarray, fingerprints: List[str]) -> None:
+        """Swap the temporary tables in; readers that mapped the old files keep reading those"""
+        neighbors.flush()
+        scores.flush()
+        for name in (NEIGHBORS_FILE, SCORES_FILE):
+            os.replace(out_dir / (name + ".tmp"), out_dir / name)
+        self._write_meta(out_dir, fingerprints)
+
+    def build(self, out_dir: Path, fingerprints: List[str]) -> None:
+        """Compute the full table"""
+        out_dir.mkdir(parents=True, exist_ok=True)
+        n_rows = len(self.embeddings)
+        neighbors, scores = self._create(out_dir, n_rows)
+        self._fill(neighbors, scores, np.arange(n_rows))
+        self._publish(out_dir, neighbors, scores, fingerprints)
+
+    def refresh(self, out_dir: Path, fingerprints: List[str]) -> int:
+        """Recompute only the rows affected by changed or appended recipes
+
+        A row is recomputed when the recipe itself changed or is new, when
+        one of its stored neighbors changed, or when a changed recipe now
+        scores above its current k-th neighbor. Falls back to a full build
+        when the table settings or model differ, or the catalog shrank.
+
+        Returns:
+            Number of rows recomputed
+        """
+        meta_path = out_dir / META_FILE
+        old_meta = json.loads(meta_path.read_text()) if meta_path.exists() else {}
+        old_fingerprints = old_meta.get('fingerprints', [])
+        n_old = len(old_fingerprints)
+        if old_meta.get('settings') != self.settings() or n_old > len(fingerprints):
+            self.build(out_dir, fingerprints)
+            return len(fingerprints)
+
+        changed = np.flatnonzero(np.asarray(old_fingerprints) != np.asarray(fingerprints[:n_old]))
+        changed = np.concatenate([changed, np.arange(n_old, len(fingerprints))])
+        if not len(changed):
+            return 0
+
+        neighbors, scores = self._create(out_dir, len(fingerprints))
+        neighbors[:n_old] = np.load(out_dir / NEIGHBORS_FILE, mmap_mode='r')
+        scores[:n_old] = np.load(out_dir / SCORES_FILE, mmap_mode='r')
+        affected = np.isin(neighbors, changed).any(axis=1)
+        affected[changed] = True
+
+        # Rows whose k-th score a changed recipe might now beat
+        rest = np.flatnonzero(~affected)
+        kth = np.where(neighbors[rest, -1] >= 0, scores[rest, -1].astype(np.float32), -np.inf)
+        affected[rest[self._best_changed_score(rest, changed) > kth]] = True
+
+        rows = np.flatnonzero(affected)
+        self._fill(neighbors, scores, rows)
+        self._publish(out_dir, neighbors, scores, fingerprints)
+        return len(rows)
+
+    def _best_changed_score(self, rows: np.ndarray, changed: np.ndarray) -> np.ndarray:
+        """Best allowed similarity from each row to any changed recipe"""
+        sims = self.embeddings[rows] @ self.embeddings[changed].T
+        sims[rows[:, None] == changed[None, :]] = -np.inf
+        if self.same_cuisine:
+            sims[self.cuisines[rows][:, None] != self.cuisines[changed][None, :]] = -np.inf
+        if self.max_time_diff is not None:
+            diff = np.abs(self.cooking_times[rows][:, None] - self.cooking_times[changed][None, :])
+            sims[diff > self.max_time_diff] = -np.inf
+        return sims.max(axis=1, initial=-np.inf)
+
+    def _write_meta(self, out_dir: Path, fingerprints: List[str]) -> None:
+        meta = {'settings': self.settings(), 'fingerprints': list(fingerprints)}
+        tmp_path = out_dir / (META_FILE + ".tmp")
+        tmp_path.write_text(json.dumps(meta))
+        os.replace(tmp_path, out_dir / META_FILE)
+
+
+class SimilarTable:
+    """Read side of the precomputed table, memory-mapped at serve time"""
+
+    def __init__(self, table_dir: Path):
+        self.neighbors = np.load(table_dir / NEIGHBORS_FILE, mmap_mode='r')
+        self.scores = np.load(table_dir / SCORES_FILE, mmap_mode='r')
+
+    def lookup(self, recipe_id: int, k: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Neighbor ids and similarities for one recipe, best first"""
+        neighbors = np.asarray(self.neighbors[recipe_id, :k])
+        scores = np.asarray(self.scores[recipe_id, :k], dtype=np.float32)
+        valid = neighbors >= 0
+        return neighbors[valid], scores[valid]
+
+
+def builder_for(recommender: Any, **settings: Any) -> SimilarTableBuilder:
+    """Create a builder over a RecipeRecommender's catalog and model"""
+    return SimilarTableBuilder(recommender.get_embedding_matrix(), recommender.df['cuisine'].tolist(),
+                               recommender.df['cooking_time'].tolist(),
+                               model=model_fingerprint(recommender.model), **settings)
+
+
+def catalog_fingerprints(recommender: Any) -> List[str]:
+    return [recipe_fingerprint(r) for r in recommender.df.to_dict('records')]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from train import RecipeRecommender
+
+    parser = argparse.ArgumentParser(description="Precompute the similar-recipes table")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--same-cuisine", action="store_true")
+    parser.add_argument("--max-time-diff", type=int, default=None)
+    parser.add_argument("--full", action="store_true", help="Rebuild every row")
+    parser.add_argument("--model-version", default=None, help="Build the table of a registered model version")
+    args = parser.parse_args(argv)
+
+    warnings.simplefilter("ignore")
+    recommender = RecipeRecommender(model_version=args.model_version)
+    builder = builder_for(recommender, k=args.k, same_cuisine=args.same_cuisine,
+                          max_time_diff=args.max_time_diff)
+    fingerprints = catalog_fingerprints(recommender)
+    if args.full:
+        builder.build(recommender.SIMILAR_DIR, fingerprints)
+        print(f"Built similar table for {len(fingerprints)} recipes")
+    else:
+        n_rows = builder.refresh(recommender.SIMILAR_DIR, fingerprints)
+        print(f"Refreshed {n_rows} of {len(fingerprints)} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,437 @@
+import argparse
+import csv
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+# Set to a database path to serve the catalog from SQLite instead of the built-in recipes
+CATALOG_DB_ENV = "VAVI_CATALOG_DB"
+
+# Fields a stored recipe must have (RecipeRecommender.REQUIRED_FIELDS)
+REQUIRED_FIELDS = ('name', 'ingredients', 'steps', 'cuisine', 'cooking_time', 'serves')
+
+# Pages of recipe dicts StoredRecipes keeps in memory
+CACHED_PAGES = 32
+
+# Compiled statements kept per connection; every query below is a constant
+# string, so each is prepared once per thread and reused
+STATEMENT_CACHE_SIZE = 64
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS recipes (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    steps TEXT NOT NULL,
+    cuisine TEXT NOT NULL,
+    cooking_time INTEGER NOT NULL,
+    serves INTEGER NOT NULL,
+    image TEXT NOT NULL,
+    deleted INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS ingredients (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS recipe_ingredients (
+    recipe_id INTEGER NOT NULL REFERENCES recipes(id),
+    position INTEGER NOT NULL,
+    ingredient_id INTEGER NOT NULL REFERENCES ingredients(id),
+    PRIMARY KEY (recipe_id, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS recipe_ingredients_by_ingredient ON recipe_ingredients(ingredient_id, recipe_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS recipes_fts USING fts5(
+    name, steps, content='recipes', content_rowid='id', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS recipes_fts_insert AFTER INSERT ON recipes WHEN new.deleted = 0 BEGIN
+    INSERT INTO recipes_fts(rowid, name, steps) VALUES (new.id, new.name, new.steps);
+END;
+CREATE TRIGGER IF NOT EXISTS recipes_fts_delete AFTER UPDATE OF deleted ON recipes
+WHEN new.deleted = 1 AND old.deleted = 0 BEGIN
+    INSERT INTO recipes_fts(recipes_fts, rowid, name, steps) VALUES ('delete', old.id, old.name, old.steps);
+END;
+"""
+
+_INSERT_RECIPE = ("INSERT INTO recipes (id, name, steps, cuisine, cooking_time, serves, image) "
+                  "VALUES (?, ?, ?, ?, ?, ?, ?)")
+_INSERT_INGREDIENT = "INSERT INTO ingredients (id, name) VALUES (?, ?)"
+_INSERT_LINK = "INSERT INTO recipe_ingredients (recipe_id, position, ingredient_id) VALUES (?, ?, ?)"
+_DELETE_RECIPE = "UPDATE recipes SET deleted = 1 WHERE id = ? AND deleted = 0"
+_NEXT_ID = "SELECT COALESCE(MAX(id) + 1, 0) FROM recipes"
+_COUNT = "SELECT COUNT(*) FROM recipes WHERE deleted = 0 OR ?"
+_PAGE = ("SELECT id, name, steps, cuisine, cooking_time, serves, image, deleted FROM recipes "
+         "WHERE id > ? AND (deleted = 0 OR ?) ORDER BY id LIMIT ?")
+_GET = "SELECT id, name, steps, cuisine, cooking_time, serves, image, deleted FROM recipes WHERE id = ?"
+_PAGE_INGREDIENTS = ("SELECT ri.recipe_id, i.name FROM recipe_ingredients ri JOIN ingredients i "
+                     "ON i.id = ri.ingredient_id WHERE ri.recipe_id BETWEEN ? AND ? ORDER BY ri.recipe_id, ri.position")
+_SEARCH = ("SELECT rowid, bm25(recipes_fts, 2.0, 1.0) AS rank FROM recipes_fts "
+           "WHERE recipes_fts MATCH ? ORDER BY rank LIMIT ?")
+_WITH_INGREDIENT = ("SELECT ri.recipe_id FROM recipe_ingredients ri JOIN ingredients i ON i.id = ri.ingredient_id "
+                    "JOIN recipes r ON r.id = ri.recipe_id WHERE i.name = ? AND r.deleted = 0 ORDER BY ri.recipe_id")
+
+
+def normalize_ingredient(ingredient: str) -> str:
+    """Same normalization as RecipeRecommender._normalize_ingredient"""
+    return ingredient.strip().lower().replace(' ', '_')
+
+
+def _text(raw: Dict[str, Any], field: str) -> str:
+    value = raw[field]
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise ValueError(f"Recipe field '{field}' must be text, got {type(value).__name__}")
+    return str(value).strip()
+
+
+def _parts(raw: Dict[str, Any], field: str, separator: str) -> List[str]:
+    """A list-or-string field as stripped, non-empty strings"""
+    value = raw[field]
+    if isinstance(value, str):
+        value = value.split(separator)
+    if not isinstance(value, (list, tuple)) or not all(isinstance(part, str) for part in value):
+        raise ValueError(f"Recipe field '{field}' must be a string or a list of strings")
+    return [part.strip() for part in value if part.strip()]
+
+
+def _count(raw: Dict[str, Any], field: str, minimum: int) -> int:
+    value = raw[field]
+    try:
+        if isinstance(value, bool):
+            raise TypeError
+        count = int(float(value))
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"Recipe field '{field}' must be a number, got {value!r}") from None
+    if count < minimum:
+        raise ValueError(f"Recipe field '{field}' must be at least {minimum}, got {value!r}")
+    return count
+
+
+def normalize_recipe(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Recipe dict in the catalog's format from a JSON or CSV record
+
+    Ingredients and steps may be lists or strings; steps separated by '|'
+    (the CSV export format) are joined with commas like the built-in recipes.
+
+    Raises:
+        ValueError: If the record isn't a dict, a required field is missing
+            or empty, a field has the wrong type or a number doesn't parse
+    """
+    if not isinstance(raw, dict):
+        raise ValueError(f"Recipe must be an object, got {type(raw).__name__}")
+    missing = [f for f in REQUIRED_FIELDS if raw.get(f) in (None, "", [])]
+    if missing:
+        raise ValueError(f"Recipe '{raw.get('name', '?')}' is missing fields: {', '.join(missing)}")
+    ingredients = _parts(raw, 'ingredients', ',')
+    steps = _parts(raw, 'steps', '|')
+    if not ingredients or not steps:
+        raise ValueError(f"Recipe '{raw['name']}' needs at least one ingredient and one step")
+    image = raw.get('image') or 'default.jpg'
+    if not isinstance(image, str):
+        raise ValueError("Recipe field 'image' must be a file name")
+    return {
+        'name': _text(raw, 'name'),
+        'ingredients': ",".join(normalize_ingredient(i) for i in ingredients),
+        'steps': ",".join(steps),
+        'cuisine': _text(raw, 'cuisine'),
+        'cooking_time': _count(raw, 'cooking_time', 0),
+        'serves': _count(raw, 'serves', 1),
+        'image': image,
+    }
+
+
+def read_recipes(path: Path) -> List[Dict[str, Any]]:
+    """Raw recipe records from a JSON array or a CSV file with a header row"""
+    path = Path(path)
+    if path.suffix.lower() == '.csv':
+        with open(path, newline='', encoding='utf-8') as f:
+            return list(csv.DictReader(f))
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+class RecipeStore:
+    """Persistent recipe catalog in SQLite
+
+    Recipes, ingredients and the ordered recipe-ingredient links are
+    separate tables; an FTS5 table over names and steps is kept in sync by
+    triggers. Recipe ids are assigned densely from 0 and never reused:
+    deleting only sets a tombstone flag, so ids line up with
+    RecipeRecommender's recipe ids.
+
+    Each thread gets its own connection in WAL mode, so readers never block
+    each other or a writer. Writes are serialized by a lock within the
+    process.
+    """
+
+    def __init__(self, path: Path, timeout: float = 10.0):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self.connection().executescript(_SCHEMA)
+
+    def connection(self) -> sqlite3.Connection:
+        """This thread's connection, opened on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, cached_statements=STATEMENT_CACHE_SIZE)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self) -> None:
+        """Close every thread's connection (the store reopens them on next use)"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                # Closing from another thread than the owner's; SQLite closes it on exit
+                pass
+        self._local = threading.local()
+
+    def _ingredient_ids(self, conn: sqlite3.Connection) -> Dict[str, int]:
+        return dict((name, ingredient_id) for ingredient_id, name in conn.execute("SELECT id, name FROM ingredients"))
+
+    def _insert(self, conn: sqlite3.Connection, recipes: List[Tuple[int, Dict[str, Any]]],
+                ingredient_ids: Dict[str, int]) -> None:
+        """Insert normalized recipes with their ids, interning new ingredients into `ingredient_ids`"""
+        new_ingredients, links = [], []
+        for recipe_id, recipe in recipes:
+            for position, name in enumerate(recipe['ingredients'].split(',')):
+                if name not in ingredient_ids:
+                    ingredient_ids[name] = len(ingredient_ids)
+                    new_ingredients.append((ingredient_ids[name], name))
+                links.append((recipe_id, position, ingredient_ids[name]))
+        conn.executemany(_INSERT_INGREDIENT, new_ingredients)
+        conn.executemany(_INSERT_RECIPE, [(recipe_id, r['name'], r['steps'], r['cuisine'], r['cooking_time'],
+                                           r['serves'], r['image']) for recipe_id, r in recipes])
+        conn.executemany(_INSERT_LINK, links)
+
+    def bulk_load(self, records: Iterable[Dict[str, Any]], batch_size: int = 1000) -> Tuple[int, List[str]]:
+        """Append recipes, committing one transaction per batch
+
+        Args:
+            records: Raw recipe records (see normalize_recipe)
+            batch_size: Recipes per transaction
+        Returns:
+            Number of recipes loaded and the error for every skipped record
+        """
+        conn = self.connection()
+        loaded, skipped = 0, []
+        with self._write_lock:
+            ingredient_ids = self._ingredient_ids(conn)
+            next_id = conn.execute(_NEXT_ID).fetchone()[0]
+            batch: List[Tuple[int, Dict[str, Any]]] = []
+            for raw in records:
+                try:
+                    batch.append((next_id + len(batch), normalize_recipe(raw)))
+                except (ValueError, TypeError, AttributeError) as e:
+                    skipped.append(str(e))
+                    continue
+                if len(batch) == batch_size:
+                    with conn:
+                        self._insert(conn, batch, ingredient_ids)
+                    next_id, loaded, batch = next_id + len(batch), loaded + len(batch), []
+            if batch:
+                with conn:
+                    self._insert(conn, batch, ingredient_ids)
+                loaded += len(batch)
+        return loaded, skipped
+
+    def add(self, recipe: Dict[str, Any], recipe_id: Optional[int] = None) -> int:
+        """Store one recipe; `recipe_id` must be the next free id if given"""
+        conn = self.connection()
+        with self._write_lock:
+            next_id = conn.execute(_NEXT_ID).fetchone()[0]
+            if recipe_id is not None and recipe_id != next_id:
+                raise ValueError(f"Recipe id {recipe_id} is out of sequence, the store's next id is {next_id}")
+            with conn:
+                self._insert(conn, [(next_id, normalize_recipe(recipe))], self._ingredient_ids(conn))
+        return next_id
+
+    def delete(self, recipe_id: int) -> bool:
+        """Tombstone a recipe; returns False if it doesn't exist or is already deleted"""
+        conn = self.connection()
+        with self._write_lock, conn:
+            return conn.execute(_DELETE_RECIPE, (int(recipe_id),)).rowcount > 0
+
+    def count(self, include_deleted: bool = False) -> int:
+        return self.connection().execute(_COUNT, (include_deleted,)).fetchone()[0]
+
+    @staticmethod
+    def _recipe(row: Tuple, ingredients: List[str]) -> Dict[str, Any]:
+        _, name, steps, cuisine, cooking_time, serves, image, _ = row
+        return {'name': name, 'ingredients': ",".join(ingredients), 'steps': steps, 'cuisine': cuisine,
+                'cooking_time': cooking_time, 'serves': serves, 'image': image}
+
+    def page(self, after_id: int = -1, limit: int = 1000,
+             include_deleted: bool = False) -> List[Tuple[int, Dict[str, Any], bool]]:
+        """Up to `limit` recipes with ids above `after_id` (keyset paging)
+
+        Returns:
+            (recipe id, recipe dict, deleted) in id order
+        """
+        conn = self.connection()
+        rows = conn.execute(_PAGE, (after_id, include_deleted, limit)).fetchall()
+        if not rows:
+            return []
+        ingredients: Dict[int, List[str]] = {}
+        for recipe_id, name in conn.execute(_PAGE_INGREDIENTS, (rows[0][0], rows[-1][0])):
+            ingredients.setdefault(recipe_id, []).append(name)
+        return [(row[0], self._recipe(row, ingredients.get(row[0], [])), bool(row[-1])) for row in rows]
+
+    def iter_recipes(self, page_size: int = 1000,
+                     include_deleted: bool = False) -> Iterator[Tuple[int, Dict[str, Any], bool]]:
+        """Every recipe in id order, fetched one page at a time"""
+        after_id = -1
+        while True:
+            page = self.page(after_id, page_size, include_deleted)
+            yield from page
+            if len(page) < page_size:
+                return
+            after_id = page[-1][0]
+
+    def get(self, recipe_id: int) -> Optional[Dict[str, Any]]:
+        """A live recipe by id, None if missing or deleted"""
+        conn = self.connection()
+        row = conn.execute(_GET, (int(recipe_id),)).fetchone()
+        if row is None or row[-1]:
+            return None
+        ingredients = [name for _, name in conn.execute(_PAGE_INGREDIENTS, (row[0], row[0]))]
+        return self._recipe(row, ingredients)
+
+    def search(self, text: str, limit: int = 10) -> List[Tuple[int, float]]:
+        """Live recipes matching an FTS5 query over names and steps, best first
+
+        Returns:
+            (recipe id, BM25 score) pairs; names weigh twice as much as steps
+        """
+        rows = self.connection().execute(_SEARCH, (text, limit)).fetchall()
+        return [(recipe_id, -rank) for recipe_id, rank in rows]
+
+    def with_ingredient(self, ingredient: str) -> List[int]:
+        """Ids of live recipes using an ingredient"""
+        return [row[0] for row in self.connection().execute(_WITH_INGREDIENT, (normalize_ingredient(ingredient),))]
+
+    def export(self, path: Path) -> int:
+        """Write live recipes to JSON, or CSV with every field when the path ends in .csv"""
+        recipes = [recipe for _, recipe, _ in self.iter_recipes()]
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.suffix.lower() == '.csv':
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=[*REQUIRED_FIELDS, 'image'])
+                writer.writeheader()
+                writer.writerows(recipes)
+        else:
+            path.write_text(json.dumps(recipes, indent=2, ensure_ascii=False), encoding='utf-8')
+        return len(recipes)
+
+
+class StoredRecipes(Sequence):
+    """Recipe dicts by id, read from the store a page at a time instead of held in memory
+
+    Stands in for the catalog's list of raw recipes: only the most recently
+    used pages are cached, and those are shared by every view derived with
+    `+` (the recipes it appends are held in memory). Views are immutable,
+    so snapshots can hold them like lists.
+    """
+
+    def __init__(self, store: RecipeStore, length: int, page_size: int = 1000, cached_pages: int = CACHED_PAGES,
+                 appended: Tuple[Dict[str, Any], ...] = (), _pages: Optional["OrderedDict[int, List]"] = None,
+                 _lock: Optional[threading.Lock] = None):
+        """
+        Args:
+            store: Store holding recipes 0..length-1
+            length: Number of stored recipes in view
+            page_size: Recipes fetched per query
+            cached_pages: Pages kept in memory
+            appended: Recipes after the stored ones, held in memory
+        """
+        self.store = store
+        self.length = length
+        self.page_size = page_size
+        self.cached_pages = cached_pages
+        self.appended = appended
+        self._pages: "OrderedDict[int, List[Dict[str, Any]]]" = OrderedDict() if _pages is None else _pages
+        self._lock = threading.Lock() if _lock is None else _lock
+
+    def __len__(self) -> int:
+        return self.length + len(self.appended)
+
+    def __add__(self, recipes: Sequence[Dict[str, Any]]) -> "StoredRecipes":
+        return StoredRecipes(self.store, self.length, self.page_size, self.cached_pages,
+                             self.appended + tuple(recipes), self._pages, self._lock)
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("recipe id out of range")
+        if index >= self.length:
+            return self.appended[index - self.length]
+        page, offset = divmod(index, self.page_size)
+        with self._lock:
+            recipes = self._pages.get(page)
+            if recipes is not None:
+                self._pages.move_to_end(page)
+        if recipes is None:
+            rows = self.store.page(page * self.page_size - 1, self.page_size, include_deleted=True)
+            recipes = [recipe for _, recipe, _ in rows]
+            with self._lock:
+                self._pages[page] = recipes
+                while len(self._pages) > self.cached_pages:
+                    self._pages.popitem(last=False)
+        return recipes[offset]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    default_db = Path(__file__).resolve().parent.parent / "data" / "catalog.db"
+    parser = argparse.ArgumentParser(description=f"Manage the SQLite recipe catalog (serve it with {CATALOG_DB_ENV})")
+    parser.add_argument("--db", type=Path, default=default_db)
+    commands = parser.add_subparsers(dest="command", required=True)
+    load = commands.add_parser("load", help="Append recipes from JSON/CSV files (the built-in recipes if none)")
+    load.add_argument("paths", type=Path, nargs="*")
+    load.add_argument("--batch-size", type=int, default=1000)
+    search = commands.add_parser("search", help="Full-text search over names and steps")
+    search.add_argument("text")
+    search.add_argument("-k", type=int, default=10)
+    export = commands.add_parser("export", help="Write live recipes to a .json or .csv file")
+    export.add_argument("path", type=Path)
+    commands.add_parser("stats", help="Recipe counts")
+    args = parser.parse_args(argv)
+
+    store = RecipeStore(args.db)
+    if args.command == "load":
+        if args.paths:
+            records = [record for path in args.paths for record in read_recipes(path)]
+        else:
+            from train import _load_recipe_data
+            records = _load_recipe_data()
+        loaded, skipped = store.bulk_load(records, args.batch_size)
+        for error in skipped:
+            print(f"Skipped: {error}")
+        print(f"Loaded {loaded} recipes into {args.db}")
+    elif args.command == "search":
+        for recipe_id, score in store.search(args.text, args.k):
+            print(f"{score:7.2f}  {store.get(recipe_id)['name']}")
+    elif args.command == "export":
+        print(f"Exported {store.export(args.path)} recipes to {args.path}")
+    else:
+        print(f"{store.count()} live recipes, {store.count(include_deleted=True) - store.count()} deleted")
+
+
+if __name__ == "__main__":
+    main()
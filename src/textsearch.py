@@ -0,0 +1,256 @@
+import argparse
+import copy
+import re
+import time
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from nltk.stem import PorterStemmer
+
+STOPWORDS = frozenset(
+    "a an and as at be by for from in into is it of on or the then to until with".split())
+# "no oven" / "without eggs" exclude the next word instead of matching it
+NEGATIONS = frozenset(("no", "without"))
+NAME_WEIGHT = 2  # a term in the recipe name counts as this many occurrences in the steps
+
+_TOKEN_RE = re.compile(r"[a-z]+")
+_stemmer = PorterStemmer()
+
+
+@lru_cache(maxsize=100_000)
+def stem(word: str) -> str:
+    return _stemmer.stem(word)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased, stemmed words of a text without stopwords"""
+    return [stem(w) for w in _TOKEN_RE.findall(text.lower()) if w not in STOPWORDS]
+
+
+def parse_query(query: str) -> Tuple[List[str], Set[str]]:
+    """Split a query into stems to score and stems to exclude
+
+    A word prefixed with '-' or preceded by "no"/"without" is excluded:
+    "grill -oven", "slow cook no oven".
+    """
+    include, exclude = [], set()
+    negate = False
+    for chunk in query.lower().split():
+        negate = negate or chunk.startswith('-')
+        for word in _TOKEN_RE.findall(chunk):
+            if word in NEGATIONS:
+                negate = True
+                continue
+            if word not in STOPWORDS:
+                (exclude.add if negate else include.append)(stem(word))
+            negate = False
+    return include, exclude
+
+
+def varint_encode(values: np.ndarray) -> np.ndarray:
+    """LEB128 varint bytes of non-negative integers (7 bits per byte, high bit = more follows)"""
+    values = np.asarray(values, dtype=np.uint64)
+    n_bytes = np.ones(len(values), dtype=np.int64)
+    rest = values >> np.uint64(7)
+    while rest.any():
+        n_bytes += rest > 0
+        rest >>= np.uint64(7)
+    starts = np.concatenate([[0], np.cumsum(n_bytes)[:-1]])
+    out = np.zeros(int(n_bytes.sum()), dtype=np.uint8)
+    for p in range(int(n_bytes.max(initial=0))):
+        rows = np.flatnonzero(n_bytes > p)
+        chunk = (values[rows] >> np.uint64(7 * p)) & np.uint64(0x7F)
+        more = np.where(n_bytes[rows] > p + 1, 0x80, 0).astype(np.uint64)
+        out[starts[rows] + p] = (chunk | more).astype(np.uint8)
+    return out
+
+
+def varint_decode(data: np.ndarray) -> np.ndarray:
+    """Inverse of varint_encode"""
+    if not len(data):
+        return np.zeros(0, dtype=np.int64)
+    last = data < 0x80
+    starts = np.flatnonzero(np.concatenate([[True], last[:-1]]))
+    value_of_byte = np.cumsum(np.concatenate([[0], last[:-1]]))
+    shift = 7 * (np.arange(len(data)) - starts[value_of_byte])
+    parts = (data & 0x7F).astype(np.int64) << shift
+    return np.add.reduceat(parts, starts)
+
+
+class TextIndex:
+    """BM25 full-text index over recipe names and steps
+
+    Postings are stored per term as varint-encoded doc id gaps in one byte
+    buffer, with term frequencies alongside as uint8, so the index is a few
+    bytes per (term, recipe) pair. A query decodes only the postings of its
+    terms and accumulates scores with vectorized NumPy.
+    """
+
+    def __init__(self, names: Sequence[str], steps: Sequence[str], k1: float = 1.2, b: float = 0.75):
+        """
+        Args:
+            names: Recipe names, indexed by recipe id
+            steps: Comma-joined recipe steps, aligned with names
+            k1: BM25 term frequency saturation
+            b: BM25 document length normalization
+        """
+        self.k1 = k1
+        self.b = b
+        self.n_docs = len(names)
+        self.terms: Dict[str, int] = {}
+
+        term_ids: List[int] = []
+        doc_ids: List[int] = []
+        tfs: List[int] = []
+        doc_len = np.zeros(self.n_docs, dtype=np.float32)
+        for doc, (name, text) in enumerate(zip(names, steps)):
+            counts = self._term_counts(name, text)
+            doc_len[doc] = sum(counts.values())
+            for term, tf in counts.items():
+                term_ids.append(self.terms.setdefault(term, len(self.terms)))
+                doc_ids.append(doc)
+                tfs.append(tf)
+
+        # Group postings by term; docs were visited in order, so each list is sorted
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        order = np.argsort(term_ids, kind='stable')
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)[order]
+        self.tfs = np.minimum(np.asarray(tfs, dtype=np.int64)[order], 255).astype(np.uint8)
+        self.doc_freq = np.bincount(term_ids, minlength=len(self.terms))
+        self.posting_starts = np.concatenate([[0], np.cumsum(self.doc_freq)])
+
+        first = np.zeros(len(doc_ids), dtype=bool)
+        first[self.posting_starts[:-1][self.doc_freq > 0]] = True
+        gaps = np.where(first, doc_ids, doc_ids - np.concatenate([[0], doc_ids[:-1]]))
+        gap_bytes = varint_encode(gaps)
+        # Byte offset of every term's postings
+        ends = np.cumsum(gap_bytes < 0x80)
+        self.byte_starts = np.concatenate([[0], np.searchsorted(ends, self.posting_starts[1:]) + 1])
+        self.postings = gap_bytes
+        # Postings of documents added after the build: term id -> (doc ids, tfs)
+        self.appended_postings: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+
+        self.doc_len = doc_len
+        self._update_weights()
+
+    @staticmethod
+    def _term_counts(name: str, text: str) -> Counter:
+        counts = Counter(tokenize(text or ""))
+        for term in tokenize(name or ""):
+            counts[term] += NAME_WEIGHT
+        return counts
+
+    def _update_weights(self) -> None:
+        """BM25 length normalization and idf from doc_len and doc_freq"""
+        avg_len = self.doc_len.mean() if self.n_docs else 1.0
+        self.length_norm = (self.k1 * (1 - self.b + self.b * self.doc_len / max(avg_len, 1e-9))).astype(np.float32)
+        self.idf = np.log1p((self.n_docs - self.doc_freq + 0.5) / (self.doc_freq + 0.5)).astype(np.float32)
+
+    def __len__(self) -> int:
+        return self.n_docs
+
+    @property
+    def nbytes(self) -> int:
+        appended = sum(docs.nbytes + tfs.nbytes for docs, tfs in self.appended_postings.values())
+        return self.postings.nbytes + self.tfs.nbytes + self.length_norm.nbytes + appended
+
+    def appended(self, name: str, steps: str) -> "TextIndex":
+        """New index with one more document (id len(self)), leaving this one untouched
+
+        The document's postings go to small per-term arrays next to the shared
+        varint buffer, and only idf and length normalization are recomputed,
+        so the catalog isn't re-tokenized; scores match a full rebuild.
+        """
+        counts = self._term_counts(name, steps)
+        index = copy.copy(self)
+        doc = self.n_docs
+        index.n_docs = doc + 1
+        if any(term not in self.terms for term in counts):
+            index.terms = dict(self.terms)
+        index.appended_postings = dict(self.appended_postings)
+        term_ids = [index.terms.setdefault(term, len(index.terms)) for term in counts]
+        index.doc_freq = np.pad(self.doc_freq, (0, len(index.terms) - len(self.terms)))
+        index.doc_freq[term_ids] += 1
+        for term_id, tf in zip(term_ids, counts.values()):
+            docs, tfs = self.appended_postings.get(term_id, (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint8)))
+            index.appended_postings[term_id] = np.append(docs, doc), np.append(tfs, np.uint8(min(tf, 255)))
+        index.doc_len = np.append(self.doc_len, np.float32(sum(counts.values())))
+        index._update_weights()
+        return index
+
+    def postings_for(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Doc ids and term frequencies of one stemmed term"""
+        term_id = self.terms.get(term)
+        if term_id is None:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint8)
+        docs, tfs = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint8)
+        if term_id + 1 < len(self.byte_starts):
+            data = self.postings[self.byte_starts[term_id]:self.byte_starts[term_id + 1]]
+            tfs = self.tfs[self.posting_starts[term_id]:self.posting_starts[term_id + 1]]
+            docs = np.cumsum(varint_decode(data))
+        if term_id in self.appended_postings:
+            more_docs, more_tfs = self.appended_postings[term_id]
+            docs, tfs = np.concatenate([docs, more_docs]), np.concatenate([tfs, more_tfs])
+        return docs, tfs
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every recipe (0 for recipes without a query term or with an excluded one)"""
+        include, exclude = parse_query(query)
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        for term, weight in Counter(include).items():
+            docs, tfs = self.postings_for(term)
+            if len(docs):
+                tfs = tfs.astype(np.float32)
+                scores[docs] += weight * self.idf[self.terms[term]] * tfs * (self.k1 + 1) / (
+                    tfs + self.length_norm[docs])
+        for term in exclude:
+            scores[self.postings_for(term)[0]] = 0
+        return scores
+
+    def search(self, query: str, k: Optional[int] = 10,
+               candidates: Optional[Iterable[int]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Best matching recipes for a text query
+
+        Args:
+            query: Free text, e.g. "grill", "slow cook no oven"
+            k: Number of results, None for every match
+            candidates: Only rank these recipe ids (e.g. the ingredient filter result)
+        Returns:
+            Recipe ids and BM25 scores, best first
+        """
+        scores = self.scores(query)
+        if candidates is not None:
+            mask = np.zeros(self.n_docs, dtype=bool)
+            mask[np.fromiter(candidates, dtype=np.int64)] = True
+            scores[~mask] = 0
+        matched = np.flatnonzero(scores > 0)
+        if k is not None and k < len(matched):
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        order = np.argsort(-scores[matched], kind='stable')
+        return matched[order], scores[matched[order]]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import warnings
+    from train import RecipeRecommender
+
+    parser = argparse.ArgumentParser(description="Full-text search over recipe names and steps")
+    parser.add_argument("query", nargs="+")
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    warnings.simplefilter("ignore")
+    recommender = RecipeRecommender()
+    index = recommender.text_index
+    start = time.perf_counter()
+    ids, scores = index.search(" ".join(args.query), args.k)
+    elapsed = time.perf_counter() - start
+    for recipe_id, score in zip(ids, scores):
+        print(f"{score:6.2f}  {recommender.df['name'].iat[recipe_id]}")
+    print(f"{len(ids)} results in {1000 * elapsed:.2f}ms ({len(index)} recipes, {index.nbytes} index bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,72 @@
+import hashlib
+import os
 import pickle
+import shutil
+import threading
 import warnings
 from pathlib import Path
-from typing import Any, List, Dict, Optional
+from typing import Any, Callable, Iterable, List, Dict, Optional, Sequence, Tuple
 import numpy as np
 import pandas as pd
 from gensim.models import Word2Vec
 from sklearn.neighbors import NearestNeighbors
 
+from admission import OverloadedError, SingleFlight, expired
+from catalog import BackgroundCompactor, CacheUpdate, CatalogSnapshot
+from cookable import CookableIndex
+from cooccurrence import IngredientCooccurrence
+from diversity import mmr
+from events import load_priors
+from graph import RecipeGraph
+from profiles import UserProfiles
+from quantize import QuantizedIndex, normalize_rows
+from querylog import QUERY_LOG_ENV, RECIPE, RECOMMEND, QueryRecorder
+from ranges import AttributeIndex
+from registry import MODEL_FILE, knn_file
+from result_cache import RESULT_CACHE_ENV, ResultCache
+from search_state import QueryState, RecipeQuery
+from shopping import resolve_recipe_ids, shopping_list
+from similar import SimilarTable, builder_for, catalog_fingerprints, model_fingerprint, table_settings
+from store import CATALOG_DB_ENV, RecipeStore, StoredRecipes, normalize_recipe
+from textsearch import TextIndex
+from vocab import IngredientVocabulary
+from warmup import Readiness, warm_up
+
+# Word2Vec settings for the ingredient model (see src/tuning.py to pick new ones)
+W2V_PARAMS = {'vector_size': 100, 'window': 5, 'min_count': 1}
+
+# Personalization: how far a user's profile pulls the query vector, how much a
+# cuisine affinity adds to a result's similarity, and how many extra
+# candidates per result are fetched for that re-ranking
+PROFILE_QUERY_WEIGHT = 0.3
+PROFILE_CUISINE_WEIGHT = 0.1
+PROFILE_CANDIDATES = 3
+
+# Weight of the popularity and CTR priors from src/events.py in result scores
+POPULARITY_WEIGHT = 0.05
+CTR_WEIGHT = 0.2
+
+# Candidates re-ranked when a request asks for diversity or cuisine quotas
+MMR_POOL = 200
+
+# Snapshot caches covering every row, tombstones included (queries mask them
+# with alive), so a delete carries them over unchanged
+CACHES_KEPT_ON_DELETE = ('vocab', 'cookable', 'text', 'attributes', 'ingredient_sets', 'cuisine_codes')
+
+# Recommendation strategies: mean word vector nearest neighbors, or
+# personalized PageRank over the recipe-ingredient graph (src/graph.py)
+EMBEDDING = "embedding"
+GRAPH = "graph"
+STRATEGIES = (EMBEDDING, GRAPH)
+
+
+def catalog_digest(ingredient_lists: Iterable[List[str]]) -> str:
+    """Hash of recipe ingredient lists in id order, saved with the model and index fitted on them"""
+    digest = hashlib.sha1()
+    for ingredients in ingredient_lists:
+        digest.update(",".join(ingredients).encode('utf-8') + b"\n")
+    return digest.hexdigest()[:16]
+
 
 def _load_recipe_data() -> List[Dict[str, Any]]:
     """Load recipe data with standardized ingredients"""
@@ -945,19 +1005,130 @@ def _load_recipe_data() -> List[Dict[str, Any]]:
 
 
 class RecipeRecommender:
-    def __init__(self):
-        """Initialize with comprehensive recipe database"""
+    """Ingredient-based recipe recommender
+
+    Thread safety: every query method reads ``self._snapshot`` once and works
+    only on that immutable snapshot, so queries need no lock and may run on
+    any number of threads. Catalog writes (add/update/delete, compaction,
+    swapping the index) are serialized by ``self._write_lock`` and publish a
+    new snapshot atomically.
+    """
+
+    REQUIRED_FIELDS = ('name', 'ingredients', 'steps', 'cuisine', 'cooking_time', 'serves')
+
+    def __init__(self, index_config: Optional[Dict[str, Any]] = None, model_version: Optional[str] = None,
+                 store: Optional[RecipeStore] = None, result_cache_size: Optional[int] = None):
+        """Initialize with comprehensive recipe database
+
+        Args:
+            index_config: Optional compressed index settings, e.g.
+                {'quantization': 'pq', 'n_subspaces': 25, 'rerank': 50}.
+                'quantization' is one of 'float16', 'int8' or 'pq'; without
+                it the exact sklearn index is used.
+            model_version: Serve the model and index of this version from
+                models/registry (see src/registry.py) instead of the
+                unversioned files in models/
+            store: Load the catalog from this SQLite store (see src/store.py)
+                and persist recipe changes to it; defaults to the database
+                named by $VAVI_CATALOG_DB, else the built-in recipes are used
+            result_cache_size: Most non-personalized results to cache;
+                defaults to $VAVI_RESULT_CACHE, else 0 (no caching)
+        """
+        self.index_config = dict(index_config or {})
+        self.n_neighbors = 5
         self.BASE_DIR = Path(__file__).resolve().parent.parent
         self.MODEL_DIR = self.BASE_DIR / "models"
+        self.REGISTRY_DIR = self.MODEL_DIR / "registry"  # Versioned models, see src/registry.py
+        self.model_version = model_version
+        # Where the Word2Vec model and index files live
+        self.ARTIFACT_DIR = self.REGISTRY_DIR / model_version if model_version else self.MODEL_DIR
+        if model_version and not (self.ARTIFACT_DIR / MODEL_FILE).exists():
+            raise ValueError(f"Model version '{model_version}' is not registered")
         self.IMAGES_DIR = self.BASE_DIR / "images"  # Path for recipe images
+        self.SIMILAR_DIR = self.ARTIFACT_DIR / "similar"  # Precomputed similar-recipes table of this model
+        self.USERS_DIR = self.ARTIFACT_DIR / "users"  # Memory-mapped user profiles in this model's space
+        self.EVENTS_DIR = self.BASE_DIR / "logs" / "events"  # Interaction log segments
+        self.PRIORS_DIR = self.MODEL_DIR / "priors"  # Aggregated by src/events.py
+        self.STATIC_IMAGES_DIR = self.BASE_DIR / "static" / "images"  # Built by src/image_pipeline.py
         self.MODEL_DIR.mkdir(exist_ok=True)
         self.IMAGES_DIR.mkdir(exist_ok=True, parents=True)
 
-        self.RECIPES = _load_recipe_data()
-        self.RECIPE_IMAGES = [r['image'] for r in self.RECIPES]  # List of all image filenames
-        self.df = self._initialize_data()
-        self.model = self._load_or_train_model()
-        self.knn = self._load_or_build_knn()
+        # Startup state and stage timings; ready once warm_up has run
+        self.readiness = Readiness()
+        # Readers take self._snapshot once per query; writers publish a new one under the lock
+        self._write_lock = threading.RLock()
+        if store is None and os.environ.get(CATALOG_DB_ENV):
+            store = RecipeStore(Path(os.environ[CATALOG_DB_ENV]))
+        self.store = store
+        with self.readiness.stage('catalog'):
+            recipes, df, alive = self._load_catalog()
+            self._snapshot = CatalogSnapshot(recipes, df, alive=alive)
+        with self.readiness.stage('model'):
+            self.model = self._load_or_train_model()
+        with self.readiness.stage('index'):
+            self.knn = self._load_or_build_knn()
+        self._similar_table: Optional[SimilarTable] = None
+        self._compactor: Optional[BackgroundCompactor] = None
+        self._profiles: Optional[UserProfiles] = None
+        with self.readiness.stage('priors'):
+            self._priors = load_priors(self.PRIORS_DIR)
+        # Non-personalized recommendations, keyed by snapshot version and ingredients
+        if result_cache_size is None:
+            result_cache_size = int(os.environ.get(RESULT_CACHE_ENV) or 0)
+        self.result_cache = ResultCache(result_cache_size)
+        # Identical queries that miss the cache at the same time are computed once
+        self.in_flight = SingleFlight()
+        self.query_recorder: Optional[QueryRecorder] = None
+        if os.environ.get(QUERY_LOG_ENV):
+            self.start_query_capture(Path(os.environ[QUERY_LOG_ENV]))
+
+    def warm_up(self, query_log: Optional[Path] = None, n_queries: int = 200) -> Dict[str, Any]:
+        """Page in indexes, build lazy structures and replay queries, then mark the recommender ready
+
+        See warmup.warm_up; returns the readiness report with per-stage timings.
+        """
+        return warm_up(self, query_log, n_queries)
+
+    @property
+    def snapshot(self) -> CatalogSnapshot:
+        """Current immutable view of the catalog"""
+        return self._snapshot
+
+    @property
+    def RECIPES(self) -> Sequence[Dict[str, Any]]:
+        """Raw recipe dicts indexed by recipe id (including deleted ones)"""
+        return self._snapshot.recipes
+
+    @property
+    def RECIPE_IMAGES(self) -> List[str]:
+        """List of all image filenames of live recipes"""
+        snapshot = self._snapshot
+        return snapshot.df['image'][snapshot.alive].fillna('default.jpg').tolist()
+
+    @property
+    def df(self) -> pd.DataFrame:
+        return self._snapshot.df
+
+    @property
+    def knn(self) -> Any:
+        return self._snapshot.knn
+
+    @knn.setter
+    def knn(self, knn: Any) -> None:
+        """Install an index fitted on the catalog rows; later rows are searched by brute force"""
+        with self._write_lock:
+            snapshot = self._snapshot
+            n_rows = len(snapshot.df)
+            n_fit = getattr(knn, 'n_samples_fit_', n_rows)
+            if n_fit > n_rows:
+                raise ValueError(f"Index was fitted on {n_fit} recipes but the catalog has {n_rows}")
+            delta_ids = np.arange(n_fit, n_rows)
+            self._snapshot = snapshot.replace(
+                knn=knn,
+                index_ids=np.arange(n_fit),
+                delta_ids=delta_ids,
+                delta=self._embed_rows(snapshot.df, delta_ids),
+            )
 
     def check_missing_images(self) -> List[str]:
         """Check which recipe images are missing from the images directory
@@ -968,11 +1139,40 @@ class RecipeRecommender:
         return [img for img in self.RECIPE_IMAGES
                 if not (self.IMAGES_DIR / img).exists()]
 
-    def _initialize_data(self) -> pd.DataFrame:
+    def _load_catalog(self, page_size: int = 1000) -> Tuple[Sequence[Dict[str, Any]], pd.DataFrame,
+                                                            Optional[np.ndarray]]:
+        """Recipes, their DataFrame and alive flags (built-in recipes without a store)
+
+        From a store, the DataFrame is built page by page and the raw recipe
+        dicts are not kept: `recipes` reads them back lazily (StoredRecipes).
+        An empty store is seeded with the built-in recipes first.
+        """
+        if self.store is None:
+            recipes = _load_recipe_data()
+            return recipes, self._initialize_data(recipes), None
+        if not self.store.count(include_deleted=True):
+            self.store.bulk_load(_load_recipe_data())
+        pages, alive = [], []
+        after_id = -1
+        while True:
+            page = self.store.page(after_id, page_size, include_deleted=True)
+            for recipe_id, _, deleted in page:
+                if recipe_id != len(alive):
+                    raise ValueError(f"Catalog store {self.store.path} has a gap in recipe ids at {len(alive)}")
+                alive.append(not deleted)
+            if page:
+                pages.append(self._initialize_data([recipe for _, recipe, _ in page]))
+            if len(page) < page_size:
+                break
+            after_id = page[-1][0]
+        df = pd.concat(pages, ignore_index=True)
+        return StoredRecipes(self.store, len(alive), page_size), df, np.asarray(alive, dtype=bool)
+
+    def _initialize_data(self, recipes: Optional[List[Dict[str, Any]]] = None) -> pd.DataFrame:
         """Initialize recipe dataframe with normalized ingredients"""
-        df = pd.DataFrame(self.RECIPES)
+        df = pd.DataFrame(self.RECIPES if recipes is None else recipes)
         df['ingredients'] = df['ingredients'].apply(
-            lambda x: [self._normalize_ingredient(i) for i in x.split(',')]
+            lambda x: [self._normalize_ingredient(i) for i in (x.split(',') if isinstance(x, str) else x)]
         )
         return df
 
@@ -982,33 +1182,71 @@ class RecipeRecommender:
         return ingredient.strip().lower().replace(' ', '_')
 
     def _load_or_train_model(self) -> Word2Vec:
-        """Load or train Word2Vec model"""
-        model_path = self.MODEL_DIR / "word2vec.model"
+        """Load the Word2Vec model, or train and save one if there is none or it was trained on another catalog
+
+        A model trained on an earlier prefix of this catalog is kept; recipes
+        added since are embedded with its vectors. Registered versions are
+        served as they are.
+        """
+        model_path = self.ARTIFACT_DIR / MODEL_FILE
         if model_path.exists():
-            return Word2Vec.load(str(model_path))
-        else:
-            model = Word2Vec(
-                sentences=self.df['ingredients'],
-                vector_size=100,
-                window=5,
-                min_count=1,
-                workers=4
-            )
-            model.save(str(model_path))
-            return model
+            model = Word2Vec.load(str(model_path))
+            if self.model_version or self._fitted_on_catalog(model.corpus_count, getattr(model, 'catalog_digest', None)):
+                return model
+            # Profile vectors live in the old model's space
+            shutil.rmtree(self.USERS_DIR, ignore_errors=True)
+        model = Word2Vec(
+            sentences=self.df['ingredients'],
+            workers=4,
+            **W2V_PARAMS
+        )
+        model.catalog_digest = catalog_digest(self.df['ingredients'])
+        model.save(str(model_path))
+        return model
+
+    def _fitted_on_catalog(self, n_fit: int, digest: Optional[str]) -> bool:
+        """Whether a model or index saved with `digest` was fitted on the first n_fit recipes of this catalog"""
+        ingredients = self.df['ingredients']
+        return digest is not None and n_fit <= len(ingredients) and digest == catalog_digest(ingredients.iloc[:n_fit])
 
-    def _load_or_build_knn(self) -> NearestNeighbors:
-        """Load or build KNN model"""
-        knn_path = self.MODEL_DIR / "knn.pkl"
+    def _load_or_build_knn(self) -> Any:
+        """Load or build KNN model (exact, or quantized when index_config asks for it)
+
+        A saved index is rebuilt unless it was fitted with the current model
+        on a prefix of this catalog (later recipes are searched as the delta).
+        """
+        quantization = self.index_config.get('quantization')
+        knn_path = self.ARTIFACT_DIR / knn_file(self.index_config)
         if knn_path.exists():
             with open(knn_path, 'rb') as f:
-                return pickle.load(f)
-        else:
-            embeddings = [self._get_recipe_embedding(ings) for ings in self.df['ingredients']]
-            knn = NearestNeighbors(n_neighbors=min(5, len(embeddings)), metric='cosine').fit(embeddings)
-            with open(knn_path, 'wb') as f:
-                pickle.dump(knn, f)
+                knn = pickle.load(f)
+            if ((not quantization or getattr(knn, 'build_config', None) == self.index_config)
+                    and getattr(knn, 'model_fingerprint', None) == model_fingerprint(self.model)
+                    and self._fitted_on_catalog(knn.n_samples_fit_, getattr(knn, 'catalog_digest', None))):
+                return knn
+
+        knn = self._build_index([self._get_recipe_embedding(ings) for ings in self.df['ingredients']])
+        knn.catalog_digest = catalog_digest(self.df['ingredients'])
+        knn.model_fingerprint = model_fingerprint(self.model)
+        with open(knn_path, 'wb') as f:
+            pickle.dump(knn, f)
+        return knn
+
+    def _build_index(self, embeddings: List[np.ndarray], compacted: bool = False) -> Any:
+        """Fit the configured nearest-neighbor index on recipe embeddings
+
+        A compacted index keeps its exact vectors in a file of its own, so
+        the persisted knn_*.pkl and knn_*_exact.npy keep matching.
+        """
+        quantization = self.index_config.get('quantization')
+        if quantization:
+            config = {'n_neighbors': min(self.n_neighbors, len(embeddings)), **self.index_config}
+            exact_file = f"knn_{quantization}_exact{'.compacted' if compacted else ''}.npy"
+            knn = QuantizedIndex(np.asarray(embeddings, dtype=np.float32),
+                                 exact_path=self.ARTIFACT_DIR / exact_file, **config)
+            knn.build_config = dict(self.index_config)
             return knn
+        return NearestNeighbors(n_neighbors=min(self.n_neighbors, len(embeddings)), metric='cosine').fit(embeddings)
 
     def _get_recipe_embedding(self, ingredients: List[str]) -> np.ndarray:
         """Get embedding vector for a recipe"""
@@ -1017,31 +1255,254 @@ class RecipeRecommender:
             return np.mean([self.model.wv[i] for i in valid_ings], axis=0)
         return np.zeros(self.model.vector_size)
 
-    def recommend(self, user_input: str) -> pd.DataFrame:
+    def _embed_rows(self, df: pd.DataFrame, ids: np.ndarray) -> Optional[np.ndarray]:
+        """Normalized float32 embeddings of the given rows (None if there are none)"""
+        if not len(ids):
+            return None
+        return normalize_rows(np.asarray(
+            [self._get_recipe_embedding(df['ingredients'].iat[i]) for i in ids], dtype=np.float32))
+
+    def get_embedding_matrix(self) -> np.ndarray:
+        """Get the (n_recipes, vector_size) float32 matrix of recipe embeddings"""
+        return np.asarray(
+            [self._get_recipe_embedding(ings) for ings in self.df['ingredients']],
+            dtype=np.float32
+        ).reshape(len(self.df), self.model.vector_size)
+
+    def recommend(self, user_input: str, user_id: Optional[str] = None, diversity: float = 0.0,
+                  max_per_cuisine: Optional[int] = None, strategy: str = EMBEDDING,
+                  deadline: Optional[float] = None) -> pd.DataFrame:
         """
         Get recipe recommendations based on ingredients
         Args:
             user_input: Comma-separated ingredient string
+            user_id: Personalize with this user's profile (see record_click)
+            diversity: 0 ranks by score only; up to 1 trades score for
+                results unlike each other (MMR over the top MMR_POOL matches)
+            max_per_cuisine: Most results from one cuisine (at least 1),
+                None for no quota
+            strategy: EMBEDDING ranks by cosine similarity to the mean
+                ingredient vector; GRAPH by personalized PageRank over the
+                recipe-ingredient graph (not personalized by user profiles)
+            deadline: time.monotonic() by which to answer (see
+                admission.deadline_after); past it, compressed indexes skip
+                re-ranking and the graph walk stops early, returning the
+                best results found so far
         Returns:
             DataFrame of recommended recipes with similarity scores
+            (GRAPH results have a 'score' instead)
         """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy '{strategy}', expected one of {', '.join(STRATEGIES)}")
+        if max_per_cuisine is not None and max_per_cuisine < 1:
+            raise ValueError(f"max_per_cuisine must be at least 1, got {max_per_cuisine}")
+        snapshot = self._snapshot
+        self.record_query(RECOMMEND, ingredients=user_input, user=user_id, diversity=diversity,
+                          max_per_cuisine=max_per_cuisine, strategy=strategy)
         try:
             ingredients = self._process_input(user_input)
             if not ingredients:
                 return pd.DataFrame()
+            if strategy == GRAPH:
+                return self._graph_recommend(ingredients, snapshot, diversity, max_per_cuisine, deadline)
 
             avg_vec = self._get_ingredients_vector(ingredients)
             if avg_vec is None:
-                return self.df.sample(min(3, len(self.df)))
+                return self._sample(snapshot)
 
-            distances, indices = self.knn.kneighbors([avg_vec])
-            results = self.df.iloc[indices[0]].copy()
-            results['similarity'] = 1 - distances[0]
-            return results.sort_values('similarity', ascending=False)
+            profile = self.profiles.get(user_id) if user_id is not None else None
+            if profile is not None:
+                return self._personalized(avg_vec, profile, snapshot, diversity, max_per_cuisine, deadline)
 
+            def compute() -> Tuple[pd.DataFrame, bool]:
+                diversify = diversity > 0 or max_per_cuisine is not None
+                distances, indices, complete = self._search(
+                    avg_vec, snapshot, MMR_POOL if diversify else None, deadline)
+                similarity = 1 - distances
+                scores = None if self._priors is None else similarity + self._prior_boost(indices)
+                return self._ranked(snapshot, indices, similarity, scores, diversity, max_per_cuisine), complete
+
+            # The mean vector doesn't depend on ingredient order
+            key = (snapshot.version, tuple(sorted(ingredients)), diversity, max_per_cuisine)
+            return self._coalesced(key, compute, deadline)
+
+        except OverloadedError:
+            # Gave up waiting for an identical request; the caller answers 503 rather than random recipes
+            raise
         except Exception as e:
             warnings.warn(f"Recommendation error: {str(e)}")
-            return self.df.sample(min(3, len(self.df)))
+            return self._sample(snapshot)
+
+    def _graph_recommend(self, ingredients: List[str], snapshot: CatalogSnapshot, diversity: float = 0.0,
+                         max_per_cuisine: Optional[int] = None, deadline: Optional[float] = None) -> pd.DataFrame:
+        """Rank recipes by personalized PageRank from the pantry ingredients"""
+        def compute() -> Tuple[Optional[pd.DataFrame], bool]:
+            pantry_ids = self._vocab(snapshot).lookup(ingredients)
+            diversify = diversity > 0 or max_per_cuisine is not None
+            indices, visits = self._recipe_graph(snapshot).top(
+                pantry_ids, MMR_POOL if diversify else self.n_neighbors, deadline=deadline)
+            if not len(indices):
+                return None, True
+            # Relative to the best match, so the prior weights mean the same as for cosine similarity
+            scores = visits / visits[0] + self._prior_boost(indices)
+            return self._ranked(snapshot, indices, None, scores, diversity, max_per_cuisine), True
+
+        key = (snapshot.version, GRAPH, tuple(sorted(set(ingredients))), diversity, max_per_cuisine)
+        results = self._coalesced(key, compute, deadline)
+        return self._sample(snapshot) if results is None else results
+
+    def _coalesced(self, key: Tuple, compute: Callable[[], Tuple[Optional[pd.DataFrame], bool]],
+                   deadline: Optional[float] = None) -> Optional[pd.DataFrame]:
+        """Cached results for `key`, computed once however many identical queries are in flight
+
+        `compute` returns the results (None when there is nothing worth
+        caching) and whether its search completed. Partial results (a shard
+        that didn't answer) and results finished past the deadline, which
+        may have been cut short, are returned but not cached. A query
+        waiting on an identical one in flight waits at most until its own
+        deadline, then raises OverloadedError.
+        """
+        cached = self.result_cache.get(key)
+        if cached is not None:
+            return cached.copy()
+
+        def run() -> Optional[pd.DataFrame]:
+            results, complete = compute()
+            if results is not None and complete and not expired(deadline):
+                self.result_cache.put(key, results)
+            return results
+
+        results = self.in_flight.do(key, run, deadline)
+        return None if results is None else results.copy()
+
+    def _personalized(self, query_vec: np.ndarray, profile: Tuple[np.ndarray, np.ndarray],
+                      snapshot: CatalogSnapshot, diversity: float = 0.0,
+                      max_per_cuisine: Optional[int] = None, deadline: Optional[float] = None) -> pd.DataFrame:
+        """Search with the query pulled towards the user's taste, then boost favored cuisines"""
+        preference, affinities = profile
+        query_vec = query_vec / (np.linalg.norm(query_vec) or 1) + PROFILE_QUERY_WEIGHT * preference
+        n_candidates = self.n_neighbors * PROFILE_CANDIDATES
+        if diversity > 0 or max_per_cuisine is not None:
+            n_candidates = max(n_candidates, MMR_POOL)
+        distances, indices, _ = self._search(query_vec, snapshot, n_candidates, deadline)
+
+        codes, names = self._cuisine_codes(snapshot)
+        boost = dict(zip(self.profiles.cuisines, affinities))
+        cuisine_boost = np.asarray([boost.get(name, 0.0) for name in names], dtype=np.float64)
+        similarity = 1 - distances
+        scores = similarity + PROFILE_CUISINE_WEIGHT * cuisine_boost[codes[indices]] + self._prior_boost(indices)
+        return self._ranked(snapshot, indices, similarity, scores, diversity, max_per_cuisine)
+
+    @staticmethod
+    def _cuisine_codes(snapshot: CatalogSnapshot) -> Tuple[np.ndarray, pd.Index]:
+        return snapshot.cached('cuisine_codes', lambda: pd.factorize(snapshot.df['cuisine']))
+
+    def _ranked(self, snapshot: CatalogSnapshot, indices: np.ndarray, similarity: Optional[np.ndarray],
+                scores: Optional[np.ndarray], diversity: float = 0.0,
+                max_per_cuisine: Optional[int] = None) -> pd.DataFrame:
+        """Top n_neighbors candidates by score (similarity if None), or picked by MMR when diversifying
+
+        Returns:
+            Result rows with 'similarity' and/or 'score', whichever are given
+        """
+        relevance = similarity if scores is None else scores
+        if diversity > 0 or max_per_cuisine is not None:
+            vectors = snapshot.vectors(indices)
+            if vectors is None:
+                vectors = self._embed_rows(snapshot.df, indices)
+            codes, _ = self._cuisine_codes(snapshot)
+            top = mmr(relevance, vectors, self.n_neighbors, 1 - diversity, codes[indices], max_per_cuisine)
+        else:
+            top = np.argsort(-relevance, kind='stable')[:self.n_neighbors]
+
+        results = snapshot.df.iloc[indices[top]].copy()
+        if similarity is not None:
+            results['similarity'] = similarity[top]
+        if scores is not None:
+            results['score'] = scores[top]
+        return results
+
+    def _prior_boost(self, indices: np.ndarray) -> np.ndarray:
+        """Popularity/CTR bonus per recipe id (0 without priors or for recipes newer than them)"""
+        priors = self._priors
+        boost = np.zeros(len(indices))
+        if priors is None:
+            return boost
+        known = indices < len(priors['ctr'])
+        boost[known] = (POPULARITY_WEIGHT * priors['popularity'][indices[known]]
+                        + CTR_WEIGHT * priors['ctr'][indices[known]])
+        return boost
+
+    def reload_priors(self) -> None:
+        """Pick up priors written by a new `python src/events.py` run"""
+        self._priors = load_priors(self.PRIORS_DIR)
+        self.result_cache.clear()
+
+    def start_query_capture(self, path: Path) -> None:
+        """Append the queries reaching this recommender to a JSONL file (see src/querylog.py)"""
+        with self._write_lock:
+            if self.query_recorder is None:
+                self.query_recorder = QueryRecorder(path)
+
+    def stop_query_capture(self) -> None:
+        with self._write_lock:
+            recorder, self.query_recorder = self.query_recorder, None
+        if recorder is not None:
+            recorder.close()
+
+    def record_query(self, kind: str, **params: Any) -> None:
+        """Capture a query when query capture is on (callers outside this class log GUI searches)"""
+        recorder = self.query_recorder
+        if recorder is not None:
+            recorder.log(kind, **params)
+
+    @staticmethod
+    def _sample(snapshot: CatalogSnapshot, n: int = 3) -> pd.DataFrame:
+        """Random live recipes, used when there is nothing to match on"""
+        live = snapshot.df[snapshot.alive]
+        return live.sample(min(n, len(live)))
+
+    def _search(self, query_vec: np.ndarray, snapshot: CatalogSnapshot, k: Optional[int] = None,
+                deadline: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray, bool]:
+        """Find the nearest recipes to a query vector
+
+        Args:
+            k: Number of neighbors, defaults to n_neighbors
+            deadline: time.monotonic() after which to return best-so-far results
+        Returns:
+            Cosine distances and row indices of the neighbors, and whether
+            the whole catalog was searched
+        """
+        return (*snapshot.search(query_vec, k or self.n_neighbors, deadline), True)
+
+    @property
+    def profiles(self) -> UserProfiles:
+        """Memory-mapped user profile table, opened on first use"""
+        profiles = self._profiles
+        if profiles is None:
+            with self._write_lock:
+                if self._profiles is None:
+                    self._profiles = UserProfiles(self.USERS_DIR, self.model.vector_size)
+                profiles = self._profiles
+        return profiles
+
+    def record_click(self, user_id: str, name_or_id: Any, weight: float = 1.0) -> Optional[int]:
+        """
+        Update a user's profile from a recipe they opened or cooked
+        Args:
+            user_id: Any stable user identifier
+            name_or_id: Recipe name or id
+            weight: Strength of the signal (e.g. larger for "cooked it")
+        Returns:
+            Id of the recipe, None if it doesn't exist
+        """
+        snapshot = self._snapshot
+        recipe_id = self._recipe_id(name_or_id, snapshot)
+        if recipe_id is None:
+            return None
+        embedding = self._get_recipe_embedding(snapshot.df['ingredients'].iat[recipe_id])
+        self.profiles.record_click(user_id, embedding, snapshot.df['cuisine'].iat[recipe_id], weight)
+        return recipe_id
 
     def _process_input(self, user_input: str) -> List[str]:
         """Process and normalize user input"""
@@ -1060,14 +1521,353 @@ class RecipeRecommender:
             return None
         return np.mean([self.model.wv[i] for i in valid_ings], axis=0)
 
+    def _recipe_id(self, name_or_id: Any, snapshot: Optional[CatalogSnapshot] = None) -> Optional[int]:
+        """Resolve a recipe name (case-insensitive) or id to the id of a live recipe"""
+        snapshot = snapshot or self._snapshot
+        if isinstance(name_or_id, (int, np.integer)):
+            if 0 <= name_or_id < len(snapshot.df) and snapshot.alive[name_or_id]:
+                return int(name_or_id)
+            return None
+        return snapshot.name_index.get(str(name_or_id).lower())
+
+    def similar_to(self, name_or_id: Any, k: int = 5) -> pd.DataFrame:
+        """
+        Get recipes similar to a given recipe from the precomputed table
+        Args:
+            name_or_id: Recipe name or row id
+            k: Number of similar recipes (at most the table's k)
+        Returns:
+            DataFrame of similar recipes with similarity scores
+        """
+        snapshot = self._snapshot
+        recipe_id = self._recipe_id(name_or_id, snapshot)
+        if recipe_id is None:
+            return pd.DataFrame()
+
+        table = self._similar_table
+        if table is None:
+            with self._write_lock:
+                if self._similar_table is None:
+                    settings = table_settings(self.SIMILAR_DIR) or {}
+                    if settings.get('model') != model_fingerprint(self.model):
+                        # Normally built offline by src/similar.py; missing or built from other vectors
+                        settings.pop('model', None)
+                        builder_for(self, **settings).build(self.SIMILAR_DIR, catalog_fingerprints(self))
+                    self._similar_table = SimilarTable(self.SIMILAR_DIR)
+                table = self._similar_table
+
+        if recipe_id < len(table.neighbors):
+            neighbors, scores = table.lookup(recipe_id)
+            keep = snapshot.alive[neighbors]
+            neighbors, scores = neighbors[keep][:k], scores[keep][:k]
+        else:
+            # Added after the table was built: search live until the next offline refresh
+            embedding = self._get_recipe_embedding(snapshot.df['ingredients'].iat[recipe_id])
+            distances, neighbors = snapshot.search(embedding, k + 1)
+            keep = neighbors != recipe_id
+            neighbors, scores = neighbors[keep][:k], 1 - distances[keep][:k]
+
+        results = snapshot.df.iloc[neighbors].copy()
+        results['similarity'] = scores
+        return results
+
+    @staticmethod
+    def _vocab(snapshot: CatalogSnapshot) -> IngredientVocabulary:
+        """Ingredient vocabulary of a snapshot, filled completely before it is shared"""
+        return snapshot.cached('vocab', lambda: IngredientVocabulary(
+            i for ings in snapshot.df['ingredients'] for i in ings))
+
+    @property
+    def vocab(self) -> IngredientVocabulary:
+        """Vocabulary shared by the ingredient indexes below"""
+        return self._vocab(self._snapshot)
+
+    @property
+    def cooccurrence(self) -> IngredientCooccurrence:
+        """Ingredient co-occurrence counts of live recipes, built on first use"""
+        snapshot = self._snapshot
+        return snapshot.cached('cooccurrence', lambda: IngredientCooccurrence(
+            snapshot.df['ingredients'][snapshot.alive], self._vocab(snapshot)))
+
+    @property
+    def recipe_graph(self) -> RecipeGraph:
+        """Recipe-ingredient graph of live recipes for the GRAPH strategy, built on first use"""
+        return self._recipe_graph(self._snapshot)
+
+    def _recipe_graph(self, snapshot: CatalogSnapshot) -> RecipeGraph:
+        return snapshot.cached('graph', lambda: RecipeGraph(
+            snapshot.df['ingredients'], self._vocab(snapshot), snapshot.alive))
+
+    @property
+    def cookable_index(self) -> CookableIndex:
+        """Recipe ingredient bitsets, built on first use"""
+        return self._cookable_index(self._snapshot)
+
+    def cookable_index_of(self, snapshot: CatalogSnapshot) -> CookableIndex:
+        """Ingredient bitsets of a snapshot's recipes (row i is recipe i), built on first use"""
+        return self._cookable_index(snapshot)
+
+    def _cookable_index(self, snapshot: CatalogSnapshot) -> CookableIndex:
+        return snapshot.cached('cookable', lambda: CookableIndex(
+            snapshot.df['ingredients'], self._vocab(snapshot)))
+
+    @property
+    def text_index(self) -> TextIndex:
+        """BM25 index over recipe names and steps, built on first use"""
+        return self._text_index(self._snapshot)
+
+    @staticmethod
+    def _text_index(snapshot: CatalogSnapshot) -> TextIndex:
+        return snapshot.cached('text', lambda: TextIndex(snapshot.df['name'].tolist(), snapshot.df['steps'].tolist()))
+
+    @property
+    def attribute_index(self) -> AttributeIndex:
+        """Cooking time/servings range indexes and cuisine lists, built on first use"""
+        return self._attribute_index(self._snapshot)
+
+    @staticmethod
+    def _attribute_index(snapshot: CatalogSnapshot) -> AttributeIndex:
+        return snapshot.cached('attributes', lambda: AttributeIndex(
+            snapshot.df['cooking_time'].to_numpy(), snapshot.df['serves'].to_numpy(), snapshot.df['cuisine'].tolist()))
+
+    def filter_recipes(self, max_time: Optional[int] = None, min_serves: Optional[int] = None,
+                       max_serves: Optional[int] = None, cuisines: Optional[List[str]] = None,
+                       max_scale: float = 1.0) -> pd.DataFrame:
+        """
+        Get recipes by cooking time, servings and cuisine
+        Args:
+            max_time: Longest cooking time in minutes
+            min_serves: Fewest people served, after scaling by up to max_scale
+            max_serves: Most people served
+            cuisines: Allowed cuisines
+            max_scale: How much a recipe may be scaled up to reach min_serves
+        Returns:
+            DataFrame of matching recipes, quickest first
+        """
+        snapshot = self._snapshot
+        index = self._attribute_index(snapshot)
+        mask = index.mask(max_time, min_serves, max_serves, cuisines, max_scale) & snapshot.alive
+        ids = index.cooking_time.order[mask[index.cooking_time.order]]
+        return snapshot.df.iloc[ids]
+
+    def search_text(self, query: str, k: Optional[int] = 10,
+                    candidates: Optional[List[int]] = None) -> pd.DataFrame:
+        """
+        Full-text search over recipe names and steps
+        Args:
+            query: Technique or keywords, e.g. "grill" or "slow cook no oven"
+            k: Number of results, None for every match
+            candidates: Only rank these recipe ids (e.g. an ingredient filter result)
+        Returns:
+            DataFrame of matching recipes with BM25 'score', best first
+        """
+        snapshot = self._snapshot
+        if candidates is None:
+            candidates = np.flatnonzero(snapshot.alive) if snapshot.n_deleted else None
+        else:
+            candidates = [i for i in candidates if snapshot.alive[i]]
+        ids, scores = self._text_index(snapshot).search(query, k, candidates)
+        results = snapshot.df.iloc[ids].copy()
+        results['score'] = scores
+        return results
+
+    @staticmethod
+    def _ingredient_sets(snapshot: CatalogSnapshot) -> List[frozenset]:
+        return snapshot.cached('ingredient_sets', lambda: [frozenset(ings) for ings in snapshot.df['ingredients']])
+
+    def search_recipes(self, query: RecipeQuery) -> pd.DataFrame:
+        """
+        Run an ingredient/filter search the way the GUI does
+        Args:
+            query: Ingredients, match mode and filters
+        Returns:
+            DataFrame of matching live recipes, in QueryState order
+        """
+        snapshot = self._snapshot
+        ids = [i for i in self.query_state(snapshot).update(query) if snapshot.alive[i]]
+        return snapshot.df.iloc[ids]
+
+    def query_state(self, snapshot: Optional[CatalogSnapshot] = None) -> QueryState:
+        """Incremental ingredient/filter search over a snapshot (default: the current one)
+
+        Candidate ids are recipe ids, tombstones included; check them
+        against the snapshot's alive flags.
+        """
+        snapshot = snapshot or self._snapshot
+        return QueryState(snapshot.recipes, self._ingredient_sets(snapshot), self._cookable_index(snapshot),
+                          self._text_index(snapshot), self._attribute_index(snapshot))
+
+    def cookable(self, pantry: List[str], max_missing: int = 0) -> pd.DataFrame:
+        """
+        Get recipes that can be made with the pantry
+        Args:
+            pantry: Ingredients the user has
+            max_missing: How many extra ingredients a recipe may need
+        Returns:
+            DataFrame of recipes with 'missing' counts and 'missing_ingredients', fewest missing first
+        """
+        snapshot = self._snapshot
+        normalized = [self._normalize_ingredient(i) for i in pantry if i.strip()]
+        candidates = np.flatnonzero(snapshot.alive) if snapshot.n_deleted else None
+        ids, missing = self._cookable_index(snapshot).cookable(normalized, max_missing, candidates)
+        results = snapshot.df.iloc[ids].copy()
+        results['missing'] = missing
+        pantry_set = set(normalized)
+        results['missing_ingredients'] = [
+            [i for i in ings if i not in pantry_set] for ings in results['ingredients']
+        ]
+        return results
+
+    def shopping_list(self, recipes: List[Any], pantry: List[str]) -> Dict[str, Any]:
+        """
+        Merge the ingredients of many recipes into one shopping list
+        Args:
+            recipes: Recipe ids and/or names (case-insensitive)
+            pantry: Ingredients already at home, left off the list
+        Returns:
+            {'items': {category: [{'ingredient', 'recipes'}]}, 'unknown': unresolved entries}
+        """
+        snapshot = self._snapshot
+        ids, unknown = resolve_recipe_ids(recipes, snapshot.name_index, snapshot.alive)
+        index = self._cookable_index(snapshot)
+        pantry_ids = index.vocab.lookup(self._normalize_ingredient(i) for i in pantry if i.strip())
+        return {'items': shopping_list(index.bits, index.vocab.names, ids, pantry_ids), 'unknown': unknown}
+
+    def suggest_ingredients(self, pantry: List[str], n: int = 5) -> List[str]:
+        """Suggest ingredients that most often go with the ones in the pantry"""
+        normalized = [self._normalize_ingredient(i) for i in pantry if i.strip()]
+        return [name for name, _ in self.cooccurrence.suggest(normalized, n)]
+
+    def add_recipe(self, recipe: Dict[str, Any]) -> int:
+        """
+        Add a recipe to the live catalog without refitting the index
+        Args:
+            recipe: Recipe dict with at least REQUIRED_FIELDS, normalized
+                like the store's records (see store.normalize_recipe)
+        Returns:
+            Id of the new recipe
+        Raises:
+            ValueError: If a required field is missing or a number doesn't parse
+        """
+        stored = normalize_recipe(recipe)
+
+        with self._write_lock:
+            snapshot = self._snapshot
+            recipe_id = len(snapshot.df)
+            row = self._initialize_data([stored])
+            embedding = self._embed_rows(row, np.arange(1))
+            row = row.iloc[0].to_dict()
+            added = snapshot.with_recipe(stored, row, embedding, carry=self._caches_after_add(row))
+            # Persisted only once the new snapshot is built, so a failure leaves store and catalog in step
+            if self.store is not None:
+                self.store.add(stored, recipe_id)
+            self._snapshot = added
+            return recipe_id
+
+    def _caches_after_add(self, row: Dict[str, Any]) -> Dict[str, CacheUpdate]:
+        """Updates of the query-side caches for a recipe appended to the catalog
+
+        The live-only co-occurrence counts and recipe graph are rebuilt on
+        first use instead.
+        """
+        ingredients = row['ingredients']
+
+        def cuisine_codes(codes: Tuple[np.ndarray, pd.Index], _: CatalogSnapshot) -> Tuple[np.ndarray, pd.Index]:
+            codes, names = codes
+            code = names.get_indexer([row['cuisine']])[0]
+            if code < 0:
+                code, names = len(names), names.append(pd.Index([row['cuisine']]))
+            return np.append(codes, code), names
+
+        # vocab first: the cookable index is carried over onto the new snapshot's vocabulary
+        return {
+            'vocab': lambda vocab, _: vocab.extended(ingredients),
+            'cookable': lambda index, snapshot: index.appended(ingredients, self._vocab(snapshot)),
+            'text': lambda index, _: index.appended(row['name'], row['steps']),
+            'attributes': lambda index, _: index.appended(row['cooking_time'], row['serves'], row['cuisine']),
+            'ingredient_sets': lambda sets, _: sets + [frozenset(ingredients)],
+            'cuisine_codes': cuisine_codes,
+        }
+
+    def delete_recipe(self, name_or_id: Any) -> bool:
+        """Mark a recipe as deleted (tombstone); returns False if it was not found"""
+        with self._write_lock:
+            snapshot = self._snapshot
+            recipe_id = self._recipe_id(name_or_id, snapshot)
+            if recipe_id is None:
+                return False
+            if self.store is not None:
+                self.store.delete(recipe_id)
+            self._snapshot = snapshot.without_recipe(
+                recipe_id, carry={key: lambda value, _: value for key in CACHES_KEPT_ON_DELETE})
+            return True
+
+    def update_recipe(self, name_or_id: Any, recipe: Dict[str, Any]) -> Optional[int]:
+        """Replace a recipe (the new version gets a new id); returns None if it was not found"""
+        with self._write_lock:
+            old_id = self._recipe_id(name_or_id)
+            if old_id is None:
+                return None
+            recipe_id = self.add_recipe(recipe)
+            self.delete_recipe(old_id)
+            return recipe_id
+
+    def compact(self) -> None:
+        """Refit the index on live recipes and drop tombstones and the brute-force delta
+
+        The refit runs without the write lock; recipes added or deleted
+        meanwhile are carried over when the result is published.
+        """
+        base = self._snapshot
+        live_ids = np.flatnonzero(base.alive)
+        if not len(live_ids):
+            return
+        knn = self._build_index([self._get_recipe_embedding(base.df['ingredients'].iat[i]) for i in live_ids],
+                                compacted=True)
+
+        with self._write_lock:
+            current = self._snapshot
+            dead = np.flatnonzero(~current.alive)
+            df = current.df.copy()
+            df['ingredients'] = [[] if not alive else ings for ings, alive in zip(df['ingredients'], current.alive)]
+            df.loc[df.index[dead], 'steps'] = ""
+            recipes = current.recipes
+            if not isinstance(recipes, StoredRecipes):
+                # Recipes paged in from a store hold no payload in memory to clear
+                recipes = [r if alive else {'name': r['name']} for r, alive in zip(recipes, current.alive)]
+
+            delta_ids = np.arange(len(base.df), len(current.df))
+            self._snapshot = current.replace(
+                df=df,
+                recipes=recipes,
+                knn=knn,
+                index_ids=live_ids,
+                delta_ids=delta_ids,
+                delta=self._embed_rows(current.df, delta_ids),
+            )
+
+    def start_background_compaction(self, interval: float = 60.0, min_garbage: float = 0.1) -> None:
+        """Compact every `interval` seconds once tombstones and delta reach `min_garbage` of the index"""
+        with self._write_lock:
+            if self._compactor is None:
+                self._compactor = BackgroundCompactor(self, interval, min_garbage)
+
+    def stop_background_compaction(self) -> None:
+        with self._write_lock:
+            compactor, self._compactor = self._compactor, None
+        if compactor is not None:
+            compactor.stop()
+
     def get_recipe_by_name(self, name: str) -> Optional[Dict[str, Any]]:
         """Get complete recipe details by name (case-insensitive)"""
+        self.record_query(RECIPE, name=name)
         try:
-            recipe_df = self.df[self.df['name'].str.lower() == name.lower()]
-            if recipe_df.empty:
+            snapshot = self._snapshot
+            recipe_id = snapshot.name_index.get(name.lower())
+            if recipe_id is None:
                 return None
 
-            recipe = recipe_df.iloc[0].to_dict()
+            recipe = snapshot.df.iloc[recipe_id].to_dict()
             return {
                 'name': recipe['name'],
                 'ingredients': recipe['ingredients'],
@@ -1083,13 +1883,16 @@ class RecipeRecommender:
 
     def get_all_recipes(self) -> List[Dict[str, Any]]:
         """Get all recipes in the database"""
-        return self.RECIPES
+        snapshot = self._snapshot
+        if not snapshot.n_deleted:
+            return snapshot.recipes
+        return [r for r, alive in zip(snapshot.recipes, snapshot.alive) if alive]
 
     def get_recipes_by_ingredients(self, ingredients: List[str]) -> List[Dict[str, Any]]:
         """Get recipes that contain any of the specified ingredients"""
         normalized_ingredients = [self._normalize_ingredient(i) for i in ingredients]
         return [
-            recipe for recipe in self.RECIPES
+            recipe for recipe in self.get_all_recipes()
             if any(ing in [self._normalize_ingredient(i) for i in recipe['ingredients'].split(',')]
                    for ing in normalized_ingredients)
         ]
@@ -0,0 +1,219 @@
+import argparse
+import itertools
+import random
+import shutil
+import time
+import warnings
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from gensim.models import KeyedVectors, Word2Vec
+from sklearn.decomposition import PCA
+from sklearn.neighbors import NearestNeighbors
+
+from registry import MODEL_FILE
+from sharded import EMBEDDINGS_FILE
+from similar import builder_for, catalog_fingerprints, table_settings
+from train import RecipeRecommender, W2V_PARAMS, catalog_digest
+
+
+def split_holdout(recipes: Sequence[List[str]], holdout_fraction: float = 0.2,
+                  seed: int = 0) -> Tuple[List[List[str]], List[List[str]]]:
+    """Split recipe ingredient lists into training and held-out recipes"""
+    recipes = [list(r) for r in recipes]
+    rng = random.Random(seed)
+    rng.shuffle(recipes)
+    n_test = max(1, int(len(recipes) * holdout_fraction))
+    return recipes[n_test:], recipes[:n_test]
+
+
+def completion_hit_rate(wv: KeyedVectors, test_recipes: Sequence[List[str]], k: int = 10) -> float:
+    """Held-out ingredient completion: hide one ingredient, predict it from the rest
+
+    Returns:
+        Fraction of hidden ingredients found in the top-k words nearest to the
+        mean vector of the remaining ingredients
+    """
+    hits = trials = 0
+    for recipe in test_recipes:
+        known = [i for i in recipe if i in wv]
+        if len(known) < 2:
+            continue
+        for hidden in known:
+            context = [i for i in known if i != hidden]
+            query = np.mean([wv[i] for i in context], axis=0)
+            ranked = [word for word, _ in wv.similar_by_vector(query, topn=k + len(context))
+                      if word not in context][:k]
+            hits += hidden in ranked
+            trials += 1
+    return hits / trials if trials else 0.0
+
+
+def recipe_matrix(wv: KeyedVectors, recipes: Sequence[List[str]]) -> np.ndarray:
+    """Mean ingredient vector per recipe, as the serving index would store it"""
+    rows = []
+    for recipe in recipes:
+        known = [wv[i] for i in recipe if i in wv]
+        rows.append(np.mean(known, axis=0) if known else np.zeros(wv.vector_size, dtype=np.float32))
+    return np.asarray(rows, dtype=np.float32)
+
+
+def index_cost(wv: KeyedVectors, recipes: Sequence[List[str]], n_queries: int = 200,
+               seed: int = 0) -> Dict[str, float]:
+    """Build a cosine KNN index over the recipes and time single-query lookups"""
+    embeddings = recipe_matrix(wv, recipes)
+    knn = NearestNeighbors(n_neighbors=min(5, len(embeddings)), metric='cosine').fit(embeddings)
+    rng = np.random.default_rng(seed)
+    queries = embeddings[rng.integers(0, len(embeddings), n_queries)]
+
+    start = time.perf_counter()
+    for query in queries:
+        knn.kneighbors([query])
+    elapsed = time.perf_counter() - start
+    return {
+        'latency_ms': 1000 * elapsed / n_queries,
+        # sklearn keeps its own copy of the fitted matrix
+        'index_bytes_per_recipe': knn._fit_X.nbytes / len(embeddings),
+        'model_bytes': wv.vectors.nbytes,
+    }
+
+
+def reduce_vectors(wv: KeyedVectors, n_components: int) -> KeyedVectors:
+    """Project existing word vectors onto their top principal components"""
+    n_components = min(n_components, *wv.vectors.shape)
+    reduced = KeyedVectors(vector_size=n_components)
+    reduced.add_vectors(wv.index_to_key, PCA(n_components=n_components).fit_transform(wv.vectors))
+    return reduced
+
+
+def evaluate(wv: KeyedVectors, all_recipes: Sequence[List[str]], test_recipes: Sequence[List[str]],
+             k: int = 10) -> Dict[str, float]:
+    """Quality, latency and memory for one set of word vectors"""
+    return {
+        'vector_size': wv.vector_size,
+        f'hit@{k}': completion_hit_rate(wv, test_recipes, k),
+        **index_cost(wv, all_recipes),
+    }
+
+
+def run_grid(recipes: Sequence[List[str]], vector_sizes: Sequence[int], windows: Sequence[int],
+             epochs: Sequence[int], pca_components: Sequence[int] = (), k: int = 10,
+             seed: int = 0) -> List[Dict[str, Any]]:
+    """Train one model per (vector_size, window, epochs) and evaluate it
+
+    PCA-reduced variants of the baseline W2V_PARAMS model are evaluated too
+    when `pca_components` is given.
+    """
+    train_recipes, test_recipes = split_holdout(recipes, seed=seed)
+    results = []
+    for vector_size, window, n_epochs in itertools.product(vector_sizes, windows, epochs):
+        params = {**W2V_PARAMS, 'vector_size': vector_size, 'window': window, 'epochs': n_epochs}
+        model = Word2Vec(sentences=train_recipes, seed=seed, workers=1, **params)
+        results.append({'params': params, **evaluate(model.wv, recipes, test_recipes, k)})
+
+    if pca_components:
+        baseline = Word2Vec(sentences=train_recipes, seed=seed, workers=1, **W2V_PARAMS)
+        for n_components in pca_components:
+            reduced = reduce_vectors(baseline.wv, n_components)
+            results.append({'params': {**W2V_PARAMS, 'pca': n_components},
+                            **evaluate(reduced, recipes, test_recipes, k)})
+    return results
+
+
+def train_model(recommender: RecipeRecommender, params: Dict[str, Any], seed: int = 0) -> Word2Vec:
+    """Train a configuration from run_grid on the full catalog"""
+    params = dict(params)
+    n_components = params.pop('pca', None)
+    model = Word2Vec(sentences=recommender.df['ingredients'], seed=seed, workers=4, **params)
+    model.catalog_digest = catalog_digest(recommender.df['ingredients'])
+    if n_components:
+        # Inference-only: the output layer keeps its original size
+        model.wv = reduce_vectors(model.wv, n_components)
+        model.vector_size = model.wv.vector_size
+    return model
+
+
+def export_model(recommender: RecipeRecommender, params: Dict[str, Any], seed: int = 0) -> Word2Vec:
+    """Train the chosen configuration on the full catalog and install it for serving
+
+    Overwrites models/word2vec.model and rebuilds the index so the next
+    RecipeRecommender picks up the new vectors. Everything else derived from
+    the old vectors is invalidated: other exact and quantized indexes and
+    the sharded embedding matrix are deleted, the similar-recipes table is
+    rebuilt with its settings, and user profiles are reset because their
+    preference vectors don't carry over to a new embedding space. Use
+    --register to try a configuration side by side instead (see
+    src/registry.py).
+    """
+    if recommender.model_version:
+        raise ValueError(f"Serving model version '{recommender.model_version}'; register a new version instead")
+    model = train_model(recommender, params, seed)
+    model.save(str(recommender.MODEL_DIR / MODEL_FILE))
+
+    recommender.model = model
+    # knn.pkl, knn_<quantization>.pkl and their exact vectors; rebuilt on load
+    for path in recommender.MODEL_DIR.glob("knn*"):
+        path.unlink()
+    (recommender.MODEL_DIR / EMBEDDINGS_FILE).unlink(missing_ok=True)
+    shutil.rmtree(recommender.USERS_DIR, ignore_errors=True)
+    recommender._profiles = None
+    recommender.knn = recommender._load_or_build_knn()
+
+    settings = table_settings(recommender.SIMILAR_DIR)
+    if settings is not None:
+        settings.pop('model', None)
+        builder_for(recommender, **settings).build(recommender.SIMILAR_DIR, catalog_fingerprints(recommender))
+    recommender._similar_table = None
+    recommender.result_cache.clear()
+    return model
+
+
+def _format_row(result: Dict[str, Any], k: int) -> str:
+    params = result['params']
+    label = (f"pca={params['pca']}" if 'pca' in params
+             else f"size={params['vector_size']} window={params['window']} epochs={params['epochs']}")
+    return (f"{label:32s} hit@{k}={result[f'hit@{k}']:.3f} "
+            f"{result['latency_ms']:.3f} ms/query "
+            f"{result['index_bytes_per_recipe']:.0f} B/recipe "
+            f"model {result['model_bytes'] / 1024:.0f} KiB")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Tune the Word2Vec ingredient model")
+    parser.add_argument("--vector-size", type=int, nargs="+", default=[25, 50, 100])
+    parser.add_argument("--window", type=int, nargs="+", default=[3, 5])
+    parser.add_argument("--epochs", type=int, nargs="+", default=[5, 20])
+    parser.add_argument("--pca", type=int, nargs="*", default=[],
+                        help="Also evaluate PCA reductions of the baseline model")
+    parser.add_argument("--k", type=int, default=10, help="Cut-off for the completion task")
+    parser.add_argument("--export", action="store_true",
+                        help="Install the configuration with the best hit rate for serving")
+    parser.add_argument("--register", metavar="VERSION", default=None,
+                        help="Register the best configuration as a model version instead of installing it")
+    args = parser.parse_args(argv)
+
+    warnings.simplefilter("ignore")
+    recommender = RecipeRecommender()
+    recipes = list(recommender.df['ingredients'])
+    results = run_grid(recipes, args.vector_size, args.window, args.epochs, args.pca, k=args.k)
+    for result in sorted(results, key=lambda r: -r[f'hit@{args.k}']):
+        print(_format_row(result, args.k))
+
+    if args.export or args.register:
+        # Prefer the smallest vectors among equally good configurations
+        best = max(results, key=lambda r: (r[f'hit@{args.k}'], -r['vector_size']))
+        if args.register:
+            from experiments import register_model
+            from registry import ModelRegistry
+
+            register_model(recommender, ModelRegistry(recommender.REGISTRY_DIR), args.register,
+                           train_model(recommender, best['params']),
+                           {'tuning': {'params': best['params'], f'hit@{args.k}': best[f'hit@{args.k}']}})
+            print(f"Registered {best['params']} as {args.register}")
+        else:
+            export_model(recommender, best['params'])
+            print(f"Exported {best['params']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from scipy import sparse
+
+
+class IngredientVocabulary:
+    """Interns ingredient names to dense integer ids (append-only)"""
+
+    def __init__(self, ingredients: Iterable[str] = ()):
+        self.ids: Dict[str, int] = {}
+        self.names: List[str] = []
+        for ingredient in ingredients:
+            self.add(ingredient)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, ingredient: str) -> bool:
+        return ingredient in self.ids
+
+    def add(self, ingredient: str) -> int:
+        """Return the id of an ingredient, assigning a new one if needed"""
+        ingredient_id = self.ids.get(ingredient)
+        if ingredient_id is None:
+            ingredient_id = self.ids[ingredient] = len(self.names)
+            self.names.append(ingredient)
+        return ingredient_id
+
+    def extended(self, ingredients: Iterable[str]) -> "IngredientVocabulary":
+        """This vocabulary if it knows every ingredient, else a copy with the new ones added
+
+        Lets a vocabulary shared by published indexes grow for a new snapshot
+        without changing under the old one.
+        """
+        new = [i for i in ingredients if i not in self.ids]
+        if not new:
+            return self
+        vocab = IngredientVocabulary()
+        vocab.ids, vocab.names = dict(self.ids), list(self.names)
+        for ingredient in new:
+            vocab.add(ingredient)
+        return vocab
+
+    def lookup(self, ingredients: Iterable[str]) -> np.ndarray:
+        """Ids of the known ingredients (unknown ones are skipped)"""
+        return np.asarray(sorted({self.ids[i] for i in ingredients if i in self.ids}), dtype=np.int64)
+
+    def incidence(self, ingredient_lists: Sequence[Iterable[str]], intern: bool = True,
+                  n_columns: Optional[int] = None) -> sparse.csr_matrix:
+        """Binary (n_recipes, n_ingredients) recipe-ingredient matrix
+
+        Args:
+            ingredient_lists: Normalized ingredients per recipe
+            intern: Add unseen ingredients to the vocabulary (otherwise skip them)
+            n_columns: Matrix width, defaults to the vocabulary size
+        """
+        indptr, indices = [0], []
+        for ingredients in ingredient_lists:
+            if intern:
+                row = {self.add(i) for i in ingredients}
+            else:
+                row = {self.ids[i] for i in ingredients if i in self.ids}
+            indices.extend(sorted(row))
+            indptr.append(len(indices))
+        shape = (len(ingredient_lists), n_columns or len(self))
+        return sparse.csr_matrix((np.ones(len(indices), dtype=np.float32), indices, indptr), shape=shape)
@@ -0,0 +1,180 @@
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from image_pipeline import MANIFEST_FILE, ImageManifest
+from querylog import RECOMMEND, RECOMMEND_OPTIONS, InProcessTarget, load_queries
+from similar import META_FILE as SIMILAR_META_FILE
+
+STARTING = "starting"  # constructor running: catalog, model and index loading
+WARMING = "warming"    # warm_up running
+READY = "ready"        # taking traffic
+
+# Captured query log (see src/querylog.py) replayed by warm_up when none is given
+WARMUP_LOG_ENV = "VAVI_WARMUP_LOG"
+
+PAGE_SIZE = 4096
+
+logger = logging.getLogger(__name__)
+
+
+class Readiness:
+    """Startup state of a recommender and how long each startup stage took"""
+
+    def __init__(self):
+        self.state = STARTING
+        self.stages: Dict[str, float] = {}
+        self.error: Optional[str] = None
+        self._ready = threading.Event()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time a block as a named stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = time.perf_counter() - start
+
+    def set(self, state: str) -> None:
+        self.state = state
+        if state == READY:
+            self._ready.set()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until ready; False if `timeout` seconds passed first"""
+        return self._ready.wait(timeout)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            'state': self.state,
+            'stages_ms': {name: round(1000 * seconds, 1) for name, seconds in self.stages.items()},
+            'total_ms': round(1000 * sum(self.stages.values()), 1),
+            'error': self.error,
+        }
+
+
+def touch_pages(array: Optional[np.ndarray]) -> int:
+    """Read one byte per page of a (memory-mapped) array so it is in the page cache; returns bytes covered"""
+    if array is None or not array.size:
+        return 0
+    data = np.asarray(array).reshape(-1).view(np.uint8)
+    data[::PAGE_SIZE].sum()  # Faults in every page
+    return data.nbytes
+
+
+def _mapped_arrays(recommender: Any) -> List[np.ndarray]:
+    """Memory-mapped tables the recommender reads at query time, opening the ones built offline"""
+    arrays = [getattr(recommender.knn, 'exact', None)]
+    arrays.extend((recommender._priors or {}).values())
+    if recommender.USERS_DIR.exists():
+        arrays.extend(recommender.profiles._table)
+    live = np.flatnonzero(recommender.snapshot.alive)
+    if len(live) and (recommender.SIMILAR_DIR / SIMILAR_META_FILE).exists():
+        recommender.similar_to(int(live[0]))
+        arrays.extend([recommender._similar_table.neighbors, recommender._similar_table.scores])
+    return [a for a in arrays if isinstance(a, np.memmap)]
+
+
+def _build_structures(recommender: Any) -> None:
+    """Per-snapshot indexes that are otherwise built by the first query needing them"""
+    snapshot = recommender.snapshot
+    if recommender.knn is not None and hasattr(recommender.knn, '_fit_X'):
+        snapshot._index_matrix()
+    snapshot.name_index
+    recommender.vocab
+    recommender.recipe_graph
+    recommender.cookable_index
+    recommender.text_index
+    recommender.attribute_index
+    recommender._ingredient_sets(snapshot)
+    recommender._cuisine_codes(snapshot)
+
+
+def catalog_queries(recommender: Any, n: int = 50) -> List[Dict[str, Any]]:
+    """Recommend queries for the most common ingredients and pairs of them, when no query log is available
+
+    Only ingredients the model knows are used; others would fall back to a random sample.
+    """
+    known = recommender.model.wv
+    counts = Counter(i for ings in recommender.df['ingredients'] for i in ings if i in known)
+    common = [name for name, _ in counts.most_common(n)]
+    pantries = common[:n // 2] + [f"{a},{b}" for a, b in zip(common, common[1:])]
+    return [{'kind': RECOMMEND, 'ingredients': pantry} for pantry in pantries[:n]]
+
+
+def _touch_images(recommender: Any, results: List[Any]) -> int:
+    """Read the static images of recipes the warm-up queries returned; returns the number of files read"""
+    manifest = ImageManifest(recommender.STATIC_IMAGES_DIR / MANIFEST_FILE, "")
+    names = {name for df in results if 'image' in getattr(df, 'columns', ()) for name in df['image']}
+    n_read = 0
+    for name in names:
+        for filename in manifest.entries.get(name, {}).values():
+            path = recommender.STATIC_IMAGES_DIR / filename
+            if path.exists():
+                path.read_bytes()
+                n_read += 1
+    return n_read
+
+
+def warm_up(recommender: Any, query_log: Optional[Path] = None, n_queries: int = 200) -> Dict[str, Any]:
+    """Bring a freshly built recommender up to speed, then mark it ready
+
+    Stages: page in memory-mapped tables, build the per-snapshot indexes,
+    replay the last `n_queries` captured queries (or common-ingredient
+    queries) to fill the result cache, and read the static images those
+    queries return. A failing stage is logged and recorded in the report
+    but doesn't keep the recommender from becoming ready: warm-up only
+    saves the first users some latency.
+
+    Args:
+        recommender: RecipeRecommender to warm up
+        query_log: Captured queries to replay, defaults to $VAVI_WARMUP_LOG
+        n_queries: Most queries to replay
+    Returns:
+        readiness.report(): state, milliseconds per stage and any error
+    """
+    readiness = recommender.readiness
+    readiness.set(WARMING)
+    query_log = query_log or (Path(os.environ[WARMUP_LOG_ENV]) if os.environ.get(WARMUP_LOG_ENV) else None)
+    # Replayed queries aren't user traffic; keep them out of any capture
+    recorder, recommender.query_recorder = recommender.query_recorder, None
+    try:
+        with readiness.stage('page_in'):
+            for array in _mapped_arrays(recommender):
+                touch_pages(array)
+        with readiness.stage('structures'):
+            _build_structures(recommender)
+        with readiness.stage('queries'):
+            if query_log is not None and Path(query_log).exists():
+                queries = load_queries(query_log)[-n_queries:]
+            else:
+                queries = catalog_queries(recommender, n_queries)
+            results = []
+            target = InProcessTarget(recommender)
+            for entry in queries:
+                if entry['kind'] == RECOMMEND:
+                    options = {key: entry[key] for key in RECOMMEND_OPTIONS if key in entry}
+                    results.append(recommender.recommend(entry.get('ingredients', ""), entry.get('user'), **options))
+                else:
+                    target.run(entry)
+        with readiness.stage('images'):
+            _touch_images(recommender, results)
+    except Exception as e:
+        readiness.error = f"{type(e).__name__}: {e}"
+        logger.warning(f"Warm-up failed, serving cold: {readiness.error}")
+    finally:
+        recommender.query_recorder = recorder
+        readiness.set(READY)
+    return readiness.report()
@@ -0,0 +1,77 @@
+import sys
+from pathlib import Path
+from typing import Callable
+
+import pytest
+import tornado.web
+from tornado.testing import AsyncHTTPTestCase
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "src"))
+sys.path.insert(0, str(PROJECT_ROOT / "app"))
+
+import train  # noqa: E402
+from querylog import QUERY_LOG_ENV  # noqa: E402
+from result_cache import RESULT_CACHE_ENV  # noqa: E402
+from store import CATALOG_DB_ENV  # noqa: E402
+from train import RecipeRecommender  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def project_dir(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """Stand-in project root, so tests train and save models outside the repo's models/"""
+    root = tmp_path_factory.mktemp("project")
+    (root / "src").mkdir()
+    return root
+
+
+@pytest.fixture
+def make_recommender(project_dir: Path, monkeypatch: pytest.MonkeyPatch) -> Callable[..., RecipeRecommender]:
+    """Builds recommenders under project_dir; the first one trains the model, later ones load it"""
+    for name in (CATALOG_DB_ENV, QUERY_LOG_ENV, RESULT_CACHE_ENV):
+        monkeypatch.delenv(name, raising=False)
+    # models/, logs/ and images/ are found next to the directory holding train.py
+    monkeypatch.setattr(train, "__file__", str(project_dir / "src" / "train.py"))
+
+    def build(recommender_class: type = RecipeRecommender, **kwargs) -> RecipeRecommender:
+        return recommender_class(**kwargs)
+
+    return build
+
+
+@pytest.fixture
+def recommender(make_recommender: Callable[..., RecipeRecommender]) -> RecipeRecommender:
+    """Recommender over the built-in recipes"""
+    return make_recommender()
+
+
+class _ApiClient(AsyncHTTPTestCase):
+    """Blocking fetch() against an app/api.py application served on a test IOLoop"""
+
+    def __init__(self, app: tornado.web.Application):
+        self._app = app
+        super().__init__('runTest')
+
+    def get_app(self) -> tornado.web.Application:
+        return self._app
+
+    def runTest(self) -> None:
+        pass
+
+
+@pytest.fixture
+def api_client() -> Callable[..., _ApiClient]:
+    """Starts clients for make_app(...) applications, stopped after the test"""
+    clients = []
+
+    def start(*args, **kwargs) -> _ApiClient:
+        from api import make_app
+
+        client = _ApiClient(make_app(*args, **kwargs))
+        client.setUp()
+        clients.append(client)
+        return client
+
+    yield start
+    for client in clients:
+        client.tearDown()
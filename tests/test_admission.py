@@ -0,0 +1,125 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from admission import AdmissionController, OverloadedError, SingleFlight, deadline_after
+
+
+def _wait_for(condition, timeout: float = 5.0) -> None:
+    stop_at = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < stop_at, "condition not reached in time"
+        time.sleep(0.001)
+
+
+def _blocked_call(result):
+    """Function that records its calls and holds until the returned release event is set"""
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+    return fn, calls, started, release
+
+
+def test_identical_calls_run_once_and_share_the_result():
+    flight = SingleFlight()
+    fn, calls, started, release = _blocked_call(["fried rice"])
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        leader = pool.submit(flight.do, "rice", fn)
+        started.wait(5)
+        followers = [pool.submit(flight.do, "rice", fn) for _ in range(4)]
+        _wait_for(lambda: flight.coalesced == 4)
+        release.set()
+        results = [leader.result()] + [f.result() for f in followers]
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_followers_get_the_leaders_exception():
+    flight = SingleFlight()
+    fn, calls, started, release = _blocked_call(ValueError("bad query"))
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flight.do, "rice", fn)
+        started.wait(5)
+        follower = pool.submit(flight.do, "rice", fn)
+        _wait_for(lambda: flight.coalesced == 1)
+        release.set()
+        for future in (leader, follower):
+            with pytest.raises(ValueError, match="bad query"):
+                future.result()
+    assert len(calls) == 1
+
+
+def test_follower_gives_up_at_its_deadline():
+    flight = SingleFlight()
+    fn, calls, started, release = _blocked_call("done")
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        leader = pool.submit(flight.do, "rice", fn)
+        started.wait(5)
+        begin = time.monotonic()
+        with pytest.raises(OverloadedError):
+            flight.do("rice", fn, deadline_after(0.05))
+        assert time.monotonic() - begin < 1.0
+        release.set()
+        assert leader.result() == "done"
+    assert len(calls) == 1
+
+
+def test_different_keys_and_later_calls_run_again():
+    flight = SingleFlight()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        return len(calls)
+
+    assert flight.do("rice", fn) == 1
+    assert flight.do("rice", fn) == 2
+    assert flight.do("eggs", fn) == 3
+    assert flight.coalesced == 0
+
+
+def test_admission_rejects_past_capacity_and_drops_expired_work():
+    admission = AdmissionController(max_workers=1, max_queue=1)
+    fn, calls, started, release = _blocked_call("done")
+    running = admission.submit(fn)
+    started.wait(5)
+    queued = admission.submit(lambda: "late", deadline_after(0.01))
+
+    with pytest.raises(OverloadedError):
+        admission.submit(fn)
+    time.sleep(0.02)
+    release.set()
+
+    assert running.result() == "done"
+    with pytest.raises(OverloadedError):
+        queued.result()
+    assert admission.stats() == {**admission.stats(), 'pending': 0, 'admitted': 2, 'rejected': 1, 'expired': 1}
+    admission.close()
+
+
+def test_overloaded_api_answers_503(recommender, api_client):
+    admission = AdmissionController(max_workers=1, max_queue=0)
+    client = api_client(recommender, admission=admission)
+    assert client.fetch("/recommend?ingredients=rice").code == 200
+
+    fn, calls, started, release = _blocked_call(None)
+    admission.submit(fn)
+    started.wait(5)
+    response = client.fetch("/recommend?ingredients=rice")
+    release.set()
+
+    assert response.code == 503
+    assert response.headers['Retry-After'] == "1"
+    assert client.fetch("/recommend?ingredients=rice&timeout_ms=0").code == 400
+    admission.close()
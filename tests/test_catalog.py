@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+NEW_RECIPE = {'name': "Test Rice Bowl", 'ingredients': ["Rice", "Spring Onion"], 'steps': ["boil rice", "serve"],
+              'cuisine': "Asian", 'cooking_time': 20, 'serves': 2}
+
+
+def test_added_recipe_is_found_by_every_query(recommender):
+    recipe_id = recommender.add_recipe(NEW_RECIPE)
+
+    assert recommender.search_text("boil")['name'].tolist()[:1] == [NEW_RECIPE['name']]
+    assert recommender.get_recipe_by_name("test rice bowl")['ingredients'] == ["rice", "spring_onion"]
+    assert recommender.snapshot.recipes[recipe_id]['steps'] == "boil rice,serve"
+
+
+def test_updated_and_deleted_recipes_leave_the_results(recommender):
+    old_id = recommender.add_recipe(NEW_RECIPE)
+
+    new_id = recommender.update_recipe(old_id, {**NEW_RECIPE, 'steps': "steam rice"})
+
+    assert new_id in recommender.search_text("steam rice", k=None).index
+    assert old_id not in recommender.search_text("boil", k=None).index
+    assert recommender.delete_recipe(new_id)
+    assert recommender.get_recipe_by_name(NEW_RECIPE['name']) is None
+    assert not recommender.delete_recipe(new_id)
+
+
+@pytest.mark.parametrize("change", [
+    {'ingredients': 5},
+    {'steps': [1, 2]},
+    {'name': ["Rice"]},
+    {'cooking_time': "soon"},
+    {'serves': 0},
+    {'ingredients': " , "},
+])
+def test_malformed_recipe_is_rejected(recommender, change):
+    n_recipes = len(recommender.snapshot.df)
+
+    with pytest.raises(ValueError):
+        recommender.add_recipe({**NEW_RECIPE, **change})
+
+    assert len(recommender.snapshot.df) == n_recipes
+
+
+def test_api_answers_400_for_a_malformed_recipe(recommender, api_client):
+    client = api_client(recommender)
+
+    bad = client.fetch("/recipes", method="POST", body=json.dumps({**NEW_RECIPE, 'ingredients': 5}))
+    not_a_recipe = client.fetch("/recipes", method="POST", body="[1, 2]")
+    added = client.fetch("/recipes", method="POST", body=json.dumps(NEW_RECIPE))
+
+    assert bad.code == 400 and not_a_recipe.code == 400
+    assert added.code in (200, 201)
+    assert client.fetch("/search?q=boil").code == 200
@@ -0,0 +1,62 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmark import sample_queries, stress
+
+NEW_RECIPE = {'name': "Test Fried Rice", 'ingredients': "rice,egg,soy_sauce", 'steps': "Fry everything",
+              'cuisine': "Asian", 'cooking_time': 15, 'serves': 2}
+
+
+def test_readers_match_serial_results_during_writes(recommender):
+    report = stress(recommender, sample_queries(recommender, 20), n_threads=4, rounds=2)
+
+    assert report['errors'] == 0, report['messages']
+    assert report['mismatches'] == 0
+    assert report['writes'] > 0
+
+
+def test_snapshot_is_unchanged_by_later_writes(recommender):
+    before = recommender.snapshot
+    n_rows, alive = len(before.df), before.alive.copy()
+
+    recipe_id = recommender.add_recipe(NEW_RECIPE)
+    recommender.delete_recipe(0)
+
+    assert len(before.df) == n_rows and len(before.recipes) == n_rows
+    assert np.array_equal(before.alive, alive)
+    after = recommender.snapshot
+    assert after.version > before.version
+    assert recipe_id == n_rows and len(after.df) == n_rows + 1
+    assert after.alive[recipe_id] and not after.alive[0]
+    assert after.recipes[recipe_id]['name'] == NEW_RECIPE['name']
+
+
+def test_recommend_skips_recipes_deleted_before_the_query(recommender):
+    queries = sample_queries(recommender, 20)
+    victims = list(dict.fromkeys(int(i) for q in queries for i in recommender.recommend(q).index))[:10]
+    deleted, failures = [], []
+    stop = threading.Event()
+
+    def reader(worker: int) -> None:
+        i = worker
+        while not stop.is_set():
+            gone = set(deleted)
+            returned = set(recommender.recommend(queries[i % len(queries)]).index)
+            if returned & gone:
+                failures.append(sorted(returned & gone))
+            i += 1
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        readers = [pool.submit(reader, worker) for worker in range(4)]
+        for recipe_id in victims:
+            assert recommender.delete_recipe(recipe_id)
+            deleted.append(recipe_id)
+        stop.set()
+        for future in readers:
+            future.result()
+
+    assert not failures
+    for query in queries:
+        assert not set(recommender.recommend(query).index) & set(victims)
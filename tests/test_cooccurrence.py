@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from cooccurrence import IngredientCooccurrence
+
+RECIPES = [
+    ["rice", "soy_sauce", "ginger"],
+    ["rice", "soy_sauce", "scallions"],
+    ["rice", "soy_sauce"],
+    ["pasta", "tomatoes", "basil"],
+    ["tomatoes", "basil", "mozzarella"],
+]
+
+
+@pytest.mark.parametrize("method", ["conditional", "pmi"])
+def test_suggests_ingredients_that_go_with_the_pantry(method):
+    cooccurrence = IngredientCooccurrence(RECIPES)
+
+    suggestions = cooccurrence.suggest(["rice"], n=2, method=method)
+
+    assert suggestions[0][0] == "soy_sauce"
+    assert all(name not in {"rice", "pasta", "tomatoes", "basil", "mozzarella"} for name, _ in suggestions)
+
+
+def test_incremental_counts_equal_a_full_rebuild():
+    incremental = IngredientCooccurrence(RECIPES[:2])
+    incremental.add_recipes(RECIPES[2:])
+    full = IngredientCooccurrence(RECIPES)
+
+    assert incremental.n_recipes == full.n_recipes == len(RECIPES)
+    assert incremental.vocab.names == full.vocab.names
+    assert np.array_equal(incremental.counts, full.counts)
+    assert (incremental.matrix != full.matrix).nnz == 0
+
+
+def test_unknown_pantry_falls_back_to_common_ingredients():
+    cooccurrence = IngredientCooccurrence(RECIPES)
+
+    assert [name for name, _ in cooccurrence.suggest(["unobtainium"], n=2)] == ["rice", "soy_sauce"]
+    with pytest.raises(ValueError):
+        cooccurrence.scores(["rice"], method="lift")
+
+
+def test_recommender_suggestions_follow_added_recipes(recommender):
+    recommender.add_recipe({'name': "Quince Test Dish", 'ingredients': "candied_quince,natto",
+                            'steps': "Simmer", 'cuisine': "test", 'cooking_time': 5, 'serves': 1,
+                            'image': ""})
+
+    assert recommender.suggest_ingredients([" Candied Quince "], n=1) == ["natto"]
@@ -0,0 +1,45 @@
+import numpy as np
+
+from cookable import CookableIndex
+
+# Enough ingredients to spill into a second bitset word
+RECIPES = [[f"ingredient_{i}", f"ingredient_{i + 1}", f"ingredient_{i + 2}"] for i in range(0, 90, 3)]
+
+
+def test_missing_counts_match_set_difference():
+    index = CookableIndex(RECIPES)
+    pantry = [f"ingredient_{i}" for i in range(0, 90, 2)] + ["unobtainium"]
+
+    expected = [len(set(recipe) - set(pantry)) for recipe in RECIPES]
+    assert index.n_words == 2
+    assert list(index.missing_counts(pantry)) == expected
+
+    ids, missing = index.cookable(pantry, max_missing=1)
+    assert list(missing) == sorted(missing) and set(missing) <= {0, 1}
+    assert set(ids) == {i for i, n in enumerate(expected) if n <= 1}
+
+
+def test_appended_index_leaves_the_original_untouched():
+    index = CookableIndex(RECIPES[:2])
+    bits = index.bits.copy()
+
+    grown = index.appended(["ingredient_0", "saffron"])
+
+    assert np.array_equal(index.bits, bits)
+    assert len(grown.bits) == 3
+    assert list(grown.cookable(["ingredient_0", "saffron"])[0]) == [2]
+
+
+def test_recommender_lists_cookable_recipes(recommender):
+    name = recommender.df['name'].iat[0]
+    pantry = list(recommender.df['ingredients'].iat[0])
+
+    results = recommender.cookable([i.upper() for i in pantry])
+
+    assert name in set(results['name'])
+    assert (results['missing'] == 0).all()
+    near = recommender.cookable(pantry[1:], max_missing=1).set_index('name')
+    assert list(near.at[name, 'missing_ingredients']) == pantry[:1]
+
+    recommender.delete_recipe(0)
+    assert name not in set(recommender.cookable(pantry)['name'])
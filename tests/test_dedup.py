@@ -0,0 +1,37 @@
+import pytest
+
+from dedup import MinHasher, choose_bands, deduplicate, jaccard, recipe_shingles
+
+RECIPES = [
+    {'name': "Chicken Fried Rice", 'ingredients': "rice,chicken,eggs,soy_sauce,scallions", 'image': ""},
+    {'name': "Margherita Pizza", 'ingredients': "flour,tomatoes,mozzarella,basil", 'image': "pizza.jpg"},
+    {'name': "chicken fried rice ", 'ingredients': "Rice, Chicken,eggs,soy sauce,scallions",
+     'image': "fried_rice.jpg"},
+    {'name': "Vegetable Fried Rice", 'ingredients': "rice,carrots,peas,eggs,soy_sauce", 'image': ""},
+]
+
+
+def test_minhash_estimates_jaccard_similarity():
+    hasher = MinHasher(num_perm=256)
+    a = recipe_shingles(RECIPES[0])
+    b = recipe_shingles(RECIPES[3])
+
+    estimate = (hasher.signature(a) == hasher.signature(b)).mean()
+
+    assert abs(estimate - jaccard(a, b)) < 0.1
+    bands, rows = choose_bands(128, 0.8)
+    assert bands * rows == 128 and abs((1 / bands) ** (1 / rows) - 0.8) < 0.1
+
+
+@pytest.mark.parametrize("action, image", [("drop", ""), ("merge", "fried_rice.jpg")])
+def test_near_duplicates_collapse_into_the_first_recipe(action, image):
+    kept, report = deduplicate(RECIPES, threshold=0.8, action=action)
+
+    assert [r['name'] for r in kept] == ["Chicken Fried Rice", "Margherita Pizza", "Vegetable Fried Rice"]
+    assert kept[0]['image'] == image
+    assert report == [{'kept': "Chicken Fried Rice", 'collapsed': ["chicken fried rice "], 'similarity': 1.0}]
+
+
+def test_unknown_action_is_rejected():
+    with pytest.raises(ValueError):
+        deduplicate(RECIPES, action="keep")
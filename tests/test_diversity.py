@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from diversity import mmr
+
+
+def _unit(rows):
+    rows = np.asarray(rows, dtype=np.float64)
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+RELEVANCE = np.array([0.9, 0.89, 0.88, 0.5])
+# The three most relevant candidates are near copies of each other
+VECTORS = _unit([[1, 0, 0], [1, 0.01, 0], [1, 0, 0.01], [0, 1, 0]])
+
+
+def test_trade_off_one_ranks_by_relevance():
+    assert list(mmr(RELEVANCE, VECTORS, 3, trade_off=1.0)) == [0, 1, 2]
+
+
+def test_diversity_promotes_a_novel_candidate():
+    assert list(mmr(RELEVANCE, VECTORS, 2, trade_off=0.5)) == [0, 3]
+
+
+def test_group_quota_limits_picks_per_group():
+    groups = np.array([0, 0, 1, 1])
+
+    assert list(mmr(RELEVANCE, VECTORS, 4, trade_off=1.0, groups=groups, max_per_group=1)) == [0, 2]
+    with pytest.raises(ValueError):
+        mmr(RELEVANCE, VECTORS, 4, groups=groups, max_per_group=0)
+
+
+def test_recommendations_respect_the_cuisine_quota(recommender, api_client):
+    results = recommender.recommend("rice,eggs,tomatoes,garlic", max_per_cuisine=1, diversity=0.3)
+
+    assert len(results) > 1
+    assert results['cuisine'].is_unique
+
+    client = api_client(recommender)
+    assert client.fetch("/recommend?ingredients=rice&max_per_cuisine=1").code == 200
+    assert client.fetch("/recommend?ingredients=rice&max_per_cuisine=0").code == 400
+    assert client.fetch("/recommend?ingredients=rice&diversity=1.5").code == 400
@@ -0,0 +1,31 @@
+import json
+
+import numpy as np
+
+from events import CLICK, COOK, EventLogger, aggregate, load_priors
+
+
+def test_logged_events_become_priors_that_rerank(recommender, api_client, tmp_path):
+    logger = EventLogger(tmp_path / "events", segment_rows=3)
+    client = api_client(recommender, events=logger)
+    shown = [r['name'] for r in json.loads(client.fetch("/recommend?ingredients=rice,eggs&user=ann").body)]
+    ids = [int(np.flatnonzero(recommender.df['name'] == name)[0]) for name in shown]
+    favorite = ids[-1]
+    logger.log_many(CLICK, [favorite, favorite], "ann")
+    logger.log(COOK, favorite, "ann")
+    logger.close()
+
+    summary = aggregate(tmp_path / "events", len(recommender.df), tmp_path / "priors")
+
+    assert summary['segments'] >= 2
+    assert summary == {**summary, 'searches': 1, 'impressions': len(ids), 'clicks': 2, 'cooks': 1}
+    priors = load_priors(tmp_path / "priors")
+    assert priors['popularity'][favorite] == 1.0
+    assert priors['ctr'][favorite] > priors['ctr'][ids[0]] > 0
+    assert load_priors(tmp_path / "missing") is None
+
+    recommender.PRIORS_DIR = tmp_path / "priors"
+    recommender.reload_priors()
+    results = recommender.recommend("rice,eggs")
+    boost = results['score'] - results['similarity']
+    assert boost.idxmax() == favorite
@@ -0,0 +1,64 @@
+import time
+
+import numpy as np
+
+from graph import RecipeGraph
+from train import GRAPH
+from vocab import IngredientVocabulary
+
+RECIPES = [["salt", "saffron", "rice"], ["salt", "rice"], ["salt", "pasta"], ["salt", "oil"], ["salt", "beef"]]
+
+
+def _graph(alive=None):
+    vocab = IngredientVocabulary(i for recipe in RECIPES for i in recipe)
+    return RecipeGraph(RECIPES, vocab, alive), vocab
+
+
+def test_scores_match_dense_personalized_pagerank():
+    graph, vocab = _graph()
+    pantry = vocab.lookup(["salt", "rice"])
+
+    scores, iterations = graph.scores(pantry, damping=0.7, max_iter=200, tol=1e-9)
+
+    incidence = np.zeros((len(RECIPES), len(vocab)))
+    for r, recipe in enumerate(RECIPES):
+        incidence[r, vocab.lookup(recipe)] = 1
+    to_recipes = incidence / incidence.sum(axis=0)
+    to_ingredients = (incidence / incidence.sum(axis=1, keepdims=True)).T
+    restart = np.zeros(len(vocab))
+    restart[pantry] = 0.5
+    ingredients = restart
+    for _ in range(200):
+        ingredients = 0.3 * restart + 0.7 * to_ingredients @ to_recipes @ ingredients
+    assert iterations < 200
+    assert np.allclose(scores, to_recipes @ ingredients, atol=1e-5)
+
+
+def test_distinctive_ingredients_outweigh_common_ones():
+    graph, vocab = _graph()
+
+    ids, scores = graph.top(vocab.lookup(["salt", "saffron"]), k=2)
+
+    assert ids[0] == 0 and scores[0] > scores[1]
+    assert len(graph.top(vocab.lookup(["unobtainium"]), k=2)[0]) == 0
+
+
+def test_deleted_recipes_are_never_reached():
+    graph, vocab = _graph(np.array([False, True, True, True, True]))
+
+    scores, _ = graph.scores(vocab.lookup(["saffron", "rice"]))
+
+    assert scores[0] == 0 and scores[1] > 0
+    assert graph.scores(vocab.lookup(["rice"]), deadline=time.monotonic() - 1)[1] == 1
+
+
+def test_graph_strategy_recommendations(recommender, api_client):
+    ingredients = list(recommender.df['ingredients'].iat[0])
+
+    results = recommender.recommend(",".join(ingredients), strategy=GRAPH)
+
+    assert results.index[0] == 0
+    assert 'score' in results and results['score'].is_monotonic_decreasing
+    client = api_client(recommender)
+    assert client.fetch("/recommend?ingredients=rice&strategy=graph").code == 200
+    assert client.fetch("/recommend?ingredients=rice&strategy=random").code == 400
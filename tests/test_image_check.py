@@ -0,0 +1,35 @@
+import numpy as np
+from PIL import Image
+
+from image_check import load_image_status, scan_images, write_manifest
+
+
+def _gradient(size=(320, 240)) -> Image.Image:
+    x = np.linspace(0, 255, size[0], dtype=np.uint8)
+    return Image.fromarray(np.tile(x, (size[1], 1))).convert('RGB')
+
+
+def test_scan_validates_images_and_finds_duplicates(tmp_path):
+    _gradient().save(tmp_path / "soup.jpg")
+    _gradient((640, 480)).save(tmp_path / "soup_large.jpg")
+    _gradient().transpose(Image.FLIP_LEFT_RIGHT).save(tmp_path / "stew.jpg")
+    Image.new('RGB', (20, 20), (90, 40, 10)).save(tmp_path / "tiny.jpg")
+    (tmp_path / "corrupt.jpg").write_bytes(b"\xff\xd8 truncated")
+
+    entries = scan_images(["soup.jpg", "soup_large.jpg", "stew.jpg", "tiny.jpg", "corrupt.jpg",
+                           "missing.jpg", "soup.jpg"], tmp_path, workers=4)
+
+    assert len(entries) == 6
+    assert entries['soup_large.jpg']['width'] == 640 and entries['soup_large.jpg']['bytes'] > 0
+    assert entries['missing.jpg']['error'] == "missing"
+    assert entries['corrupt.jpg']['error'].startswith("decode failed")
+    assert "dimensions" in entries['tiny.jpg']['error']
+
+    manifest = write_manifest(entries, tmp_path / "manifest.json")
+    assert manifest['invalid'] == ["corrupt.jpg", "missing.jpg", "tiny.jpg"]
+    assert ["soup.jpg", "soup_large.jpg"] in manifest['duplicates']
+    assert not any("stew.jpg" in group for group in manifest['duplicates'])
+
+    status = load_image_status(tmp_path / "manifest.json")
+    assert status['soup.jpg'] and not status['corrupt.jpg']
+    assert load_image_status(tmp_path / "absent.json") == {}
@@ -0,0 +1,31 @@
+from PIL import Image
+
+from image_pipeline import DISPLAY_SIZES, MANIFEST_FILE, ImageManifest, build_static_images
+
+
+def test_built_images_are_served_with_immutable_cache_headers(recommender, api_client, tmp_path):
+    recommender.IMAGES_DIR = tmp_path / "images"
+    recommender.STATIC_IMAGES_DIR = tmp_path / "static"
+    recommender.IMAGES_DIR.mkdir()
+    names = sorted(set(recommender.RECIPE_IMAGES))
+    good, corrupt = names[0], names[1]
+    Image.new('RGB', (1600, 1200), (200, 80, 40)).save(recommender.IMAGES_DIR / good)
+    (recommender.IMAGES_DIR / corrupt).write_bytes(b"not a jpeg")
+
+    report = build_static_images(recommender, workers=2)
+
+    assert report['built'] == 1
+    assert set(report['failed']) == {corrupt}
+    assert set(report['missing']) == set(recommender.RECIPE_IMAGES) - {good, corrupt}
+    manifest = ImageManifest(recommender.STATIC_IMAGES_DIR / MANIFEST_FILE, "/static/")
+    assert manifest.url(corrupt) is None
+    card = manifest.url(good, 'card')
+    with Image.open(recommender.STATIC_IMAGES_DIR / card.rsplit('/', 1)[1]) as img:
+        assert img.size == DISPLAY_SIZES['card']
+
+    client = api_client(recommender)
+    response = client.fetch(card)
+    assert response.code == 200
+    assert "immutable" in response.headers['Cache-Control']
+    cached = client.fetch(card, headers={'If-None-Match': response.headers['Etag']})
+    assert cached.code == 304
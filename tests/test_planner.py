@@ -0,0 +1,36 @@
+import time
+from collections import Counter
+
+from admission import deadline_after
+from planner import MealPlanner
+
+PANTRY = ["rice", "garlic", "onion", "tomatoes", "eggs", "olive oil"]
+
+
+def test_plan_respects_size_time_budget_and_cuisine_quota(recommender):
+    plan = MealPlanner(recommender).plan(PANTRY, n_recipes=5, time_budget=150, max_per_cuisine=1)
+
+    df = recommender.snapshot.df
+    assert len(plan['recipe_ids']) == 5
+    assert plan['total_time'] == df['cooking_time'].iloc[plan['recipe_ids']].sum() <= 150
+    assert max(Counter(df['cuisine'].iloc[plan['recipe_ids']]).values()) == 1
+    assert set(plan['pantry_used']) <= {"rice", "garlic", "onion", "tomatoes", "eggs", "olive_oil"}
+    assert not plan['timed_out']
+
+
+def test_deleted_recipes_are_not_planned(recommender):
+    planner = MealPlanner(recommender)
+    first = planner.plan(PANTRY, n_recipes=3)['recipe_ids']
+
+    recommender.delete_recipe(first[0])
+
+    assert first[0] not in planner.plan(PANTRY, n_recipes=3)['recipe_ids']
+
+
+def test_deadline_is_a_monotonic_time(recommender):
+    planner = MealPlanner(recommender)
+
+    assert not planner.plan(PANTRY, deadline=deadline_after(60))['timed_out']
+    started = time.monotonic()
+    late = planner.plan(PANTRY, deadline=time.monotonic() - 1)
+    assert late['timed_out'] and time.monotonic() - started < 1
@@ -0,0 +1,101 @@
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from profiles import UserProfiles
+
+DIM = 8
+
+
+def _unit(i: int) -> np.ndarray:
+    vector = np.zeros(DIM, dtype=np.float32)
+    vector[i] = 1.0
+    return vector
+
+
+@pytest.fixture
+def profiles(tmp_path) -> UserProfiles:
+    return UserProfiles(tmp_path / "users", DIM, capacity=4)
+
+
+def test_click_moves_the_profile_towards_the_recipe(profiles):
+    assert profiles.get("ana") is None
+
+    profiles.record_click("ana", 3 * _unit(0), "Italian")
+    profiles.record_click("ana", _unit(1), "Asian")
+
+    vector, affinities = profiles.get("ana")
+    assert vector == pytest.approx(0.9 * 0.1 * _unit(0) + 0.1 * _unit(1), abs=1e-3)
+    assert profiles.cuisines == ["Italian", "Asian"]
+    assert affinities == pytest.approx([0.09, 0.1], abs=1e-3)
+
+
+def test_heavy_click_is_clamped_to_the_recipe(profiles):
+    profiles.record_click("ana", _unit(0), "Italian")
+
+    profiles.record_click("ana", _unit(1), "Asian", weight=1e9)
+
+    vector, affinities = profiles.get("ana")
+    assert np.isfinite(vector).all()
+    assert vector == pytest.approx(_unit(1), abs=1e-3)
+    assert affinities == pytest.approx([0.0, 1.0], abs=1e-3)
+
+
+@pytest.mark.parametrize("weight", [-1.0, float('nan'), float('inf')])
+def test_bad_click_weight_is_rejected(profiles, weight):
+    profiles.record_click("ana", _unit(0))
+
+    with pytest.raises(ValueError):
+        profiles.record_click("ana", _unit(1), weight=weight)
+
+    assert profiles.get("ana")[0] == pytest.approx(0.1 * _unit(0), abs=1e-3)
+
+
+def test_profiles_survive_growth_and_reopening(tmp_path, profiles):
+    for i in range(10):
+        profiles.record_click(f"user{i}", _unit(i % DIM), "Italian")
+    profiles.flush()
+
+    reopened = UserProfiles(tmp_path / "users", DIM)
+
+    assert len(reopened) == 10 and reopened.meta['capacity'] >= 20
+    for i in range(10):
+        assert reopened.get(f"user{i}")[0] == pytest.approx(0.1 * _unit(i % DIM), abs=1e-3)
+    with pytest.raises(ValueError):
+        UserProfiles(tmp_path / "users", DIM + 1)
+
+
+def _click_users(table_dir, first: int, n_users: int) -> None:
+    profiles = UserProfiles(table_dir, DIM, capacity=4)
+    for i in range(first, first + n_users):
+        profiles.record_click(f"user{i}", _unit(i % DIM), f"cuisine{i % 3}")
+    profiles.flush()
+
+
+def test_processes_sharing_a_table_lose_no_clicks(tmp_path):
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=_click_users, args=(tmp_path / "users", 100 * w, 100)) for w in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(60)
+        assert worker.exitcode == 0
+
+    profiles = UserProfiles(tmp_path / "users", DIM)
+
+    assert len(profiles) == 300
+    assert sorted(profiles.cuisines) == ["cuisine0", "cuisine1", "cuisine2"]
+    for i in range(300):
+        vector, affinities = profiles.get(f"user{i}")
+        assert vector == pytest.approx(0.1 * _unit(i % DIM), abs=1e-3)
+        assert affinities[profiles.cuisines.index(f"cuisine{i % 3}")] == pytest.approx(0.1, abs=1e-3)
+
+
+def test_reader_sees_users_added_by_another_writer(tmp_path, profiles):
+    other = UserProfiles(tmp_path / "users", DIM)
+    for i in range(10):
+        other.record_click(f"user{i}", _unit(i % DIM))
+
+    assert len(profiles.get("user9")[0]) == DIM
+    assert len(profiles) == 10
@@ -0,0 +1,55 @@
+import pickle
+import time
+
+import numpy as np
+import pytest
+
+from quantize import QuantizedIndex, measure_recall
+
+RNG = np.random.default_rng(0)
+CENTERS = RNG.normal(size=(40, 32))
+VECTORS = (CENTERS[RNG.integers(0, 40, 2000)] + 0.3 * RNG.normal(size=(2000, 32))).astype(np.float32)
+QUERIES = VECTORS[RNG.choice(2000, 50, replace=False)] + 0.05 * RNG.normal(size=(50, 32)).astype(np.float32)
+
+
+@pytest.mark.parametrize("quantization, options, min_recall, max_bytes", [
+    ("float16", {}, 0.98, 64),
+    ("int8", {}, 0.9, 40),
+    # Lossy without re-ranking, but far above chance (k / n = 0.005)
+    ("pq", {'n_subspaces': 8, 'n_centroids': 64}, 0.2, 40),
+])
+def test_compressed_index_recall_and_size(quantization, options, min_recall, max_bytes):
+    index = QuantizedIndex(VECTORS, quantization, **options)
+
+    report = measure_recall(index, VECTORS, QUERIES, k=10)
+
+    assert report['recall'] >= min_recall
+    assert report['code_bytes_per_vector'] <= max_bytes < VECTORS.shape[1] * 8
+
+
+def test_reranking_on_exact_vectors_restores_recall(tmp_path):
+    coarse = QuantizedIndex(VECTORS, "pq", n_subspaces=4, n_centroids=16)
+    reranked = QuantizedIndex(VECTORS, "pq", rerank=100, exact_path=tmp_path / "exact.npy",
+                              n_subspaces=4, n_centroids=16)
+
+    assert (measure_recall(reranked, VECTORS, QUERIES, k=10)['recall']
+            > measure_recall(coarse, VECTORS, QUERIES, k=10)['recall'])
+    assert measure_recall(reranked, VECTORS, QUERIES, k=10)['recall'] >= 0.95
+
+    loaded = pickle.loads(pickle.dumps(reranked))
+    assert np.array_equal(loaded.kneighbors(QUERIES)[1], reranked.kneighbors(QUERIES)[1])
+    late = reranked.kneighbors(QUERIES, deadline=time.monotonic() - 1)[1]
+    assert np.array_equal(late, coarse.kneighbors(QUERIES)[1])
+
+
+def test_unknown_quantization_is_rejected():
+    with pytest.raises(ValueError):
+        QuantizedIndex(VECTORS, "int4")
+
+
+def test_recommender_serves_a_compressed_index(make_recommender):
+    exact = make_recommender()
+    compressed = make_recommender(index_config={'quantization': 'int8', 'rerank': 50})
+
+    for query in ("rice,eggs,soy_sauce", "chickpeas,tahini", "tomatoes,basil,mozzarella"):
+        assert list(compressed.recommend(query).index) == list(exact.recommend(query).index)
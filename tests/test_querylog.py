@@ -0,0 +1,54 @@
+import pytest
+
+from querylog import RECIPE, RECOMMEND, SEARCH, InProcessTarget, Replayer, load_queries
+from result_cache import ResultCache
+from search_state import RecipeQuery
+
+
+def test_captured_queries_replay_against_the_cache(make_recommender, tmp_path):
+    log_path = tmp_path / "queries.jsonl"
+    recommender = make_recommender()
+    recommender.start_query_capture(log_path)
+    recommender.recommend("rice,eggs", diversity=0.3)
+    recommender.get_recipe_by_name(recommender.df['name'].iat[0])
+    recommender.record_query(SEARCH, **RecipeQuery(["tomatoes"], max_time=30).as_params())
+    recommender.stop_query_capture()
+    with open(log_path, 'a') as f:
+        f.write("{truncated\n")
+
+    queries = load_queries(log_path)
+
+    assert [q['kind'] for q in queries] == [RECOMMEND, RECIPE, SEARCH]
+    assert queries[0]['ingredients'] == "rice,eggs" and queries[0]['diversity'] == 0.3
+    assert RecipeQuery.from_params(queries[2]).max_time == 30
+    assert load_queries(log_path, kinds=[RECIPE]) == queries[1:2]
+
+    assert not recommender.result_cache.enabled
+    cached = make_recommender(result_cache_size=16)
+    reports = Replayer(InProcessTarget(cached), queries[:1] * 5, concurrency=1).run()
+    assert sum(r['queries'] for r in reports) == 5
+    assert reports[0]['error_rate'] == 0
+    assert reports[0]['cache_hit_rate'] == pytest.approx(0.8)
+
+
+def test_replayer_needs_one_load_model():
+    with pytest.raises(ValueError):
+        Replayer(None, [], speedup=2.0, concurrency=4)
+    with pytest.raises(ValueError):
+        Replayer(None, [])
+
+
+def test_result_cache_evicts_least_recently_used():
+    cache = ResultCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats()['hits'] == 3 and cache.stats()['misses'] == 1
+
+    disabled = ResultCache(0)
+    disabled.put("a", 1)
+    assert disabled.get("a") is None and disabled.stats()['misses'] == 0
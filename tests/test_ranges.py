@@ -0,0 +1,46 @@
+import math
+
+import pytest
+
+from ranges import serves_bounds
+
+
+def test_serves_bounds_account_for_scaling():
+    assert serves_bounds(6, None) == (6, None)
+    assert serves_bounds(6, 10, max_scale=2) == (3, 10)
+    assert serves_bounds(None, 4, max_scale=3) == (None, 4)
+
+
+@pytest.mark.parametrize("filters", [
+    {'max_time': 30},
+    {'min_serves': 6},
+    {'min_serves': 6, 'max_scale': 2.0},
+    {'max_serves': 2, 'cuisines': ["Italian", "Asian"]},
+    {'max_time': 45, 'min_serves': 3, 'max_serves': 5, 'cuisines': ["Mexican"]},
+])
+def test_filters_match_a_scan_of_the_catalog(recommender, filters):
+    df = recommender.snapshot.df
+    recommender.delete_recipe(int(df['cooking_time'].idxmin()))
+    alive = recommender.snapshot.alive
+    max_scale = filters.get('max_scale', 1.0)
+
+    expected = [
+        i for i in range(len(df)) if alive[i]
+        and df['cooking_time'].iat[i] <= filters.get('max_time', math.inf)
+        and df['serves'].iat[i] * max_scale >= filters.get('min_serves', 0)
+        and df['serves'].iat[i] <= filters.get('max_serves', math.inf)
+        and df['cuisine'].iat[i] in filters.get('cuisines', [df['cuisine'].iat[i]])
+    ]
+    results = recommender.filter_recipes(**filters)
+
+    assert sorted(results.index) == expected
+    assert results['cooking_time'].is_monotonic_increasing
+
+
+@pytest.mark.parametrize("max_scale, code", [("2", 200), ("1", 200), ("0.5", 400), ("-2", 400), ("nan", 400),
+                                             ("inf", 400), ("big", 400)])
+def test_api_rejects_max_scale_below_one(recommender, api_client, max_scale, code):
+    client = api_client(recommender)
+
+    for path in ("/recipes?min_serves=6", "/query?ingredients=rice&min_serves=6"):
+        assert client.fetch(f"{path}&max_scale={max_scale}").code == code
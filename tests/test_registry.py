@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+from experiments import DEFAULT_VERSION, ModelRouter, register_model
+from registry import ModelRegistry
+from train import W2V_PARAMS
+from tuning import train_model
+
+
+@pytest.fixture
+def registry(recommender, tmp_path):
+    recommender.REGISTRY_DIR = tmp_path / "registry"
+    registry = ModelRegistry(recommender.REGISTRY_DIR)
+    model = train_model(recommender, {**W2V_PARAMS, 'vector_size': 16})
+    register_model(recommender, registry, "small", model, {'note': "test"})
+    return registry
+
+
+def test_registered_versions_and_routing(registry):
+    assert registry.versions() == ["small"]
+    assert registry.meta("small")['vector_size'] == 16
+    assert registry.meta("small")['note'] == "test"
+    with pytest.raises(ValueError):
+        registry.reserve("small")
+    with pytest.raises(ValueError):
+        registry.path("../escape")
+    with pytest.raises(KeyError):
+        registry.set_routing(candidate="missing")
+    with pytest.raises(ValueError):
+        registry.set_routing(candidate="small", candidate_share=1.5)
+
+    registry.set_routing(candidate="small", candidate_share=0.5)
+    assert registry.routing()['candidate'] == "small"
+    with pytest.raises(ValueError):
+        registry.delete("small")
+
+
+def test_router_splits_users_and_shadow_scores(recommender, registry, api_client):
+    registry.set_routing(candidate="small", candidate_share=0.5, shadow=True)
+    router = ModelRouter.from_registry(recommender)
+    users = [f"user-{i}" for i in range(40)]
+    versions = {user: router.version_of(router.choose(user)) for user in users}
+
+    assert set(versions.values()) == {DEFAULT_VERSION, "small"}
+    assert all(router.version_of(router.choose(user)) == version for user, version in versions.items())
+    assert router.choose(None) is recommender
+
+    client = api_client(recommender, router=router)
+    for user in users[:4]:
+        response = client.fetch(f"/recommend?ingredients=rice,eggs&user={user}")
+        assert response.headers['X-Model-Version'] == versions[user]
+        assert json.loads(response.body)
+    router.close()
+    stats = router.stats()
+    assert stats['candidate'] == "small"
+    assert stats['shadowed'] + stats['shadow_dropped'] == 4
+    assert 0.0 <= stats['mean_overlap'] <= 1.0
+
+
+def test_candidate_sees_recipes_added_to_the_primary(recommender, registry):
+    registry.set_routing(candidate="small", candidate_share=1.0)
+    router = ModelRouter.from_registry(recommender)
+    new_id = recommender.add_recipe({'name': "Registry Test Bowl", 'ingredients': "rice,eggs,natto",
+                                     'steps': "Mix", 'cuisine': "test", 'cooking_time': 5, 'serves': 1,
+                                     'image': ""})
+
+    results, version = router.recommend("rice,eggs,natto", "anyone")
+
+    assert version == "small"
+    assert new_id in results.index
@@ -0,0 +1,51 @@
+import pytest
+
+from search_state import ALL_OF, ANY_OF, COOKABLE, QueryState, RecipeQuery
+
+QUERIES = [
+    RecipeQuery(["garlic"], mode=ANY_OF),
+    RecipeQuery(["garlic", "onion"], mode=ALL_OF, max_time=40),
+    RecipeQuery(["rice", "eggs", "soy sauce", "garlic", "onion"], mode=COOKABLE, max_missing=2),
+    RecipeQuery([], cuisines=["Italian"], min_serves=6, max_scale=2.0),
+    RecipeQuery(["tomatoes"], text="bake"),
+]
+
+
+def _scan(recommender, query):
+    """Ids matching a query, checked recipe by recipe"""
+    snapshot = recommender.snapshot
+    sets = [frozenset(ings) for ings in snapshot.df['ingredients']]
+    return sorted(i for i, recipe in enumerate(snapshot.recipes)
+                  if query.matches(recipe, sets[i]))
+
+
+@pytest.mark.parametrize("query", QUERIES[:4])
+def test_indexed_search_matches_a_scan(recommender, query):
+    assert sorted(recommender.query_state().update(query)) == _scan(recommender, query)
+
+
+def test_text_query_keeps_ingredient_matches_ranked_by_bm25(recommender):
+    ids = recommender.query_state().update(QUERIES[4])
+
+    assert ids and set(ids) <= set(_scan(recommender, RecipeQuery(["tomatoes"])))
+    assert ids == [i for i in recommender.search_text("bake", k=None).index if i in set(ids)]
+
+
+def test_repeated_and_narrowed_queries_reuse_the_candidates(recommender):
+    state = recommender.query_state()
+    broad = state.update(RecipeQuery(["garlic", "onion"], mode=ALL_OF))
+
+    assert state.update(RecipeQuery(["Onion", "Garlic "], mode=ALL_OF)) is broad
+    narrowed = state.update(RecipeQuery(["garlic", "onion"], mode=ALL_OF, max_time=30))
+    assert state.last_update_incremental
+    assert narrowed == [i for i in broad if recommender.snapshot.df['cooking_time'].iat[i] <= 30]
+    state.update(RecipeQuery(["garlic"], mode=ALL_OF))
+    assert not state.last_update_incremental
+
+
+def test_plain_and_indexed_states_agree(recommender):
+    plain = QueryState(recommender.snapshot.recipes)
+    indexed = recommender.query_state()
+
+    for query in QUERIES[:4]:
+        assert sorted(plain.update(query)) == sorted(indexed.update(query))
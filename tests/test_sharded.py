@@ -0,0 +1,51 @@
+import pytest
+
+from sharded import ShardedRecipeRecommender
+
+QUERY = "chickpeas,tahini,garlic"
+NEW_RECIPE = {'name': "Test Tahini Dip", 'ingredients': QUERY, 'steps': "Blend", 'cuisine': "Mediterranean",
+              'cooking_time': 5, 'serves': 2}
+
+
+@pytest.fixture
+def sharded(make_recommender):
+    with make_recommender(ShardedRecipeRecommender, n_shards=2) as recommender:
+        yield recommender
+
+
+def test_sharded_results_match_the_single_process_search(sharded, make_recommender):
+    expected = list(make_recommender().recommend(QUERY).index)
+
+    assert list(sharded.recommend(QUERY).index) == expected
+    assert list(sharded.recommend_batch([QUERY])[0].index) == expected
+
+
+def test_recipes_added_live_are_found_before_and_after_compaction(sharded):
+    recipe_id = sharded.add_recipe(NEW_RECIPE)
+
+    assert sharded.recommend(QUERY).index[0] == recipe_id
+    assert sharded.recommend_batch([QUERY])[0].index[0] == recipe_id
+
+    sharded.compact()
+
+    assert sharded.shards[-1][1] == recipe_id + 1
+    assert sharded.recommend(QUERY).index[0] == recipe_id
+    assert sharded.delete_recipe(recipe_id)
+    assert recipe_id not in sharded.recommend_batch([QUERY])[0].index
+
+
+def test_batch_answers_like_single_queries(sharded, make_recommender):
+    from benchmark import sample_queries
+
+    single = make_recommender()
+    queries = sample_queries(single, 20)
+    sharded.delete_recipe(int(single.recommend(queries[0]).index[0]))
+    single.delete_recipe(int(single.recommend(queries[0]).index[0]))
+
+    results = sharded.recommend_batch(queries + ["unknown_ingredient", ""])
+
+    assert sharded.shards[0][0] == 0 and sharded.shards[-1][1] == len(sharded.df) and len(sharded.shards) == 2
+    for query, result in zip(queries, results):
+        assert list(result.index) == list(single.recommend(query).index)
+    assert not results[-2].empty  # unknown ingredients fall back to a random sample
+    assert results[-1].empty
@@ -0,0 +1,55 @@
+import json
+
+import numpy as np
+import pytest
+
+from cookable import CookableIndex
+from shopping import OTHER, categorize, resolve_recipe_ids, shopping_list
+
+
+@pytest.mark.parametrize("ingredient, category", [
+    ("peanut_butter", "Sauces & Condiments"),
+    ("butter", "Dairy & Eggs"),
+    ("chicken_stock", "Oils & Stocks"),
+    ("tomato_sauce", "Sauces & Condiments"),
+    ("baking_powder", "Baking & Sweets"),
+    ("unobtainium", OTHER),
+])
+def test_categorize(ingredient, category):
+    assert categorize(ingredient) == category
+
+
+def test_resolves_mixed_ids_and_names():
+    name_index = {"fried rice": 0, "pizza": 1, "soup": 2}
+    alive = np.array([True, True, False])
+
+    ids, unknown = resolve_recipe_ids([1, "Fried Rice", "soup", 7, "stew", 0], name_index, alive)
+
+    assert list(ids) == [1, 0, 0]
+    assert unknown == ["soup", 7, "stew"]
+
+
+def test_merges_ingredients_minus_the_pantry():
+    index = CookableIndex([["rice", "eggs", "soy_sauce"], ["rice", "chicken", "soy_sauce"], ["flour", "eggs"]])
+
+    items = shopping_list(index.bits, index.vocab.names, np.array([0, 1, 1]), index.vocab.lookup(["eggs"]))
+
+    assert list(items) == sorted(items)
+    assert items["Grains, Pasta & Bakery"] == [{'ingredient': "rice", 'recipes': 3}]
+    assert items["Meat & Seafood"] == [{'ingredient': "chicken", 'recipes': 2}]
+    assert items["Sauces & Condiments"] == [{'ingredient': "soy_sauce", 'recipes': 3}]
+    assert "Dairy & Eggs" not in items
+
+
+def test_shopping_list_endpoint(recommender, api_client):
+    client = api_client(recommender)
+    name = recommender.df['name'].iat[0]
+    ingredients = list(recommender.df['ingredients'].iat[0])
+    body = json.dumps({'recipes': [name, "no such recipe"], 'pantry': [ingredients[0].upper()]})
+
+    response = json.loads(client.fetch("/shopping-list", method="POST", body=body).body)
+
+    listed = {item['ingredient'] for items in response['items'].values() for item in items}
+    assert listed == set(ingredients[1:])
+    assert response['unknown'] == ["no such recipe"]
+    assert client.fetch("/shopping-list", method="POST", body="[]").code == 400
@@ -0,0 +1,60 @@
+import numpy as np
+
+from similar import SimilarTable, SimilarTableBuilder
+
+RNG = np.random.default_rng(0)
+EMBEDDINGS = RNG.normal(size=(60, 8)).astype(np.float32)
+CUISINES = ["thai", "italian", "mexican"] * 20
+COOKING_TIMES = list(range(10, 70))
+
+
+def _fingerprints(n: int) -> list:
+    return [f"recipe-{i}" for i in range(n)]
+
+
+def test_table_matches_exact_top_k_with_filters(tmp_path):
+    builder = SimilarTableBuilder(EMBEDDINGS, CUISINES, COOKING_TIMES, k=4, same_cuisine=True,
+                                  max_time_diff=15, block_size=7)
+    builder.build(tmp_path, _fingerprints(60))
+    table = SimilarTable(tmp_path)
+
+    unit = EMBEDDINGS / np.linalg.norm(EMBEDDINGS, axis=1, keepdims=True)
+    for recipe_id in (0, 31, 59):
+        candidates = [j for j in range(60) if j != recipe_id and CUISINES[j] == CUISINES[recipe_id]
+                      and abs(COOKING_TIMES[j] - COOKING_TIMES[recipe_id]) <= 15]
+        expected = sorted(candidates, key=lambda j: -unit[recipe_id] @ unit[j])[:4]
+        neighbors, scores = table.lookup(recipe_id)
+        assert list(neighbors) == expected
+        assert np.all(np.diff(scores) <= 1e-3)
+
+
+def test_refresh_recomputes_only_affected_rows(tmp_path):
+    embeddings = EMBEDDINGS.copy()
+    SimilarTableBuilder(embeddings, CUISINES, COOKING_TIMES, k=5).build(tmp_path, _fingerprints(60))
+
+    embeddings[7] = -embeddings[7]
+    fingerprints = _fingerprints(60)
+    fingerprints[7] = "recipe-7-edited"
+    refreshed = SimilarTableBuilder(embeddings, CUISINES, COOKING_TIMES, k=5)
+    n_rows = refreshed.refresh(tmp_path, fingerprints)
+    incremental = SimilarTable(tmp_path)
+
+    assert 1 <= n_rows < 60
+    assert refreshed.refresh(tmp_path, fingerprints) == 0
+    full_dir = tmp_path / "full"
+    refreshed.build(full_dir, fingerprints)
+    assert np.array_equal(incremental.neighbors, SimilarTable(full_dir).neighbors)
+
+    # Other settings invalidate every row
+    assert SimilarTableBuilder(embeddings, CUISINES, COOKING_TIMES, k=3).refresh(tmp_path, fingerprints) == 60
+
+
+def test_recommender_serves_similar_recipes(recommender):
+    name = recommender.df['name'].iat[0]
+
+    results = recommender.similar_to(name, k=3)
+
+    assert 0 < len(results) <= 3
+    assert name not in set(results['name'])
+    assert results['similarity'].is_monotonic_decreasing
+    assert recommender.similar_to("no such recipe").empty
@@ -0,0 +1,110 @@
+import pytest
+
+from store import RecipeStore, StoredRecipes, read_recipes
+
+NEW_RECIPE = {'name': "Test Fried Rice", 'ingredients': "Rice, Egg", 'steps': "Fry everything", 'cuisine': "Asian",
+              'cooking_time': 15, 'serves': 2}
+
+RECIPES = [
+    {'name': f"Recipe {i}", 'ingredients': ["Olive Oil", f"ingredient {i}"], 'steps': f"Chop|Cook {i}",
+     'cuisine': "Italian" if i % 2 else "Asian", 'cooking_time': str(10 + i), 'serves': 2}
+    for i in range(7)
+]
+
+
+@pytest.fixture
+def store(tmp_path) -> RecipeStore:
+    store = RecipeStore(tmp_path / "catalog.db")
+    yield store
+    store.close()
+
+
+def test_add_and_get_round_trip_normalized(store):
+    recipe_id = store.add(RECIPES[0])
+
+    assert recipe_id == 0
+    assert store.get(recipe_id) == {
+        'name': "Recipe 0", 'ingredients': "olive_oil,ingredient_0", 'steps': "Chop,Cook 0",
+        'cuisine': "Asian", 'cooking_time': 10, 'serves': 2, 'image': "default.jpg",
+    }
+    assert store.with_ingredient("Olive Oil") == [0]
+
+
+def test_delete_is_a_tombstone_and_ids_are_not_reused(store):
+    store.bulk_load(RECIPES[:3])
+
+    assert store.delete(1)
+    assert not store.delete(1)
+    assert store.get(1) is None
+    assert store.count() == 2 and store.count(include_deleted=True) == 3
+    assert [(i, deleted) for i, _, deleted in store.page(include_deleted=True)] == [(0, False), (1, True), (2, False)]
+    assert store.add(RECIPES[3]) == 3
+    with pytest.raises(ValueError):
+        store.add(RECIPES[4], recipe_id=7)
+
+
+def test_export_and_bulk_load_round_trip(store, tmp_path):
+    store.bulk_load(RECIPES)
+    store.delete(2)
+
+    for suffix in (".json", ".csv"):
+        path = tmp_path / f"export{suffix}"
+        assert store.export(path) == len(RECIPES) - 1
+        copy = RecipeStore(tmp_path / f"copy{suffix}.db")
+        loaded, skipped = copy.bulk_load(read_recipes(path))
+        assert (loaded, skipped) == (len(RECIPES) - 1, [])
+        assert ([recipe for _, recipe, _ in copy.iter_recipes()]
+                == [recipe for _, recipe, _ in store.iter_recipes()])
+        copy.close()
+
+
+def test_stored_recipes_pages_through_the_store(store):
+    store.bulk_load(RECIPES)
+    store.delete(3)
+    expected = [recipe for _, recipe, _ in store.iter_recipes(include_deleted=True)]
+
+    recipes = StoredRecipes(store, len(expected), page_size=2, cached_pages=1)
+
+    assert len(recipes) == len(expected)
+    assert [recipes[i] for i in (6, 0, 3, 5, 1)] == [expected[i] for i in (6, 0, 3, 5, 1)]
+    assert recipes[-1] == expected[-1]
+    assert recipes[1:4] == expected[1:4]
+    assert len(recipes._pages) == 1
+    with pytest.raises(IndexError):
+        recipes[len(expected)]
+
+
+def test_stored_recipes_views_append_in_memory(store):
+    store.bulk_load(RECIPES[:3])
+    base = StoredRecipes(store, 3, page_size=2)
+    extra = {'name': "Added", 'ingredients': "rice"}
+
+    grown = base + [extra]
+
+    assert len(base) == 3 and len(grown) == 4
+    assert grown[3] is extra and grown[0] == base[0]
+    with pytest.raises(IndexError):
+        base[3]
+
+
+def test_added_recipes_are_stored_as_the_catalog_sees_them(make_recommender, store):
+    recommender = make_recommender(store=store)
+    n_recipes = len(recommender.snapshot.df)
+
+    recipe_id = recommender.add_recipe({**NEW_RECIPE, 'cooking_time': "30.5"})
+
+    assert recipe_id == n_recipes and store.count() == n_recipes + 1
+    assert store.get(recipe_id) == recommender.snapshot.recipes[recipe_id]
+    assert recommender.snapshot.df.loc[recipe_id, 'cooking_time'] == 30
+    assert recommender.snapshot.df.loc[recipe_id, 'ingredients'] == ["rice", "egg"]
+
+
+def test_rejected_recipe_is_neither_stored_nor_published(make_recommender, store):
+    recommender = make_recommender(store=store)
+    n_recipes = len(recommender.snapshot.df)
+
+    with pytest.raises(ValueError):
+        recommender.add_recipe({**NEW_RECIPE, 'serves': "two"})
+
+    assert store.count(include_deleted=True) == n_recipes == len(recommender.snapshot.df)
+    assert recommender.add_recipe(NEW_RECIPE) == n_recipes
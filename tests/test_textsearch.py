@@ -0,0 +1,74 @@
+import json
+from collections import Counter
+
+import numpy as np
+
+from textsearch import NAME_WEIGHT, TextIndex, parse_query, tokenize, varint_decode, varint_encode
+
+NAMES = ["Grilled Chicken", "Slow Cooker Chili", "Oven Baked Salmon", "Grilled Vegetables", "Pancakes"]
+STEPS = ["Marinate chicken,Grill over high heat",
+         "Brown the beef,Slow cook for 8 hours",
+         "Preheat the oven,Bake the salmon for 15 minutes",
+         "Slice vegetables,Grill until charred,Finish in the oven",
+         "Whisk batter,Fry in a pan"]
+
+
+def _bm25(query_terms, k1=1.2, b=0.75):
+    """Textbook BM25 over the same documents, for comparison"""
+    docs = [Counter(tokenize(steps)) + Counter({t: NAME_WEIGHT for t in tokenize(name)})
+            for name, steps in zip(NAMES, STEPS)]
+    avg_len = np.mean([sum(d.values()) for d in docs])
+    scores = np.zeros(len(docs))
+    for term in query_terms:
+        df = sum(term in d for d in docs)
+        idf = np.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+        for i, d in enumerate(docs):
+            tf = d[term]
+            scores[i] += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * sum(d.values()) / avg_len))
+    return scores
+
+
+def test_varints_round_trip():
+    values = np.array([0, 1, 127, 128, 300, 2 ** 21, 2 ** 40], dtype=np.uint64)
+
+    encoded = varint_encode(values)
+
+    assert len(encoded) == 1 + 1 + 1 + 2 + 2 + 4 + 6
+    assert list(varint_decode(encoded)) == list(values)
+
+
+def test_scores_match_textbook_bm25():
+    index = TextIndex(NAMES, STEPS)
+
+    assert np.allclose(index.scores("grilled chicken"), _bm25(tokenize("grilled chicken")), atol=1e-5)
+    ids, scores = index.search("grill", k=None)
+    assert set(ids) == {0, 3} and scores[0] >= scores[1] > 0
+
+
+def test_negated_words_exclude_recipes():
+    index = TextIndex(NAMES, STEPS)
+
+    assert parse_query("grill -oven") == (["grill"], {"oven"})
+    assert parse_query("slow cook no oven") == (["slow", "cook"], {"oven"})
+    assert list(index.search("grill no oven", k=None)[0]) == [0]
+    assert list(index.search("grill", candidates=[3, 4])[0]) == [3]
+
+
+def test_appended_documents_score_like_a_rebuild():
+    index = TextIndex(NAMES[:3], STEPS[:3])
+    for name, steps in zip(NAMES[3:], STEPS[3:]):
+        index = index.appended(name, steps)
+
+    rebuilt = TextIndex(NAMES, STEPS)
+    for query in ("grill", "oven salmon", "fry pan", "slow cook"):
+        assert np.allclose(index.scores(query), rebuilt.scores(query))
+
+
+def test_search_endpoint_validates_k(recommender, api_client):
+    client = api_client(recommender)
+
+    results = json.loads(client.fetch("/search?q=fry&k=3").body)
+    assert 0 < len(results) <= 3
+    assert all(r['score'] > 0 for r in results)
+    assert client.fetch("/search?q=fry&k=0").code == 400
+    assert client.fetch("/search?q=fry&k=1000").code == 400
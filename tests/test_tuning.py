@@ -0,0 +1,45 @@
+import numpy as np
+from gensim.models import KeyedVectors
+
+from tuning import completion_hit_rate, evaluate, reduce_vectors, split_holdout
+
+RECIPES = [[f"ingredient_{i}", f"ingredient_{i + 1}", "salt"] for i in range(20)]
+
+
+def _vectors() -> KeyedVectors:
+    """Two well separated clusters of ingredients"""
+    wv = KeyedVectors(vector_size=4)
+    wv.add_vectors(["rice", "soy_sauce", "ginger", "basil", "tomatoes", "mozzarella"],
+                   np.array([[1, 0, 0, 0], [0.9, 0.1, 0, 0], [0.95, 0, 0.1, 0],
+                             [0, 0, 0, 1], [0, 0.1, 0, 0.9], [0, 0, 0.1, 0.95]], dtype=np.float32))
+    return wv
+
+
+def test_split_holdout_is_a_seeded_partition():
+    train, test = split_holdout(RECIPES, holdout_fraction=0.25, seed=3)
+
+    assert len(test) == 5 and len(train) == 15
+    assert sorted(train + test) == sorted(RECIPES)
+    assert (train, test) == split_holdout(RECIPES, holdout_fraction=0.25, seed=3)
+    assert len(split_holdout(RECIPES[:2], holdout_fraction=0.1)[1]) == 1
+
+
+def test_completion_hit_rate_predicts_hidden_ingredients_from_context():
+    wv = _vectors()
+
+    assert completion_hit_rate(wv, [["rice", "soy_sauce", "ginger"]], k=1) == 1.0
+    assert completion_hit_rate(wv, [["rice", "basil"]], k=1) == 0.0
+    # Unknown ingredients and single-ingredient recipes are skipped
+    assert completion_hit_rate(wv, [["rice", "unobtainium"]], k=1) == 0.0
+
+
+def test_reduced_vectors_are_evaluated_like_trained_ones():
+    wv = _vectors()
+    reduced = reduce_vectors(wv, 2)
+    recipes = [["rice", "soy_sauce", "ginger"], ["basil", "tomatoes", "mozzarella"]]
+
+    assert reduced.vector_size == 2 and reduced.index_to_key == wv.index_to_key
+    report = evaluate(reduced, recipes, recipes, k=2)
+    assert report['vector_size'] == 2
+    assert report['hit@2'] == 1.0
+    assert report['index_bytes_per_recipe'] > 0
@@ -0,0 +1,47 @@
+import json
+
+import warmup
+from querylog import RECOMMEND, QueryRecorder
+from warmup import READY, STARTING
+
+
+def test_requests_wait_for_warm_up(make_recommender, api_client, tmp_path):
+    recorder = QueryRecorder(tmp_path / "captured.jsonl")
+    for ingredients in ("rice,eggs", "tomatoes,basil", "rice,eggs"):
+        recorder.log(RECOMMEND, ingredients=ingredients)
+    recorder.close()
+    recommender = make_recommender(result_cache_size=64)
+    recommender.start_query_capture(tmp_path / "live.jsonl")
+    client = api_client(recommender, require_ready=True)
+
+    assert recommender.readiness.state == STARTING
+    assert {'catalog', 'model', 'index', 'priors'} <= set(recommender.readiness.stages)
+    cold = client.fetch("/recommend?ingredients=rice")
+    assert cold.code == 503 and cold.headers['Retry-After'] == "1"
+    assert client.fetch("/ready").code == 503
+    assert client.fetch("/stats").code == 200
+
+    report = recommender.warm_up(tmp_path / "captured.jsonl")
+
+    assert report['state'] == READY and report['error'] is None
+    assert {'page_in', 'structures', 'queries', 'images'} <= set(report['stages_ms'])
+    assert recommender.result_cache.stats()['size'] == 2
+    assert json.loads(client.fetch("/ready").body)['state'] == READY
+    assert client.fetch("/recommend?ingredients=rice,eggs").code == 200
+    recommender.stop_query_capture()
+    # Only the request after warm-up was captured, not the replayed queries
+    assert len((tmp_path / "live.jsonl").read_text().splitlines()) == 1
+
+
+def test_failed_warm_up_still_serves(make_recommender, monkeypatch):
+    recommender = make_recommender()
+
+    def fail(recommender):
+        raise MemoryError("no room")
+
+    monkeypatch.setattr(warmup, "_build_structures", fail)
+    report = recommender.warm_up()
+
+    assert report['state'] == READY
+    assert report['error'] == "MemoryError: no room"
+    assert recommender.readiness.wait(0)